@@ -0,0 +1,111 @@
+# benchmarks/conftest.py
+"""Общие фикстуры бенчмарков: сравнение метрик с сохраненной базой
+
+Бенчмарки не входят в обычный запуск тестов (testpaths = tests):
+    pytest benchmarks                     - измерить и сравнить с эталонной базой
+    pytest benchmarks --baseline-update   - записать текущие значения как базу
+    pytest benchmarks --baseline benchmarks/baseline.local.json
+                                          - сравнить с базой этой машины
+
+Эталонная база benchmarks/baseline.json хранится в репозитории: это общий
+порог для всех. Метрики, которых в ней нет, не записываются сами, а роняют
+тест - новую метрику добавляют в эталон явно через --baseline-update.
+Локальная база (*.local.json, не хранится в git) нужна на машинах, заметно
+отличающихся от эталонной; в нее недостающие метрики записываются при первом
+запуске.
+"""
+import json
+import os
+
+import pytest
+import sys
+
+# Добавляем пути для импорта (app.py импортирует monte_carlo как модуль верхнего уровня)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../web_app')))
+
+# Эталонная база метрик (хранится в репозитории)
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+# Допустимое ухудшение метрики относительно базы (доля)
+DEFAULT_TOLERANCE = 0.5
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup('baseline', 'база метрик бенчмарков')
+    group.addoption('--baseline', default=DEFAULT_BASELINE,
+                    help='файл базы метрик (JSON); по умолчанию эталонная база из репозитория')
+    group.addoption('--baseline-update', action='store_true', help='записать текущие метрики как базу')
+    group.addoption('--baseline-tolerance', type=float, default=DEFAULT_TOLERANCE,
+                    help='допустимое ухудшение метрики относительно базы (доля)')
+
+
+class Baseline:
+    """Сохраненные значения метрик и проверка регрессий
+
+    Метрика хуже базы больше чем на tolerance - тест падает. Улучшения не
+    записываются автоматически: базу обновляют явно (--baseline-update),
+    чтобы ускорение закрепилось как новая планка. Метрика, которой нет в
+    базе, записывается только при record_missing, иначе тест падает.
+    """
+
+    def __init__(self, path, tolerance=DEFAULT_TOLERANCE, update=False, record_missing=True):
+        self.path = path
+        self.tolerance = tolerance
+        self.update = update
+        self.record_missing = record_missing
+        self.changed = False
+        self.values = {}
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as file:
+                self.values = json.load(file)
+
+    def check(self, name, value, higher_is_better=True):
+        """Сравнить метрику с базой (или записать ее, если базы нет)"""
+        stored = self.values.get(name)
+        if stored is None and not (self.update or self.record_missing):
+            pytest.fail(f"Метрики {name} нет в базе {self.path}: добавьте ее через --baseline-update")
+        if self.update or stored is None:
+            self.values[name] = value
+            self.changed = True
+            return
+
+        if higher_is_better:
+            regressed = value < stored * (1 - self.tolerance)
+        else:
+            regressed = value > stored * (1 + self.tolerance)
+        if regressed:
+            pytest.fail(f"Регрессия {name}: {value:.4g} при базе {stored:.4g} (допуск {self.tolerance:.0%})")
+
+    def rate(self, name, benchmark, amount):
+        """Проверить скорость: amount за лучшее время замера (больше - лучше)
+
+        Лучшее время меньше всего зависит от посторонней нагрузки на машину.
+        """
+        if benchmark.stats is not None:
+            self.check(name, amount / benchmark.stats.stats.min)
+
+    def duration(self, name, benchmark):
+        """Проверить медианное время замера (меньше - лучше)"""
+        if benchmark.stats is not None:
+            self.check(name, benchmark.stats.stats.median, higher_is_better=False)
+
+    def save(self):
+        """Записать базу на диск"""
+        temporary = f'{self.path}.tmp'
+        with open(temporary, 'w', encoding='utf-8') as file:
+            json.dump(self.values, file, indent=2, sort_keys=True)
+        os.replace(temporary, self.path)
+
+
+@pytest.fixture(scope='session')
+def baseline(request):
+    """База метрик; изменения записываются после всех бенчмарков"""
+    config = request.config
+    path = config.getoption('--baseline')
+    # Эталон меняется только явно, локальная база заполняется при первом запуске
+    reference = os.path.abspath(path) == DEFAULT_BASELINE
+    saved = Baseline(path, config.getoption('--baseline-tolerance'), config.getoption('--baseline-update'),
+                     record_missing=not reference)
+    yield saved
+    if saved.changed:
+        saved.save()
@@ -0,0 +1,66 @@
+# benchmarks/test_api.py
+"""Бенчмарки HTTP API: задержка /api/status при нескольких выполняющихся расчетах"""
+import pytest
+
+pytest.importorskip('pytest_benchmark')
+
+from web_app import app as app_module
+from web_app.history import RunHistory
+from web_app.checkpoint import CheckpointStore
+from web_app.result_cache import ResultCache
+
+# Наибольшее количество одновременных расчетов в бенчмарках
+MAX_JOBS = 64
+# Сколько запросов статуса замеряется
+STATUS_ROUNDS = 200
+
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    """Тестовый клиент Flask с пулом, в котором все расчеты выполняются одновременно"""
+    monkeypatch.setitem(app_module.app.config, 'HISTORY_PATH', str(tmp_path / 'history.sqlite3'))
+    monkeypatch.setitem(app_module.app.config, 'CHECKPOINT_DIR', str(tmp_path / 'checkpoints'))
+    monkeypatch.setitem(app_module.app.config, 'PROFILE_DIR', str(tmp_path / 'profiles'))
+    monkeypatch.setattr(app_module, 'history', RunHistory(str(tmp_path / 'history.sqlite3')))
+    monkeypatch.setattr(app_module, 'checkpoints', CheckpointStore(str(tmp_path / 'checkpoints')))
+    monkeypatch.setattr(app_module, 'result_cache', ResultCache())
+    # Класс берется из модуля приложения, чтобы отказы планировщика обрабатывались им
+    scheduler = app_module.JobScheduler(workers=MAX_JOBS, max_per_client=MAX_JOBS)
+    monkeypatch.setattr(app_module, 'scheduler', scheduler)
+    app_module.app.config['TESTING'] = True
+    with app_module.app.test_client() as client:
+        yield client
+    # Расчеты останавливаются до конца теста, чтобы не мешать следующим замерам
+    for calc_data in app_module.calculations.values():
+        calc_data['calculator'].stop()
+    scheduler.shutdown()
+    app_module.calculations.clear()
+
+
+@pytest.mark.parametrize("jobs", [1, 16, MAX_JOBS])
+@pytest.mark.parametrize("points", ['json', 'packed'])
+def test_status_latency(benchmark, baseline, client, jobs, points):
+    """Задержка /api/status одного расчета, пока выполняются jobs расчетов"""
+    # Расчеты идут в заданном темпе, как при просмотре в браузере, и выдают точки между запросами
+    calc_ids = [
+        client.post('/api/start', json={'total_points': 10 ** 6, 'seed': index + 1,
+                                        'pacing': 'duration', 'pacing_value': 60}).get_json()['calc_id']
+        for index in range(jobs)
+    ]
+
+    # Клиент передает курсор выборки точек и получает только новые точки, как страница в браузере
+    # (разбор ответа ради курсора - вне замера)
+    responses = [client.get(f'/api/status/{calc_ids[0]}')]
+
+    def next_request():
+        cursor = responses[-1].get_json()['points_cursor']
+        return (f'/api/status/{calc_ids[0]}?points={points}&cursor={cursor}',), {}
+
+    def poll(url):
+        responses.append(client.get(url))
+        return responses[-1]
+
+    response = benchmark.pedantic(poll, setup=next_request, rounds=STATUS_ROUNDS)
+
+    assert response.get_json()['status'] in ('queued', 'running')
+    baseline.duration(f'status[{points}-{jobs}].seconds', benchmark)
@@ -0,0 +1,54 @@
+# benchmarks/test_calculator.py
+"""Бенчмарки расчета MonteCarloCalculator: скорость и память"""
+import tracemalloc
+
+import pytest
+
+pytest.importorskip('pytest_benchmark')
+
+from web_app.monte_carlo import MonteCarloCalculator, Pacer, PACING_MAX, MODE_SCALAR, MODE_VECTORIZED, MODE_PARALLEL
+
+
+def calculate(total_points, mode):
+    """Выполнить расчет без ограничения скорости с настройками по умолчанию
+
+    Расчеты от DENSITY_MIN_POINTS точек копят растр плотности, как и у пользователей.
+    """
+    calculator = MonteCarloCalculator(total_points, mode=mode, seed=1, pacer=Pacer(PACING_MAX))
+    calculator.calculate()
+    return calculator
+
+
+@pytest.mark.parametrize("mode, total_points, rounds", [
+    (MODE_SCALAR, 10 ** 5, 3),
+    (MODE_VECTORIZED, 10 ** 5, 30),
+    (MODE_VECTORIZED, 10 ** 6, 10),
+    (MODE_VECTORIZED, 10 ** 7, 3),
+    (MODE_PARALLEL, 10 ** 7, 1),
+])
+def test_calculate_throughput(benchmark, baseline, mode, total_points, rounds):
+    """Точек в секунду у calculate"""
+    calculator = benchmark.pedantic(calculate, args=(total_points, mode), rounds=rounds, iterations=1)
+
+    assert calculator.points_processed == total_points
+    if calculator.density is not None:
+        assert int(calculator.density.counts.sum()) == total_points
+    baseline.rate(f'calculate[{mode}-{total_points}].points_per_second', benchmark, total_points)
+
+
+@pytest.mark.parametrize("mode, total_points", [
+    (MODE_SCALAR, 10 ** 5),
+    (MODE_VECTORIZED, 10 ** 6),
+    (MODE_VECTORIZED, 10 ** 7),
+])
+def test_memory_per_million_points(baseline, mode, total_points):
+    """Пик выделенной памяти на миллион точек"""
+    tracemalloc.start()
+    try:
+        calculate(total_points, mode)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    baseline.check(f'calculate[{mode}-{total_points}].bytes_per_million', peak * 10 ** 6 / total_points,
+                   higher_is_better=False)
@@ -0,0 +1,50 @@
+# benchmarks/test_worker.py
+"""Бенчмарки расчета настольного приложения MonteCarloWorker"""
+import tracemalloc
+
+import pytest
+
+pytest.importorskip('pytest_benchmark')
+pytest.importorskip('PySide6')
+
+from desktop_app.model import MonteCarloWorker, PACING_MAX
+
+
+def run_worker(total_points, vectorized, keep_points=False):
+    """Выполнить расчет в текущем потоке без ограничения скорости"""
+    worker = MonteCarloWorker(total_points, seed=1)
+    worker.set_vectorized(vectorized)
+    worker.set_pacing(PACING_MAX)
+    worker.set_keep_points(keep_points)
+    worker.run()
+    return worker
+
+
+@pytest.mark.parametrize("vectorized, total_points, rounds", [
+    (False, 10 ** 5, 3),
+    (True, 10 ** 5, 30),
+    (True, 10 ** 6, 10),
+    (True, 10 ** 7, 3),
+])
+def test_run_throughput(benchmark, baseline, vectorized, total_points, rounds):
+    """Точек в секунду у MonteCarloWorker.run"""
+    worker = benchmark.pedantic(run_worker, args=(total_points, vectorized), rounds=rounds, iterations=1)
+
+    assert worker.points_processed == total_points
+    mode = 'vectorized' if vectorized else 'scalar'
+    baseline.rate(f'worker[{mode}-{total_points}].points_per_second', benchmark, total_points)
+
+
+@pytest.mark.parametrize("keep_points", [False, True])
+def test_memory_per_million_points(baseline, keep_points):
+    """Пик выделенной памяти на миллион точек (с сохранением точек и без)"""
+    total_points = 10 ** 6
+    tracemalloc.start()
+    try:
+        run_worker(total_points, True, keep_points)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    baseline.check(f'worker[keep_points={keep_points}].bytes_per_million', peak * 10 ** 6 / total_points,
+                   higher_is_better=False)
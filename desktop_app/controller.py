@@ -1,5 +1,11 @@
+import os
+import time
+
 from desktop_app.model import MonteCarloWorker
 
+# Каталог профилей расчетов
+PROFILE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'profiles')
+
 
 class AppController:
     """Контроллер приложения (Controller)"""
@@ -18,9 +24,16 @@ class AppController:
 
         # Создаем и настраиваем поток
         self.worker = MonteCarloWorker(self.view.get_points_count())
+        self.worker.set_vectorized(True)
+        self.worker.set_sampler(self.view.get_sampler())
+        self.worker.set_pacing(*self.view.get_pacing())
+        self.worker.set_density(self.view.get_density())
+        if self.view.get_profile():
+            self.worker.set_profile(os.path.join(PROFILE_DIR, time.strftime('run-%Y%m%d-%H%M%S.pstats')))
         self.worker.progress_updated.connect(self.view.update_stats)
         self.worker.calculation_finished.connect(self.calculation_done)
-        self.worker.point_plotted.connect(self.view.add_point_to_view)
+        self.worker.points_batch.connect(self.view.add_points_to_view)
+        self.worker.density_updated.connect(self.view.show_density)
 
         # Обновляем состояние кнопок
         self.view.set_start_button_enabled(False)
@@ -35,19 +48,21 @@ class AppController:
         self.worker.start()
 
     def pause_calculation(self):
-        """Пауза/продолжение расчета"""
-        if self.worker and self.worker.isRunning():
-            if self.view.pause_button.text() == "⏸ Пауза":
-                self.worker.stop()
+        """Пауза/продолжение расчета (после паузы расчет продолжается с того же места)"""
+        if not self.worker:
+            return
+
+        if self.view.pause_button.text() == "⏸ Пауза":
+            if self.worker.isRunning():
+                self.worker.pause()
                 self.view.set_pause_button_text("▶ Продолжить")
-            else:
-                self.worker.running = True
-                self.worker.start()
-                self.view.set_pause_button_text("⏸ Пауза")
+        elif self.worker.paused:
+            self.worker.resume()
+            self.view.set_pause_button_text("⏸ Пауза")
 
     def stop_calculation(self):
         """Остановка расчета"""
-        if self.worker and self.worker.isRunning():
+        if self.worker and (self.worker.isRunning() or self.worker.paused):
             self.worker.stop()
             self.worker.wait()
             if self.worker.pi_estimate is not None:
@@ -77,4 +92,9 @@ class AppController:
         )
 
         # Выводим финальный результат
-        self.view.print_final_result(pi_estimate, elapsed_time)
\ No newline at end of file
+        self.view.print_final_result(pi_estimate, elapsed_time)
+        mc_error = self.worker.mc_error() if self.worker is not None else None
+        if mc_error is not None:
+            self.view.print_mc_error(self.worker.sampler, mc_error)
+        if self.worker is not None and self.worker.profile_path is not None:
+            self.view.print_profile(self.worker.profile_path)
\ No newline at end of file
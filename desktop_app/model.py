@@ -1,15 +1,36 @@
+import cProfile
+import os
 import random
 import time
+from statistics import NormalDist
+import numpy as np
 from PySide6.QtCore import QThread, Signal
 
+# Потоки точек, темп, доверительный интервал и растр плотности общие с веб-приложением:
+# при одном seed точки и оценки совпадают, а monte_carlo зависит только от NumPy
+from web_app.monte_carlo import (
+    DEFAULT_CHUNK_SIZE, SAMPLER_RANDOM, SAMPLER_SOBOL, SAMPLER_HALTON, DEFAULT_CONFIDENCE, MIN_POINTS_FOR_PRECISION,
+    PACING_MAX, PACING_RATE, STREAM_BLOCK_SIZE, DENSITY_SIZE, DENSITY_MIN_POINTS, PointStream, make_stream,
+    density_cells, pi_half_width, Pacer
+)
+
+# Сколько точек блока отправляется на отрисовку в больших расчетах
+PLOTTED_POINTS_PER_CHUNK = 1000
+# Частота отправки пачек точек и прогресса в интерфейс (Гц)
+DISPLAY_REFRESH_RATE = 60
+# Максимальный размер пачки точек; лишние точки между отправками не рисуются
+MAX_POINTS_PER_BATCH = 50000
+
 
 class MonteCarloWorker(QThread):
     """Класс для выполнения вычислений Монте-Карло в отдельном потоке (Model)"""
     progress_updated = Signal(int, int, float, float)  # сигнал обновления прогресса
-    calculation_finished = Signal(float, float, list, list)  # сигнал завершения расчета
+    calculation_finished = Signal(float, float, object, object)  # сигнал завершения расчета
     point_plotted = Signal(float, float, bool)  # сигнал для отрисовки точек
+    points_batch = Signal(object, object, object)  # сигнал для отрисовки пачки точек (x, y, in_circle)
+    density_updated = Signal(object)  # сигнал для отрисовки растра плотности (копия uint32 2 x size x size)
 
-    def __init__(self, total_points=10000):
+    def __init__(self, total_points=10000, seed=None):
         super().__init__()
         self.total_points = total_points
         self.points_in_circle = 0
@@ -19,23 +40,122 @@ class MonteCarloWorker(QThread):
         self.square_points = []
         self.running = True
 
+        # Пауза сохраняет счетчики и точки, resume продолжает расчет с того же места
+        self.paused = False
+        self._resuming = False
+        self.elapsed_time = 0.0
+        self._coordinates = None
+        self._in_circle_mask = None
+
+        # Без seed расчет по одной точке псевдослучайными числами использует модуль random
+        self.seeded = seed is not None
+        self.sampler = SAMPLER_RANDOM
+        self.stream = PointStream(seed)
+        self.seed = self.stream.seed
+
+        # Настройки векторизованного режима
+        self.vectorized = False
+        self.chunk_size = DEFAULT_CHUNK_SIZE
+        self.keep_points = True
+        self.refresh_rate = DISPLAY_REFRESH_RATE
+        self.pacer = Pacer()
+        # Растр плотности вместо точек (см. set_density) и его счетчики
+        self.density = None
+        self.density_counts = None
+
+        # Остановка по точности (см. set_target_error)
+        self.target_error = None
+        self.confidence = DEFAULT_CONFIDENCE
+        self.z = NormalDist().inv_cdf(0.5 + DEFAULT_CONFIDENCE / 2)
+        self.converged = False
+
+        # Профилирование расчета (см. set_profile)
+        self.profile_path = None
+        self._profiler = None
+
     def run(self):
         """Основной метод потока - выполняет расчет"""
-        self.points_in_circle = 0
-        self.points_processed = 0
-        self.circle_points = []
-        self.square_points = []
+        if self._resuming:
+            # Продолжение после паузы: счетчики и точки сохранены
+            self._resuming = False
+        else:
+            self.points_in_circle = 0
+            self.points_processed = 0
+            self.circle_points = []
+            self.square_points = []
+            self.converged = False
+            self.elapsed_time = 0.0
+            self._coordinates = None
+            self._in_circle_mask = None
+            self._profiler = None
+            self.density_counts = None
+
+        # Время до паузы учитывается в прошедшем времени
+        start_time = time.time() - self.elapsed_time
+        self.pacer.start(self.total_points)
 
-        start_time = time.time()
+        if self.profile_path is not None:
+            self._run_profiled(start_time)
+        else:
+            self._run_points(start_time)
 
-        for i in range(self.total_points):
+        # Финальное обновление
+        elapsed_time = time.time() - start_time
+        self.elapsed_time = elapsed_time
+        self.progress_updated.emit(
+            self.points_processed,
+            self.points_in_circle,
+            self.pi_estimate,
+            elapsed_time
+        )
+
+        # На паузе расчет не завершен
+        if self.paused:
+            return
+
+        self._coordinates = None
+        self._in_circle_mask = None
+        self.calculation_finished.emit(
+            self.pi_estimate,
+            elapsed_time,
+            self.circle_points,
+            self.square_points
+        )
+
+    def _run_points(self, start_time):
+        """Расчет точек выбранным способом"""
+        if self.vectorized:
+            self._run_vectorized(start_time)
+        else:
+            self._run_scalar(start_time)
+
+    def _run_profiled(self, start_time):
+        """Расчет под cProfile; профиль продолжается после паузы и сохраняется в profile_path"""
+        if self._profiler is None:
+            self._profiler = cProfile.Profile()
+        try:
+            self._profiler.enable()
+        except ValueError:
+            # В этом потоке уже работает другой профилировщик
+            self._run_points(start_time)
+            return
+
+        try:
+            self._run_points(start_time)
+        finally:
+            self._profiler.disable()
+            directory = os.path.dirname(self.profile_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._profiler.dump_stats(self.profile_path)
+
+    def _run_scalar(self, start_time):
+        """Расчет по одной точке"""
+        start = self.points_processed
+        for i, (x, y) in zip(range(start, self.total_points), self._scalar_points(start)):
             if not self.running:
                 break
 
-            # Генерация случайных точек
-            x = random.uniform(-1, 1)
-            y = random.uniform(-1, 1)
-
             # Проверка, попадает ли точка в круг
             distance = x ** 2 + y ** 2
             in_circle = distance <= 1.0
@@ -55,7 +175,7 @@ class MonteCarloWorker(QThread):
             # Отправка сигналов для обновления интерфейса
             self.point_plotted.emit(x, y, in_circle)
 
-            # Отправка сигнала прогресса каждые 100 точек
+            # Отправка сигнала прогресса и проверка точности каждые 100 точек
             if self.points_processed % 100 == 0:
                 elapsed_time = time.time() - start_time
                 self.progress_updated.emit(
@@ -64,30 +184,225 @@ class MonteCarloWorker(QThread):
                     self.pi_estimate,
                     elapsed_time
                 )
+                if self._precision_reached():
+                    break
 
-            # Небольшая задержка для визуализации процесса
-            if self.total_points <= 10000:
-                time.sleep(0.001)
+            # Темп выдерживается блоками по 100 точек, а не на каждой точке
+            if self.points_processed % 100 == 0:
+                self.pacer.acquire(100)
 
-        # Финальное обновление
-        elapsed_time = time.time() - start_time
-        self.progress_updated.emit(
-            self.points_processed,
-            self.points_in_circle,
-            self.pi_estimate,
-            elapsed_time
-        )
-        self.calculation_finished.emit(
-            self.pi_estimate,
-            elapsed_time,
-            self.circle_points,
-            self.square_points
-        )
+    def _scalar_points(self, start=0):
+        """Случайные точки для расчета по одной, начиная с номера start"""
+        if not self.seeded and self.sampler == SAMPLER_RANDOM:
+            while True:
+                yield random.uniform(-1, 1), random.uniform(-1, 1)
+
+        for block_start in range(start, self.total_points, STREAM_BLOCK_SIZE):
+            x, y, _ = self.stream.generate(block_start, min(STREAM_BLOCK_SIZE, self.total_points - block_start))
+            yield from zip(x.tolist(), y.tolist())
+
+    def _run_vectorized(self, start_time):
+        """Расчет блоками точек с хранением координат в массивах float32"""
+        # При ограниченной скорости блок уменьшается, чтобы точки появлялись плавно
+        chunk_size = self.pacer.chunk_size(self.chunk_size)
+
+        # Память под координаты выделяется один раз на весь расчет (и сохраняется на паузе)
+        if self.keep_points and self._coordinates is None:
+            self._coordinates = np.empty((self.total_points, 2), dtype=np.float32)
+            self._in_circle_mask = np.empty(self.total_points, dtype=bool)
+        coordinates = self._coordinates
+        in_circle_mask = self._in_circle_mask
+
+        # В больших расчетах вместо точек копится и отправляется растр плотности:
+        # отрисовка зависит от числа пикселей, а не от числа точек
+        density = self.density_active()
+        if density and self.density_counts is None:
+            self.density_counts = np.zeros((2, DENSITY_SIZE, DENSITY_SIZE), dtype=np.uint32)
+
+        # Точки (или номера их пикселей), накопленные с последней отправки
+        pending = []
+        pending_count = 0
+        last_emit = float('-inf')
+
+        while self.points_processed < self.total_points:
+            if not self.running:
+                break
+
+            start = self.points_processed
+            count = min(chunk_size, self.total_points - start)
+
+            # Генерация блока случайных точек и проверка попадания в круг
+            x, y, in_circle = self.stream.generate(start, count)
+
+            self.points_in_circle += int(np.count_nonzero(in_circle))
+            self.points_processed += count
+            self.pi_estimate = 4 * self.points_in_circle / self.points_processed
+
+            if self.keep_points:
+                coordinates[start:self.points_processed, 0] = x
+                coordinates[start:self.points_processed, 1] = y
+                in_circle_mask[start:self.points_processed] = in_circle
+
+            if density:
+                pending.append(density_cells(x, y, in_circle))
+            # В больших расчетах на отрисовку отправляется только часть точек блока
+            elif pending_count < MAX_POINTS_PER_BATCH:
+                step = max(1, count // PLOTTED_POINTS_PER_CHUNK)
+                pending.append((x[::step], y[::step], in_circle[::step]))
+                pending_count += len(pending[-1][0])
+
+            # Точки и прогресс отправляются не чаще частоты обновления экрана,
+            # поэтому очередь событий интерфейса не растет со скоростью расчета
+            now = time.monotonic()
+            if now - last_emit >= 1.0 / self.refresh_rate:
+                if density:
+                    self._emit_density(pending)
+                else:
+                    self._emit_points(pending)
+                pending = []
+                pending_count = 0
+                last_emit = now
+
+                elapsed_time = time.time() - start_time
+                self.progress_updated.emit(
+                    self.points_processed,
+                    self.points_in_circle,
+                    self.pi_estimate,
+                    elapsed_time
+                )
+
+            if self._precision_reached():
+                break
+            self.pacer.acquire(count)
+
+        if density:
+            self._emit_density(pending, final=True)
+        else:
+            self._emit_points(pending)
+
+        if self.keep_points:
+            processed = coordinates[:self.points_processed]
+            mask = in_circle_mask[:self.points_processed]
+            self.circle_points = processed[mask]
+            self.square_points = processed[~mask]
+
+    def _emit_points(self, pending):
+        """Отправить накопленные точки одной пачкой"""
+        if not pending:
+            return
+
+        x, y, in_circle = (np.concatenate(parts) for parts in zip(*pending))
+        self.points_batch.emit(x.astype(np.float32), y.astype(np.float32), in_circle)
+
+    def _emit_density(self, pending, final=False):
+        """Перенести накопленные номера пикселей в растр и отправить его копию"""
+        if not pending and not final:
+            return
+
+        if pending:
+            bins = np.bincount(np.concatenate(pending), minlength=2 * DENSITY_SIZE * DENSITY_SIZE)
+            flat = self.density_counts.reshape(-1)
+            np.add(flat, bins, out=flat, casting='unsafe')
+        self.density_updated.emit(self.density_counts.copy())
+
+    def density_active(self):
+        """Рисуется ли растр плотности вместо точек (по умолчанию - в больших расчетах блоками)"""
+        if not self.vectorized:
+            return False
+        if self.density is None:
+            return self.total_points >= DENSITY_MIN_POINTS
+        return self.density
+
+    def half_width(self):
+        """Полуширина доверительного интервала текущей оценки π"""
+        return pi_half_width(self.points_in_circle, self.points_processed, self.z)
+
+    def _precision_reached(self):
+        """Достигнута ли целевая погрешность (отмечает сходимость расчета)"""
+        if self.target_error is None or self.points_processed < MIN_POINTS_FOR_PRECISION:
+            return False
+        self.converged = self.half_width() < self.target_error
+        return self.converged
 
     def stop(self):
         """Остановка вычислений"""
         self.running = False
+        self.paused = False
+
+    def pause(self):
+        """Пауза: поток завершается после текущего блока, сохраняя счетчики и точки"""
+        self.paused = True
+        self.running = False
+
+    def resume(self):
+        """Продолжить расчет после паузы с той точки, на которой он остановился"""
+        if not self.paused:
+            return
+
+        # Дожидаемся, пока поток закончит прерванный блок
+        self.wait()
+        self.paused = False
+        self.running = True
+        self._resuming = True
+        self.start()
 
     def set_total_points(self, total_points):
         """Установка общего количества точек"""
-        self.total_points = total_points
\ No newline at end of file
+        self.total_points = total_points
+
+    def set_vectorized(self, vectorized, chunk_size=DEFAULT_CHUNK_SIZE):
+        """Включение расчета блоками точек"""
+        if chunk_size <= 0:
+            raise ValueError("Размер блока должен быть положительным")
+        self.vectorized = vectorized
+        self.chunk_size = chunk_size
+
+    def set_refresh_rate(self, refresh_rate):
+        """Установка максимальной частоты отправки пачек точек и прогресса (Гц)"""
+        if refresh_rate <= 0:
+            raise ValueError("Частота обновления должна быть положительной")
+        self.refresh_rate = refresh_rate
+
+    def set_sampler(self, sampler):
+        """Выбор последовательности точек (random, sobol или halton) с тем же seed"""
+        self.stream = make_stream(sampler, self.seed)
+        self.sampler = sampler
+
+    def mc_error(self):
+        """Стандартная ошибка обычного Монте-Карло на том же числе точек (None без точек)"""
+        if self.points_processed == 0:
+            return None
+        return self.half_width() / self.z
+
+    def set_pacing(self, mode, value=None):
+        """Установка темпа расчета (auto, max, rate - точек в секунду, duration - секунд)"""
+        self.pacer = Pacer(mode, value)
+
+    def set_target_error(self, target_error, confidence=DEFAULT_CONFIDENCE):
+        """Остановка, когда полуширина доверительного интервала меньше target_error
+
+        None отключает остановку по точности.
+        """
+        if target_error is not None and target_error <= 0:
+            raise ValueError("Целевая погрешность должна быть положительной")
+        if not 0 < confidence < 1:
+            raise ValueError("Уровень доверия должен быть между 0 и 1")
+        self.target_error = target_error
+        self.confidence = confidence
+        self.z = NormalDist().inv_cdf(0.5 + confidence / 2)
+
+    def set_profile(self, path):
+        """Профилировать расчет cProfile и сохранять профиль (pstats) в path
+
+        Файл перезаписывается после каждого сеанса расчета, так что и на паузе
+        в нем профиль всего расчета до нее. None отключает профилирование.
+        """
+        self.profile_path = path
+
+    def set_density(self, density):
+        """Рисовать ли растр плотности вместо точек в расчете блоками (None - в расчетах от DENSITY_MIN_POINTS точек)"""
+        self.density = density
+
+    def set_keep_points(self, keep_points):
+        """Сохранять ли координаты всех точек до конца расчета"""
+        self.keep_points = keep_points
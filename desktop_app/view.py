@@ -1,18 +1,108 @@
 import math
+import numpy as np
 from PySide6.QtWidgets import (
     QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QGraphicsView,
-    QGraphicsScene, QGraphicsEllipseItem, QGraphicsRectItem,
-    QPushButton, QLabel, QSpinBox, QProgressBar,
-    QGroupBox, QGridLayout, QGraphicsSimpleTextItem
+    QGraphicsScene, QGraphicsEllipseItem, QGraphicsRectItem, QGraphicsItem,
+    QPushButton, QLabel, QSpinBox, QDoubleSpinBox, QComboBox, QProgressBar,
+    QGroupBox, QGridLayout, QGraphicsSimpleTextItem, QCheckBox
 )
-from PySide6.QtGui import QPainter, QPen, QColor, QBrush, QFont
+from PySide6.QtGui import QPainter, QPen, QColor, QBrush, QFont, QImage
 from PySide6.QtCore import Qt, QRectF
 
+# Цвета точек в формате ARGB32
+CIRCLE_POINT_ARGB = 0xFF0064FF  # Синий для точек внутри круга
+SQUARE_POINT_ARGB = 0xFFFF6400  # Оранжевый для точек вне круга
+# Непрозрачность пикселя растра плотности с единственной точкой (из 255)
+DENSITY_MIN_ALPHA = 48
+# Наибольшее количество точек расчета: координаты всех точек хранятся до конца расчета
+# (9 байт на точку), а растр плотности по умолчанию рисуется с 10 миллионов точек
+MAX_POINTS = 20000000
+
+
+class PointsLayerItem(QGraphicsItem):
+    """Слой точек: один элемент сцены, рисующий все точки из изображения
+
+    Точки записываются прямо в пиксели QImage массивами NumPy, поэтому
+    количество элементов сцены не зависит от количества точек.
+    """
+
+    def __init__(self, width, height, point_size=3):
+        super().__init__()
+        self.image = QImage(width, height, QImage.Format_ARGB32_Premultiplied)
+        self.image.fill(0)
+        self.point_size = point_size
+
+    def boundingRect(self):
+        return QRectF(0, 0, self.image.width(), self.image.height())
+
+    def paint(self, painter, option, widget=None):
+        painter.drawImage(0, 0, self.image)
+
+    def draw_points(self, plot_x, plot_y, in_circle):
+        """Нарисовать точки с координатами сцены plot_x, plot_y"""
+        width = self.image.width()
+        height = self.image.height()
+        pixels = np.frombuffer(self.image.bits(), dtype=np.uint32).reshape(
+            height, self.image.bytesPerLine() // 4
+        )
+        colors = np.where(in_circle, CIRCLE_POINT_ARGB, SQUARE_POINT_ARGB).astype(np.uint32)
+
+        # Точка - квадрат point_size x point_size пикселей с центром в координатах точки
+        columns = np.floor(plot_x).astype(np.intp)
+        rows = np.floor(plot_y).astype(np.intp)
+        radius = self.point_size // 2
+        for dy in range(-radius, self.point_size - radius):
+            for dx in range(-radius, self.point_size - radius):
+                x = columns + dx
+                y = rows + dy
+                visible = (x >= 0) & (x < width) & (y >= 0) & (y < height)
+                pixels[y[visible], x[visible]] = colors[visible]
+
+        self.update()
+
+    def draw_density(self, counts):
+        """Нарисовать растр плотности counts (2 x height x width: точки в круге и вне круга) вместо точек
+
+        Цвет пикселя - смесь цветов точек по доле точек в круге,
+        непрозрачность растет с логарифмом количества точек в пикселе.
+        """
+        height, width = counts.shape[1:]
+        pixels = np.frombuffer(self.image.bits(), dtype=np.uint32).reshape(
+            self.image.height(), self.image.bytesPerLine() // 4
+        )[:height, :width]
+
+        inside = counts[0].astype(np.float32)
+        total = inside + counts[1]
+        maximum = float(total.max())
+        if maximum == 0:
+            self.clear()
+            return
+
+        share = np.divide(inside, total, out=np.zeros_like(total), where=total > 0)
+        alpha = DENSITY_MIN_ALPHA + (255 - DENSITY_MIN_ALPHA) * np.log(np.maximum(total, 1)) / max(math.log(maximum), 1)
+        alpha[total == 0] = 0
+
+        # Формат изображения - с предварительно умноженной непрозрачностью
+        argb = alpha.astype(np.uint32) << 24
+        for shift in (16, 8, 0):
+            circle = (CIRCLE_POINT_ARGB >> shift) & 0xFF
+            square = (SQUARE_POINT_ARGB >> shift) & 0xFF
+            channel = (square + (circle - square) * share) * alpha / 255
+            argb |= channel.astype(np.uint32) << shift
+        pixels[:] = argb
+
+        self.update()
+
+    def clear(self):
+        """Стереть все точки"""
+        self.image.fill(0)
+        self.update()
+
 
 class MonteCarloView(QGraphicsView):
     """Виджет для отображения точек Монте-Карло (View)"""
 
-    def __init__(self):
+    def __init__(self, batched=False):
         super().__init__()
         self.scene = QGraphicsScene()
         self.setScene(self.scene)
@@ -35,6 +125,21 @@ class MonteCarloView(QGraphicsView):
         self.circle_points_count = 0
         self.square_points_count = 0
 
+        # Слой для пакетной отрисовки точек
+        self.points_layer = None
+        if batched:
+            self.set_batched_rendering(True)
+
+    def set_batched_rendering(self, batched):
+        """Рисовать точки в одном слое-изображении вместо отдельных элементов сцены"""
+        self.clear_points()
+        if batched and self.points_layer is None:
+            self.points_layer = PointsLayerItem(400, 400)
+            self.scene.addItem(self.points_layer)
+        elif not batched and self.points_layer is not None:
+            self.scene.removeItem(self.points_layer)
+            self.points_layer = None
+
     def draw_shapes(self):
         """Рисуем круг и квадрат для визуализации"""
         # Квадрат (от -1 до 1 по обеим осям)
@@ -95,6 +200,10 @@ class MonteCarloView(QGraphicsView):
 
     def add_point(self, x, y, in_circle):
         """Добавление точки на график"""
+        if self.points_layer is not None:
+            self.add_points(np.array([x]), np.array([y]), np.array([in_circle]))
+            return
+
         # Преобразуем координаты из [-1,1] в [0,400]
         plot_x = self.center_x + x * self.scale_x
         plot_y = self.center_y - y * self.scale_y  # инвертируем Y
@@ -118,8 +227,45 @@ class MonteCarloView(QGraphicsView):
         point.setPen(QPen(Qt.NoPen))
         self.scene.addItem(point)
 
+    def add_points(self, x, y, in_circle):
+        """Добавление пачки точек (массивы x, y и маска in_circle) на график"""
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        in_circle = np.asarray(in_circle, dtype=bool)
+
+        if self.points_layer is None:
+            for px, py, flag in zip(x.tolist(), y.tolist(), in_circle.tolist()):
+                self.add_point(px, py, flag)
+            return
+
+        inside = int(np.count_nonzero(in_circle))
+        self.circle_points_count += inside
+        self.square_points_count += len(in_circle) - inside
+
+        # Преобразуем координаты из [-1,1] в [0,400]
+        self.points_layer.draw_points(
+            self.center_x + x * self.scale_x,
+            self.center_y - y * self.scale_y,  # инвертируем Y
+            in_circle
+        )
+
+    def set_density(self, counts):
+        """Показать растр плотности counts (2 x 400 x 400) вместо отдельных точек"""
+        if self.points_layer is None:
+            self.set_batched_rendering(True)
+
+        self.circle_points_count = int(counts[0].sum())
+        self.square_points_count = int(counts[1].sum())
+        self.points_layer.draw_density(counts)
+
     def clear_points(self):
         """Очистка всех точек"""
+        if self.points_layer is not None:
+            self.points_layer.clear()
+            self.circle_points_count = 0
+            self.square_points_count = 0
+            return
+
         items_to_remove = []
         for item in self.scene.items():
             # Удаляем только точки (эллипсы), но не фигуры и текст
@@ -167,7 +313,7 @@ class MainWindow(QMainWindow):
         graph_label.setAlignment(Qt.AlignCenter)
         left_panel.addWidget(graph_label)
 
-        self.graphics_view = MonteCarloView()
+        self.graphics_view = MonteCarloView(batched=True)
         left_panel.addWidget(self.graphics_view)
 
         # Легенда
@@ -202,7 +348,7 @@ class MainWindow(QMainWindow):
         points_layout = QHBoxLayout()
         points_layout.addWidget(QLabel("Количество точек:"))
         self.points_spinbox = QSpinBox()
-        self.points_spinbox.setRange(100, 1000000)
+        self.points_spinbox.setRange(100, MAX_POINTS)
         self.points_spinbox.setValue(10000)
         self.points_spinbox.setSingleStep(1000)
         self.points_spinbox.setMaximumWidth(150)
@@ -210,6 +356,52 @@ class MainWindow(QMainWindow):
         points_layout.addStretch()
         control_layout.addLayout(points_layout)
 
+        # Выбор последовательности точек
+        sampler_layout = QHBoxLayout()
+        sampler_layout.addWidget(QLabel("Последовательность:"))
+        self.sampler_combo = QComboBox()
+        self.sampler_combo.addItem("Псевдослучайная", "random")
+        self.sampler_combo.addItem("Соболя", "sobol")
+        self.sampler_combo.addItem("Холтона", "halton")
+        sampler_layout.addWidget(self.sampler_combo)
+        sampler_layout.addStretch()
+        control_layout.addLayout(sampler_layout)
+
+        # Выбор темпа расчета
+        pacing_layout = QHBoxLayout()
+        pacing_layout.addWidget(QLabel("Темп:"))
+        self.pacing_combo = QComboBox()
+        self.pacing_combo.addItem("Авто", "auto")
+        self.pacing_combo.addItem("Максимальный", "max")
+        self.pacing_combo.addItem("Точек в секунду", "rate")
+        self.pacing_combo.addItem("Длительность (с)", "duration")
+        self.pacing_combo.currentIndexChanged.connect(self.on_pacing_changed)
+        pacing_layout.addWidget(self.pacing_combo)
+        self.pacing_spinbox = QDoubleSpinBox()
+        self.pacing_spinbox.setRange(0.1, 10000000)
+        self.pacing_spinbox.setValue(1000)
+        self.pacing_spinbox.setMaximumWidth(150)
+        self.pacing_spinbox.setEnabled(False)
+        pacing_layout.addWidget(self.pacing_spinbox)
+        pacing_layout.addStretch()
+        control_layout.addLayout(pacing_layout)
+
+        # Отображение: точки или растр плотности (авто - растр в больших расчетах)
+        display_layout = QHBoxLayout()
+        display_layout.addWidget(QLabel("Отображение:"))
+        self.display_combo = QComboBox()
+        self.display_combo.addItem("Авто", None)
+        self.display_combo.addItem("Точки", False)
+        self.display_combo.addItem("Растр плотности", True)
+        display_layout.addWidget(self.display_combo)
+        display_layout.addStretch()
+        control_layout.addLayout(display_layout)
+
+        # Профилирование расчета (профиль pstats сохраняется в каталог profiles)
+        self.profile_checkbox = QCheckBox("Профилирование")
+        self.profile_checkbox.setToolTip("Сохранить профиль cProfile расчета для поиска узких мест")
+        control_layout.addWidget(self.profile_checkbox)
+
         # Кнопки управления
         self.start_button = QPushButton("▶ Начать расчет")
         self.start_button.clicked.connect(self.on_start_clicked)
@@ -336,10 +528,32 @@ class MainWindow(QMainWindow):
         if self.controller:
             self.controller.clear_graph()
 
+    def on_pacing_changed(self, index):
+        """Значение темпа нужно только для режимов rate и duration"""
+        self.pacing_spinbox.setEnabled(self.pacing_combo.itemData(index) in ("rate", "duration"))
+
     def get_points_count(self):
         """Получение количества точек из spinbox"""
         return self.points_spinbox.value()
 
+    def get_sampler(self):
+        """Получение выбранной последовательности точек"""
+        return self.sampler_combo.currentData()
+
+    def get_pacing(self):
+        """Получение режима темпа и его значения (None для auto и max)"""
+        mode = self.pacing_combo.currentData()
+        value = self.pacing_spinbox.value() if mode in ("rate", "duration") else None
+        return mode, value
+
+    def get_density(self):
+        """Рисовать ли растр плотности вместо точек (None - по количеству точек)"""
+        return self.display_combo.currentData()
+
+    def get_profile(self):
+        """Включено ли профилирование расчета"""
+        return self.profile_checkbox.isChecked()
+
     def set_start_button_enabled(self, enabled):
         """Включение/отключение кнопки старта"""
         self.start_button.setEnabled(enabled)
@@ -357,8 +571,13 @@ class MainWindow(QMainWindow):
         self.pause_button.setText(text)
 
     def set_points_spinbox_enabled(self, enabled):
-        """Включение/отключение spinbox"""
+        """Включение/отключение spinbox и выбора темпа"""
         self.points_spinbox.setEnabled(enabled)
+        self.sampler_combo.setEnabled(enabled)
+        self.pacing_combo.setEnabled(enabled)
+        self.display_combo.setEnabled(enabled)
+        self.pacing_spinbox.setEnabled(enabled and self.get_pacing()[1] is not None)
+        self.profile_checkbox.setEnabled(enabled)
 
     def update_stats(self, processed, in_circle, pi_estimate, elapsed_time):
         """Обновление статистики"""
@@ -394,6 +613,14 @@ class MainWindow(QMainWindow):
         """Добавление точки на график"""
         self.graphics_view.add_point(x, y, in_circle)
 
+    def add_points_to_view(self, x, y, in_circle):
+        """Добавление пачки точек на график"""
+        self.graphics_view.add_points(x, y, in_circle)
+
+    def show_density(self, counts):
+        """Показ растра плотности точек на графике"""
+        self.graphics_view.set_density(counts)
+
     def clear_graphics_view(self):
         """Очистка графического виджета"""
         self.graphics_view.clear_points()
@@ -403,4 +630,13 @@ class MainWindow(QMainWindow):
         print(f"Расчет завершен: π ≈ {pi_estimate:.6f}")
         print(f"Точное значение: π = {math.pi:.6f}")
         print(f"Погрешность: {abs(pi_estimate - math.pi):.6f}")
-        print(f"Время выполнения: {elapsed_time:.3f} с")
\ No newline at end of file
+        print(f"Время выполнения: {elapsed_time:.3f} с")
+
+    def print_mc_error(self, sampler, mc_error):
+        """Вывод ошибки обычного Монте-Карло на том же числе точек для сравнения"""
+        print(f"Последовательность: {sampler}")
+        print(f"Ошибка обычного Монте-Карло: {mc_error:.6f}")
+
+    def print_profile(self, path):
+        """Вывод пути к сохраненному профилю расчета"""
+        print(f"Профиль расчета: {path} (python -m pstats {path})")
@@ -13,6 +13,10 @@ class TestAppController:
         """Фикстура для мока представления"""
         view = Mock()
         view.get_points_count.return_value = 5000
+        view.get_pacing.return_value = ('auto', None)
+        view.get_sampler.return_value = 'random'
+        view.get_profile.return_value = False
+        view.get_density.return_value = None
         view.pause_button = Mock()
         view.pause_button.text.return_value = "⏸ Пауза"
         return view
@@ -37,11 +41,17 @@ class TestAppController:
 
             # Проверяем создание worker
             MockWorker.assert_called_once_with(5000)
+            mock_worker.set_vectorized.assert_called_once_with(True)
+            mock_worker.set_sampler.assert_called_once_with('random')
+            mock_worker.set_pacing.assert_called_once_with('auto', None)
+            mock_worker.set_density.assert_called_once_with(None)
 
             # Проверяем подключение сигналов
             mock_worker.progress_updated.connect.assert_called_once_with(mock_view.update_stats)
             mock_worker.calculation_finished.connect.assert_called_once()
-            mock_worker.point_plotted.connect.assert_called_once_with(mock_view.add_point_to_view)
+            mock_worker.points_batch.connect.assert_called_once_with(mock_view.add_points_to_view)
+            mock_worker.density_updated.connect.assert_called_once_with(mock_view.show_density)
+            mock_worker.point_plotted.connect.assert_not_called()
 
             # Проверяем изменение состояния UI
             mock_view.clear_graphics_view.assert_called_once()
@@ -54,6 +64,18 @@ class TestAppController:
             # Проверяем запуск потока
             mock_worker.start.assert_called_once()
 
+    def test_start_calculation_with_profile(self, controller, mock_view):
+        """Тест запуска расчета с профилированием"""
+        mock_view.get_profile.return_value = True
+        with patch('desktop_app.controller.MonteCarloWorker') as MockWorker:
+            mock_worker = Mock()
+            MockWorker.return_value = mock_worker
+
+            controller.start_calculation()
+
+            path = mock_worker.set_profile.call_args[0][0]
+            assert path.endswith('.pstats')
+
     def test_start_calculation_when_running(self, controller):
         """Тест запуска расчета, когда уже выполняется"""
         # Создаем worker, который уже запущен
@@ -77,21 +99,22 @@ class TestAppController:
         mock_view.pause_button.text.return_value = "⏸ Пауза"
         controller.pause_calculation()
 
-        mock_worker.stop.assert_called_once()
+        mock_worker.pause.assert_called_once()
+        mock_worker.stop.assert_not_called()
         mock_view.set_pause_button_text.assert_called_with("▶ Продолжить")
 
     def test_resume_calculation(self, controller, mock_view):
         """Тест возобновления расчета"""
         mock_worker = Mock()
-        mock_worker.isRunning.return_value = True
+        mock_worker.isRunning.return_value = False
+        mock_worker.paused = True
         controller.worker = mock_worker
 
         # Тест возобновления
         mock_view.pause_button.text.return_value = "▶ Продолжить"
         controller.pause_calculation()
 
-        assert mock_worker.running is True
-        mock_worker.start.assert_called_once()
+        mock_worker.resume.assert_called_once()
         mock_view.set_pause_button_text.assert_called_with("⏸ Пауза")
 
     def test_stop_calculation(self, controller, mock_view):
@@ -106,6 +129,19 @@ class TestAppController:
         mock_worker.stop.assert_called_once()
         mock_worker.wait.assert_called_once()
 
+    def test_stop_paused_calculation(self, controller, mock_view):
+        """Тест остановки расчета на паузе"""
+        mock_worker = Mock()
+        mock_worker.isRunning.return_value = False
+        mock_worker.paused = True
+        mock_worker.pi_estimate = 3.14
+        controller.worker = mock_worker
+
+        controller.stop_calculation()
+
+        mock_worker.stop.assert_called_once()
+        mock_view.print_final_result.assert_called_once_with(3.14, 0)
+
     def test_clear_graph(self, controller, mock_view):
         """Тест очистки графика"""
         controller.clear_graph()
@@ -1,9 +1,16 @@
 # tests/desktop/test_model.py
 """Тесты для модели (model.py)"""
+import math
+import threading
+
+import numpy as np
 import pytest
 import time
 from unittest.mock import Mock, patch, call
-from desktop_app.model import MonteCarloWorker
+from desktop_app.model import (
+    MonteCarloWorker, PLOTTED_POINTS_PER_CHUNK, PACING_MAX, PACING_RATE, SAMPLER_SOBOL, SAMPLER_HALTON, make_stream,
+    DENSITY_SIZE, DENSITY_MIN_POINTS
+)
 
 
 class TestMonteCarloWorker:
@@ -302,4 +309,460 @@ class TestMonteCarloWorker:
 
         # Проверяем, что все значения кроме последнего уникальны
         for i in range(len(progress_values) - 2):
-            assert progress_values[i] != progress_values[i + 1]
\ No newline at end of file
+            assert progress_values[i] != progress_values[i + 1]
+
+class TestVectorizedWorker:
+    """Тесты векторизованного режима MonteCarloWorker"""
+
+    @pytest.fixture
+    def make_worker(self):
+        """Фикстура для создания worker в векторизованном режиме"""
+        def factory(total_points, chunk_size=4096, keep_points=True):
+            worker = MonteCarloWorker(total_points=total_points)
+            worker.set_vectorized(True, chunk_size)
+            worker.set_keep_points(keep_points)
+            return worker
+        return factory
+
+    def test_invalid_chunk_size(self):
+        """Тест неположительного размера блока"""
+        worker = MonteCarloWorker()
+        with pytest.raises(ValueError):
+            worker.set_vectorized(True, 0)
+
+    @pytest.mark.parametrize("total_points", [20001, 100000])
+    def test_processes_all_points(self, make_worker, total_points):
+        """Тест обработки всех точек блоками"""
+        worker = make_worker(total_points)
+        worker.run()
+
+        assert worker.points_processed == total_points
+        assert worker.pi_estimate == 4 * worker.points_in_circle / total_points
+        assert len(worker.circle_points) == worker.points_in_circle
+        assert len(worker.circle_points) + len(worker.square_points) == total_points
+
+    def test_points_stored_as_float32(self, make_worker):
+        """Тест хранения координат в массивах float32"""
+        worker = make_worker(50000)
+        worker.run()
+
+        assert worker.circle_points.dtype == np.float32
+        assert worker.circle_points.shape == (worker.points_in_circle, 2)
+        assert np.all(np.sum(worker.circle_points.astype(np.float64) ** 2, axis=1) <= 1.0 + 1e-6)
+        assert np.all(np.sum(worker.square_points.astype(np.float64) ** 2, axis=1) > 1.0 - 1e-6)
+
+    def test_without_keeping_points(self, make_worker):
+        """Тест расчета без сохранения координат"""
+        worker = make_worker(50000, keep_points=False)
+        worker.run()
+
+        assert worker.points_processed == 50000
+        assert worker.circle_points == []
+        assert worker.square_points == []
+
+    def test_progress_once_per_chunk(self, make_worker):
+        """Тест одного сигнала прогресса на блок, если интерфейс успевает"""
+        worker = make_worker(50000, chunk_size=10000)
+        worker.set_refresh_rate(1e9)
+
+        progress_values = []
+        worker.progress_updated.connect(lambda processed, *args: progress_values.append(processed))
+        worker.run()
+
+        assert progress_values == [10000, 20000, 30000, 40000, 50000, 50000]
+
+    def test_signals_coalesced_to_refresh_rate(self, make_worker):
+        """Тест объединения сигналов, если блоки считаются быстрее частоты обновления"""
+        worker = make_worker(50000, chunk_size=10000)
+        worker.set_refresh_rate(1e-9)
+
+        progress_values = []
+        batches = []
+        worker.progress_updated.connect(lambda processed, *args: progress_values.append(processed))
+        worker.points_batch.connect(lambda x, y, in_circle: batches.append(len(x)))
+        worker.run()
+
+        # Первый блок отправляется сразу, остальные - одной пачкой в конце
+        assert progress_values == [10000, 50000]
+        assert len(batches) == 2
+        assert sum(batches) == 5 * PLOTTED_POINTS_PER_CHUNK
+
+    def test_invalid_refresh_rate(self):
+        """Тест неположительной частоты обновления"""
+        worker = MonteCarloWorker()
+        with pytest.raises(ValueError):
+            worker.set_refresh_rate(0)
+
+    def test_batch_size_is_bounded(self, make_worker):
+        """Тест ограничения размера пачки точек"""
+        worker = make_worker(500000, chunk_size=10000)
+        worker.set_refresh_rate(1e-9)
+
+        batches = []
+        worker.points_batch.connect(lambda x, y, in_circle: batches.append(len(x)))
+        with patch('desktop_app.model.MAX_POINTS_PER_BATCH', 3000):
+            worker.run()
+
+        assert max(batches) <= 3000 + PLOTTED_POINTS_PER_CHUNK
+
+    def test_visual_run_plots_every_point(self, make_worker):
+        """Тест отрисовки всех точек в небольших расчетах"""
+        worker = make_worker(500)
+        mock_point = Mock()
+        batches = []
+        worker.point_plotted.connect(mock_point)
+        worker.points_batch.connect(lambda x, y, in_circle: batches.append((x, y, in_circle)))
+
+        with patch('desktop_app.model.time.sleep'):
+            worker.run()
+
+        assert not mock_point.called
+        x = np.concatenate([batch[0] for batch in batches])
+        in_circle = np.concatenate([batch[2] for batch in batches])
+        assert len(x) == 500
+        assert x.dtype == np.float32
+        assert int(np.count_nonzero(in_circle)) == worker.points_in_circle
+
+    def test_large_run_plots_subsample(self, make_worker):
+        """Тест ограничения количества отрисовываемых точек"""
+        worker = make_worker(200000, chunk_size=50000)
+        batches = []
+        worker.points_batch.connect(lambda x, y, in_circle: batches.append(len(x)))
+        worker.run()
+
+        assert sum(batches) == 4 * PLOTTED_POINTS_PER_CHUNK
+
+    def test_pi_accuracy(self, make_worker):
+        """Тест точности на большом количестве точек"""
+        worker = make_worker(1000000, chunk_size=65536)
+        worker.run()
+
+        assert abs(worker.pi_estimate - math.pi) < 0.01
+
+    def test_interruption(self, make_worker):
+        """Тест прерывания между блоками"""
+        worker = make_worker(10000)
+
+        def interrupt():
+            time.sleep(0.1)
+            worker.stop()
+
+        thread = threading.Thread(target=interrupt)
+        thread.start()
+
+        worker.run()
+        thread.join()
+
+        assert worker.points_processed < 10000
+        assert len(worker.circle_points) + len(worker.square_points) == worker.points_processed
+
+
+class TestSeededWorker:
+    """Тесты воспроизводимости расчета MonteCarloWorker по seed"""
+
+    def test_negative_seed(self):
+        """Тест отрицательного seed"""
+        with pytest.raises(ValueError):
+            MonteCarloWorker(total_points=100, seed=-1)
+
+    def test_same_counts_in_scalar_and_vectorized(self):
+        """Тест совпадения счетчиков при одном seed"""
+        counts = []
+        for vectorized, chunk_size in [(False, 1), (True, 1000), (True, 65536)]:
+            worker = MonteCarloWorker(total_points=70000, seed=11)
+            worker.set_vectorized(vectorized, chunk_size)
+            worker.run()
+            counts.append(worker.points_in_circle)
+
+        assert len(set(counts)) == 1
+
+    def test_different_seeds_differ(self):
+        """Тест различия результатов при разных seed"""
+        results = []
+        for seed in (1, 2):
+            worker = MonteCarloWorker(total_points=100000, seed=seed)
+            worker.set_vectorized(True)
+            worker.run()
+            results.append(worker.circle_points)
+
+        assert not np.array_equal(results[0][:100], results[1][:100])
+
+
+class TestPacedWorker:
+    """Тесты темпа расчета в потоке"""
+
+    def test_invalid_pacing(self):
+        """Тест скорости без значения"""
+        worker = MonteCarloWorker()
+        with pytest.raises(ValueError):
+            worker.set_pacing(PACING_RATE)
+
+    @pytest.mark.parametrize("vectorized", [False, True])
+    def test_max_pacing_does_not_sleep(self, vectorized):
+        """Тест расчета без задержек в режиме max"""
+        worker = MonteCarloWorker(total_points=10000)
+        worker.set_vectorized(vectorized)
+        worker.set_pacing(PACING_MAX)
+
+        with patch('desktop_app.model.time.sleep') as mock_sleep:
+            worker.run()
+
+        assert not mock_sleep.called
+        assert worker.points_processed == 10000
+
+    def test_rate_pacing(self):
+        """Тест выдерживания заданной скорости"""
+        worker = MonteCarloWorker(total_points=2000)
+        worker.set_vectorized(True)
+        worker.set_pacing(PACING_RATE, 10000)
+
+        started = time.monotonic()
+        worker.run()
+        elapsed = time.monotonic() - started
+
+        assert worker.points_processed == 2000
+        assert 0.15 <= elapsed < 1.0
+
+
+class TestPrecisionWorker:
+    """Тесты остановки потока по точности"""
+
+    def test_invalid_target_error(self):
+        """Тест неположительной целевой погрешности"""
+        worker = MonteCarloWorker()
+        with pytest.raises(ValueError):
+            worker.set_target_error(0)
+
+    @pytest.mark.parametrize("vectorized", [False, True])
+    def test_stops_at_target_error(self, vectorized):
+        """Тест ранней остановки при достижении точности"""
+        worker = MonteCarloWorker(total_points=1000000, seed=5)
+        worker.set_vectorized(vectorized, chunk_size=8192)
+        worker.set_target_error(0.02)
+        mock_finished = Mock()
+        worker.calculation_finished.connect(mock_finished)
+
+        worker.run()
+
+        assert worker.converged is True
+        assert worker.points_processed < 100000
+        assert worker.half_width() < 0.02
+        _, _, circle_points, square_points = mock_finished.call_args[0]
+        assert len(circle_points) + len(square_points) == worker.points_processed
+
+
+class TestQuasiRandomWorker:
+    """Тесты квазислучайных последовательностей в потоке"""
+
+    def test_unknown_sampler(self):
+        """Тест неизвестной последовательности"""
+        worker = MonteCarloWorker()
+        with pytest.raises(ValueError):
+            worker.set_sampler('unknown')
+
+    @pytest.mark.parametrize("sampler", [SAMPLER_SOBOL, SAMPLER_HALTON])
+    def test_modes_agree(self, sampler):
+        """Тест совпадения векторизованного расчета и расчета по одной точке"""
+        counts = []
+        for vectorized in (False, True):
+            worker = MonteCarloWorker(total_points=20001, seed=4)
+            worker.set_vectorized(vectorized, chunk_size=3000)
+            worker.set_sampler(sampler)
+            worker.run()
+            counts.append(worker.points_in_circle)
+
+        _, _, in_circle = make_stream(sampler, 4).generate(0, 20001)
+        assert counts == [int(np.count_nonzero(in_circle))] * 2
+
+    def test_unseeded_scalar_uses_sequence(self):
+        """Тест расчета по одной точке без seed по квазислучайной последовательности"""
+        worker = MonteCarloWorker(total_points=1000)
+        worker.set_sampler(SAMPLER_SOBOL)
+        with patch('random.uniform') as mock_uniform, patch('desktop_app.model.time.sleep'):
+            worker.run()
+
+        assert not mock_uniform.called
+        assert worker.points_processed == 1000
+
+    def test_mc_error(self):
+        """Тест ошибки обычного Монте-Карло для сравнения"""
+        worker = MonteCarloWorker(total_points=50000, seed=1)
+        assert worker.mc_error() is None
+
+        worker.set_vectorized(True)
+        worker.set_sampler(SAMPLER_SOBOL)
+        worker.run()
+
+        p = worker.points_in_circle / worker.points_processed
+        assert worker.mc_error() == pytest.approx(4 * math.sqrt(p * (1 - p) / 50000))
+        assert abs(worker.pi_estimate - math.pi) < worker.mc_error()
+
+
+class TestPauseResume:
+    """Тесты паузы и продолжения расчета MonteCarloWorker"""
+
+    @staticmethod
+    def pause_after_first_block(worker):
+        """Поставить расчет на паузу после первого блока (вызывается из потока расчета)"""
+        acquire = worker.pacer.acquire
+
+        def pause_once(count):
+            worker.pacer.acquire = acquire
+            worker.pause()
+            acquire(count)
+
+        worker.pacer.acquire = pause_once
+
+    @pytest.mark.parametrize("vectorized", [False, True])
+    def test_resume_continues_counts(self, vectorized):
+        """Тест продолжения с того же места без потерь и повторов точек"""
+        def make():
+            worker = MonteCarloWorker(total_points=30000, seed=8)
+            worker.set_vectorized(vectorized, 1000)
+            worker.set_pacing('max')
+            return worker
+
+        whole = make()
+        whole.run()
+
+        worker = make()
+        finished = Mock()
+        worker.calculation_finished.connect(finished)
+        self.pause_after_first_block(worker)
+        worker.run()
+
+        assert worker.paused
+        assert 0 < worker.points_processed < 30000
+        finished.assert_not_called()
+
+        worker.resume()
+        worker.wait()
+
+        assert not worker.paused
+        assert worker.points_processed == 30000
+        assert worker.points_in_circle == whole.points_in_circle
+        assert len(worker.circle_points) + len(worker.square_points) == 30000
+
+    def test_resume_without_pause(self):
+        """Тест продолжения без паузы"""
+        worker = MonteCarloWorker(total_points=100)
+
+        with patch.object(worker, 'start') as mock_start:
+            worker.resume()
+
+        mock_start.assert_not_called()
+
+    def test_elapsed_time_includes_paused_session(self):
+        """Тест учета времени до паузы"""
+        worker = MonteCarloWorker(total_points=30000, seed=8)
+        worker.set_vectorized(True, 1000)
+        worker.set_pacing('max')
+        self.pause_after_first_block(worker)
+        worker.run()
+        worker.elapsed_time += 10.0
+
+        worker.resume()
+        worker.wait()
+
+        assert worker.elapsed_time > 10.0
+
+    def test_stop_clears_pause(self):
+        """Тест остановки на паузе"""
+        worker = MonteCarloWorker(total_points=100)
+        worker.pause()
+        worker.stop()
+
+        assert not worker.paused
+        assert not worker.running
+
+
+class TestProfiledWorker:
+    """Тесты профилирования расчета MonteCarloWorker"""
+
+    @pytest.mark.parametrize("vectorized", [False, True])
+    def test_profile_saved(self, tmp_path, vectorized):
+        """Тест сохранения профиля с функциями расчета"""
+        import pstats
+
+        path = tmp_path / 'profiles' / 'run.pstats'
+        worker = MonteCarloWorker(total_points=2000, seed=3)
+        worker.set_vectorized(vectorized, 500)
+        worker.set_pacing('max')
+        worker.set_profile(str(path))
+        worker.run()
+
+        functions = {name for _, _, name in pstats.Stats(str(path)).stats}
+        assert ('_run_vectorized' if vectorized else '_run_scalar') in functions
+        assert worker.points_processed == 2000
+
+    def test_without_profile(self, tmp_path):
+        """Тест: без set_profile профиль не создается"""
+        worker = MonteCarloWorker(total_points=1000, seed=3)
+        worker.set_pacing('max')
+        worker.run()
+
+        assert worker.profile_path is None
+        assert worker._profiler is None
+
+
+class TestDensityWorker:
+    """Тесты растра плотности MonteCarloWorker"""
+
+    def test_density_by_default_for_large_runs(self):
+        """Тест: растр по умолчанию рисуется в больших расчетах блоками"""
+        worker = MonteCarloWorker(total_points=DENSITY_MIN_POINTS)
+        assert not worker.density_active()
+
+        worker.set_vectorized(True)
+        assert worker.density_active()
+
+        worker.set_density(False)
+        assert not worker.density_active()
+
+        worker = MonteCarloWorker(total_points=1000)
+        worker.set_vectorized(True)
+        assert not worker.density_active()
+        worker.set_density(True)
+        assert worker.density_active()
+
+    def test_density_instead_of_points(self):
+        """Тест: вместо пачек точек отправляются копии растра со всеми точками"""
+        worker = MonteCarloWorker(total_points=50000, seed=1)
+        worker.set_vectorized(True, 10000)
+        worker.set_pacing(PACING_MAX)
+        worker.set_density(True)
+
+        frames = []
+        batches = []
+        worker.density_updated.connect(frames.append)
+        worker.points_batch.connect(lambda *args: batches.append(args))
+        worker.run()
+
+        assert batches == []
+        assert frames[-1].shape == (2, DENSITY_SIZE, DENSITY_SIZE)
+        assert frames[-1].dtype == np.uint32
+        assert frames[-1].sum() == 50000
+        assert frames[-1][0].sum() == worker.points_in_circle
+        # Отправляются копии: интерфейс рисует растр, пока расчет продолжается
+        assert frames[-1] is not worker.density_counts
+
+    def test_density_continues_after_pause(self):
+        """Тест: после паузы растр продолжает копиться"""
+        worker = MonteCarloWorker(total_points=20000, seed=1)
+        worker.set_vectorized(True, 5000)
+        worker.set_pacing(PACING_MAX)
+        worker.set_density(True)
+        worker.set_refresh_rate(1e-9)
+
+        frames = []
+        worker.density_updated.connect(frames.append)
+        worker.progress_updated.connect(lambda processed, *args: processed >= 10000 and worker.pause())
+        worker.run()
+        assert worker.paused
+
+        worker.progress_updated.disconnect()
+        worker.resume()
+        worker.wait()
+
+        assert worker.points_processed == 20000
+        assert frames[-1].sum() == 20000
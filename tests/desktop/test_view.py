@@ -4,8 +4,11 @@ import pytest
 from unittest.mock import Mock, patch
 from PySide6.QtWidgets import QApplication
 from PySide6.QtCore import Qt
-from desktop_app.view import MainWindow, MonteCarloView
+from desktop_app.view import MainWindow, MonteCarloView, CIRCLE_POINT_ARGB, SQUARE_POINT_ARGB, MAX_POINTS
+from desktop_app.controller import AppController
+from desktop_app.model import DENSITY_MIN_POINTS
 import math
+import numpy as np
 
 
 @pytest.fixture(scope="session")
@@ -146,7 +149,9 @@ class TestMainWindow:
         window = MainWindow()
         
         assert window.points_spinbox.minimum() == 100
-        assert window.points_spinbox.maximum() == 1000000
+        assert window.points_spinbox.maximum() == MAX_POINTS
+        # Растр плотности по умолчанию достижим из интерфейса
+        assert MAX_POINTS >= DENSITY_MIN_POINTS
         assert window.points_spinbox.value() == 10000
 
     def test_get_points_count(self, qapp):
@@ -280,4 +285,174 @@ class TestMainWindow:
         # Проверяем форматирование малых чисел
         window.update_stats(1, 0, 0.0, 0.001)
         assert window.pi_label.text() == "0.000000"
-        assert window.time_label.text() == "0.001 с"
\ No newline at end of file
+        assert window.time_label.text() == "0.001 с"
+
+class TestBatchedRendering:
+    """Тесты пакетной отрисовки точек в одном слое"""
+
+    def test_scene_item_count_is_constant(self, qapp):
+        """Тест постоянного количества элементов сцены"""
+        view = MonteCarloView(batched=True)
+        items_before = len(view.scene.items())
+
+        rng = np.random.default_rng(0)
+        x = rng.uniform(-1, 1, 100000)
+        y = rng.uniform(-1, 1, 100000)
+        view.add_points(x, y, x * x + y * y <= 1.0)
+        view.add_point(0.5, 0.5, True)
+
+        assert len(view.scene.items()) == items_before
+        assert view.get_points_count() == 100001
+        assert view.circle_points_count == int(np.count_nonzero(x * x + y * y <= 1.0)) + 1
+
+    def test_points_drawn_into_layer(self, qapp):
+        """Тест записи точек в пиксели слоя"""
+        view = MonteCarloView(batched=True)
+        view.add_points(np.array([0.0, 0.9]), np.array([0.0, 0.9]), np.array([True, False]))
+
+        image = view.points_layer.image
+        center_x = int(view.center_x)
+        center_y = int(view.center_y)
+        assert image.pixel(center_x, center_y) == CIRCLE_POINT_ARGB
+        assert image.pixel(int(view.center_x + 0.9 * view.scale_x),
+                           int(view.center_y - 0.9 * view.scale_y)) == SQUARE_POINT_ARGB
+        assert image.pixel(10, 390) == 0
+
+    def test_points_on_border_are_clipped(self, qapp):
+        """Тест точек на краю квадрата"""
+        view = MonteCarloView(batched=True)
+        view.add_points(np.array([1.0, -1.0]), np.array([1.0, -1.0]), np.array([False, False]))
+
+        assert view.get_points_count() == 2
+        assert view.points_layer.image.pixel(399, 0) == SQUARE_POINT_ARGB
+
+    def test_clear(self, qapp):
+        """Тест очистки слоя"""
+        view = MonteCarloView(batched=True)
+        view.add_points(np.array([0.0]), np.array([0.0]), np.array([True]))
+
+        view.clear_points()
+
+        assert view.get_points_count() == 0
+        assert view.points_layer.image.pixel(int(view.center_x), int(view.center_y)) == 0
+
+    def test_switch_rendering_mode(self, qapp):
+        """Тест переключения режима отрисовки"""
+        view = MonteCarloView()
+        items_before = len(view.scene.items())
+
+        view.set_batched_rendering(True)
+        assert len(view.scene.items()) == items_before + 1
+
+        view.set_batched_rendering(False)
+        assert view.points_layer is None
+        assert len(view.scene.items()) == items_before
+
+        # Без слоя пачка рисуется отдельными элементами
+        view.add_points(np.array([0.1, 0.9]), np.array([0.1, 0.9]), np.array([True, False]))
+        assert len(view.scene.items()) == items_before + 2
+        assert view.circle_points_count == 1
+        assert view.square_points_count == 1
+
+    def test_pacing_controls(self, qapp):
+        """Тест выбора темпа расчета и последовательности точек"""
+        window = MainWindow()
+        assert window.get_pacing() == ('auto', None)
+        assert not window.pacing_spinbox.isEnabled()
+
+        window.pacing_combo.setCurrentIndex(window.pacing_combo.findData('duration'))
+        window.pacing_spinbox.setValue(5)
+        assert window.pacing_spinbox.isEnabled()
+        assert window.get_pacing() == ('duration', 5.0)
+
+        assert window.get_sampler() == 'random'
+        window.sampler_combo.setCurrentIndex(window.sampler_combo.findData('halton'))
+        assert window.get_sampler() == 'halton'
+
+        window.set_points_spinbox_enabled(False)
+        assert not window.sampler_combo.isEnabled()
+        assert not window.pacing_combo.isEnabled()
+        assert not window.pacing_spinbox.isEnabled()
+
+    def test_profile_toggle(self, qapp):
+        """Тест переключателя профилирования"""
+        window = MainWindow()
+        assert window.get_profile() is False
+
+        window.profile_checkbox.setChecked(True)
+        assert window.get_profile() is True
+
+        window.set_points_spinbox_enabled(False)
+        assert not window.profile_checkbox.isEnabled()
+
+    def test_main_window_uses_batched_view(self, qapp):
+        """Тест пакетной отрисовки в главном окне"""
+        window = MainWindow()
+        window.add_points_to_view(np.array([0.1]), np.array([0.1]), np.array([True]))
+
+        assert window.graphics_view.points_layer is not None
+        assert window.graphics_view.get_points_count() == 1
+
+
+class TestDensityRendering:
+    """Тесты отрисовки растра плотности точек"""
+
+    def test_density_drawn_into_layer(self, qapp):
+        """Тест: пиксель окрашен цветом своей плоскости, непрозрачность растет с количеством точек"""
+        view = MonteCarloView()
+        counts = np.zeros((2, 400, 400), dtype=np.uint32)
+        counts[0, 200, 200] = 1000
+        counts[0, 100, 200] = 1
+        counts[1, 0, 0] = 1000
+
+        view.set_density(counts)
+
+        image = view.points_layer.image
+        assert view.circle_points_count == 1001
+        assert view.square_points_count == 1000
+        assert image.pixel(200, 200) == CIRCLE_POINT_ARGB
+        assert image.pixel(0, 0) == SQUARE_POINT_ARGB
+        assert 0 < image.pixel(200, 100) >> 24 < 255
+        assert image.pixel(10, 390) == 0
+
+    def test_mixed_pixel(self, qapp):
+        """Тест смешения цветов в пикселе на границе круга"""
+        view = MonteCarloView(batched=True)
+        counts = np.zeros((2, 400, 400), dtype=np.uint32)
+        counts[:, 5, 5] = 10
+
+        view.set_density(counts)
+
+        red = (view.points_layer.image.pixel(5, 5) >> 16) & 0xFF
+        assert 0x70 <= red <= 0x90
+
+    def test_empty_density(self, qapp):
+        """Тест пустого растра"""
+        view = MonteCarloView(batched=True)
+        view.add_points(np.array([0.0]), np.array([0.0]), np.array([True]))
+
+        view.set_density(np.zeros((2, 400, 400), dtype=np.uint32))
+
+        assert view.get_points_count() == 0
+        assert view.points_layer.image.pixel(200, 200) == 0
+
+    @pytest.mark.parametrize("display, density", [("Точки", False), ("Растр плотности", True)])
+    def test_density_from_controls(self, qapp, display, density):
+        """Тест: выбор отображения в окне доходит через контроллер до расчета"""
+        window = MainWindow()
+        window.controller = AppController(window)
+        window.points_spinbox.setValue(20000)
+        window.pacing_combo.setCurrentIndex(window.pacing_combo.findData('max'))
+        window.display_combo.setCurrentIndex(window.display_combo.findText(display))
+        assert window.get_density() is density
+
+        window.on_start_clicked()
+        worker = window.controller.worker
+        worker.wait()
+        qapp.processEvents()
+
+        assert worker.density_active() is density
+        assert (worker.density_counts is not None) is density
+        if density:
+            assert int(worker.density_counts.sum()) == 20000
+            assert window.graphics_view.circle_points_count + window.graphics_view.square_points_count == 20000
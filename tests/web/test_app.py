@@ -0,0 +1,911 @@
+# tests/web/test_app.py
+"""Тесты для HTTP API веб-приложения"""
+import base64
+import gzip
+import json
+import subprocess
+import time
+
+import pytest
+import sys
+import os
+
+# Добавляем пути для импорта (app.py импортирует monte_carlo как модуль верхнего уровня)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../web_app')))
+
+from web_app import app as app_module
+from web_app.history import RunHistory
+from web_app.checkpoint import CheckpointStore
+from web_app.result_cache import ResultCache
+from web_app.profiling import ProfileStore
+from web_app.scheduler import JobScheduler
+from web_app.monte_carlo import MonteCarloCalculator, Pacer, MODE_VECTORIZED, PACING_MAX, DENSITY_MIN_POINTS
+import numpy as np
+
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    """Фикстура для тестового клиента Flask"""
+    use_tmp_storage(monkeypatch, tmp_path)
+    monkeypatch.setattr(app_module, 'history', RunHistory(str(tmp_path / 'history.sqlite3')))
+    monkeypatch.setattr(app_module, 'checkpoints', CheckpointStore(str(tmp_path / 'checkpoints')))
+    monkeypatch.setattr(app_module, 'result_cache', ResultCache())
+    monkeypatch.setattr(app_module, 'profiles', ProfileStore(str(tmp_path / 'profiles')))
+    monkeypatch.setattr(app_module, 'request_metrics', app_module.RequestMetrics())
+    scheduler = JobScheduler()
+    monkeypatch.setattr(app_module, 'scheduler', scheduler)
+    app_module.app.config['TESTING'] = True
+    app_module.app.config['STREAM_MAX_RATE'] = 1000
+    app_module.app.config['STREAM_IDLE_TIMEOUT'] = 0.05
+    with app_module.app.test_client() as client:
+        yield client
+    stop_calculations(scheduler)
+    app_module.calculations.clear()
+
+
+def use_tmp_storage(monkeypatch, tmp_path):
+    """Направить файлы приложения во временный каталог (на случай создания хранилищ по конфигурации)"""
+    monkeypatch.setitem(app_module.app.config, 'HISTORY_PATH', str(tmp_path / 'history.sqlite3'))
+    monkeypatch.setitem(app_module.app.config, 'CHECKPOINT_DIR', str(tmp_path / 'checkpoints'))
+    monkeypatch.setitem(app_module.app.config, 'PROFILE_DIR', str(tmp_path / 'profiles'))
+    monkeypatch.setitem(app_module.app.config, 'RESULT_CACHE_DIR', None)
+
+
+def stop_calculations(scheduler):
+    """Остановить расчеты и дождаться потоков планировщика
+
+    Вызывается до отмены подмен monkeypatch: иначе поток, досчитывающий
+    расчет, записал бы историю и контрольные точки в настоящие файлы приложения.
+    """
+    for calc_data in app_module.calculations.values():
+        calc_data['calculator'].stop()
+    scheduler.shutdown()
+
+
+def start(client, **params):
+    """Запустить расчет и вернуть ответ API"""
+    response = client.post('/api/start', json=params)
+    return response.get_json()
+
+
+def wait_finished(calc_id, timeout=10):
+    """Дождаться окончания расчета"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if app_module.calculations[calc_id]['status'] not in ('queued', 'running'):
+            return
+        time.sleep(0.01)
+    raise AssertionError("Расчет не завершился")
+
+
+def wait_until(condition, timeout=5):
+    """Дождаться выполнения условия"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return
+        time.sleep(0.01)
+    raise AssertionError("Условие не выполнилось")
+
+
+def parse_events(body):
+    """Разобрать тело ответа text/event-stream"""
+    return [json.loads(line[len('data: '):])
+            for chunk in body.split('\n\n') for line in chunk.split('\n') if line.startswith('data: ')]
+
+
+class TestStartAndStatus:
+    """Тесты запуска и получения статуса"""
+
+    def test_start(self, client):
+        """Тест запуска расчета"""
+        data = start(client, total_points=50000, seed=3)
+
+        assert data['success'] is True
+        assert data['seed'] == 3
+        assert data['calc_id'] in app_module.calculations
+
+    def test_unique_ids_within_millisecond(self, client, monkeypatch):
+        """Тест: расчеты, запущенные в одну миллисекунду, получают разные ID"""
+        monkeypatch.setattr(app_module.time, 'time', lambda: 1700000000.0)
+        first = start(client, total_points=1000, seed=1)
+        second = start(client, total_points=1000, seed=2)
+
+        assert first['calc_id'] != second['calc_id']
+        assert len(app_module.calculations) == 2
+
+    def test_status_built_without_global_lock(self, client, monkeypatch):
+        """Тест: статус собирается без calculation_lock и не блокирует другие расчеты"""
+        data = start(client, total_points=50000, seed=3)
+        wait_finished(data['calc_id'])
+
+        locked = []
+        points_as_dicts = app_module.points_as_dicts
+
+        def spy(*args):
+            locked.append(app_module.calculation_lock.locked())
+            return points_as_dicts(*args)
+
+        monkeypatch.setattr(app_module, 'points_as_dicts', spy)
+        status = client.get(f"/api/status/{data['calc_id']}").get_json()
+
+        assert locked == [False]
+        assert status['points_processed'] == 50000
+        assert status['progress'] == 100
+
+    @pytest.mark.parametrize("params", [
+        {'mode': 'unknown'},
+        {'workers': 0},
+        {'seed': -1},
+        {'workers': 'x'},
+        {'seed': 'abc'},
+        {'pacing': 'unknown'},
+        {'pacing': 'rate'},
+        {'pacing': 'duration', 'pacing_value': -1},
+        {'target_error': 0},
+        {'confidence': 1.5},
+        {'sampler': 'unknown'},
+        {'estimator': 'unknown'},
+        {'estimator': 'stratified', 'strata': 0},
+    ])
+    def test_start_invalid_params(self, client, params):
+        """Тест отклонения некорректных параметров"""
+        data = start(client, total_points=100, **params)
+        assert data['success'] is False
+
+    def test_start_sobol_over_limit(self, client):
+        """Тест: расчет Соболя больше чем на 2^32 точек отклоняется"""
+        data = start(client, total_points=2 ** 32 + 1, sampler='sobol')
+
+        assert data['success'] is False
+        assert len(app_module.calculations) == 0
+
+    @pytest.mark.parametrize("params", [
+        {'total_points': 'many'},
+        {'total_points': 100, 'workers': 'x'},
+        {'total_points': 100, 'seed': 'abc'},
+        {'total_points': 100, 'seed': [1]},
+        {'total_points': 100, 'confidence': [0.95]},
+    ])
+    def test_start_non_numeric_params(self, client, params):
+        """Тест: нечисловые количество точек, процессы и seed - ошибка запроса, а не 500"""
+        response = client.post('/api/start', json=params)
+
+        assert response.status_code == 200
+        assert response.get_json()['success'] is False
+        assert len(app_module.calculations) == 0
+
+    def test_status_completed(self, client):
+        """Тест статуса завершенного расчета"""
+        data = start(client, total_points=50000, seed=3)
+        wait_finished(data['calc_id'])
+
+        status = client.get(f"/api/status/{data['calc_id']}").get_json()
+        assert status['status'] == 'completed'
+        assert status['points_processed'] == 50000
+        assert status['seed'] == 3
+        assert status['pacing'] == {'mode': 'auto', 'value': None, 'rate': None}
+
+    def test_start_with_pacing(self, client):
+        """Тест запуска с заданной длительностью расчета"""
+        data = start(client, total_points=20000, pacing='duration', pacing_value=0.2)
+        wait_finished(data['calc_id'])
+
+        status = client.get(f"/api/status/{data['calc_id']}").get_json()
+        assert status['pacing'] == {'mode': 'duration', 'value': 0.2, 'rate': 100000}
+        assert status['elapsed_time'] >= 0.15
+
+    def test_start_with_target_error(self, client):
+        """Тест остановки по точности через API"""
+        data = start(client, total_points=10000000, seed=5, target_error=0.02, confidence=0.9)
+        wait_finished(data['calc_id'])
+
+        status = client.get(f"/api/status/{data['calc_id']}").get_json()
+        assert status['status'] == 'completed'
+        assert status['converged'] is True
+        assert status['points_processed'] < 10000000
+        assert status['ci_half_width'] < status['target_error'] == 0.02
+        assert status['confidence'] == 0.9
+        assert status['ci_low'] <= status['current_pi'] <= status['ci_high']
+
+    def test_status_not_found(self, client):
+        """Тест статуса несуществующего расчета"""
+        status = client.get('/api/status/missing').get_json()
+        assert status['status'] == 'not_found'
+
+
+class TestStream:
+    """Тесты потока статуса Server-Sent Events"""
+
+    def test_stream_until_completed(self, client):
+        """Тест потока событий до завершения расчета"""
+        data = start(client, total_points=500000)
+        response = client.get(f"/api/stream/{data['calc_id']}")
+
+        assert response.mimetype == 'text/event-stream'
+        events = parse_events(response.get_data(as_text=True))
+
+        assert len(events) >= 1
+        assert events[-1]['status'] == 'completed'
+        assert events[-1]['points_processed'] == 500000
+
+        processed = [event['points_processed'] for event in events]
+        assert processed == sorted(processed)
+
+    def test_stream_rate_limited(self, client):
+        """Тест ограничения частоты событий"""
+        app_module.app.config['STREAM_MAX_RATE'] = 20
+        data = start(client, total_points=5000)
+
+        started = time.time()
+        events = parse_events(client.get(f"/api/stream/{data['calc_id']}").get_data(as_text=True))
+        elapsed = time.time() - started
+
+        # Расчет с визуализацией обновляет результаты 50 раз, событий заметно меньше
+        assert events[-1]['status'] == 'completed'
+        assert len(events) <= elapsed * 20 + 2
+
+    def test_stream_not_found(self, client):
+        """Тест потока несуществующего расчета"""
+        events = parse_events(client.get('/api/stream/missing').get_data(as_text=True))
+        assert events == [{'status': 'not_found', 'message': 'Расчет не найден'}]
+
+
+class TestPackedPoints:
+    """Тесты двоичной передачи точек"""
+
+    def test_status_packed_points(self, client):
+        """Тест точек в формате base64 от pack_points"""
+        data = start(client, total_points=50000, seed=1)
+        wait_finished(data['calc_id'])
+
+        status = client.get(f"/api/status/{data['calc_id']}?points=packed").get_json()
+
+        assert 'points' not in status
+        count = status['points_count']
+        packed = base64.b64decode(status['points_packed'])
+        assert count == 1000
+        assert len(packed) == count * 8 + (count + 7) // 8
+
+    def test_status_json_points_by_default(self, client):
+        """Тест точек списком словарей без параметра points"""
+        data = start(client, total_points=50000, seed=1)
+        wait_finished(data['calc_id'])
+
+        status = client.get(f"/api/status/{data['calc_id']}").get_json()
+
+        assert 'points_packed' not in status
+        assert len(status['points']) == 1000
+        assert set(status['points'][0]) == {'x', 'y', 'in_circle'}
+
+    def test_stream_packed_points(self, client):
+        """Тест двоичных точек в потоке событий"""
+        data = start(client, total_points=50000)
+        events = parse_events(
+            client.get(f"/api/stream/{data['calc_id']}?points=packed").get_data(as_text=True)
+        )
+
+        # Вся выборка и ее замены, но каждая запись не больше одного раза
+        assert 1000 <= sum(event['points_count'] for event in events) <= events[-1]['points_cursor']
+        assert all('points' not in event for event in events)
+
+
+class TestPointsCursor:
+    """Тесты чтения выборки точек по курсору"""
+
+    def test_status_cursor(self, client):
+        """Тест: с курсором - только новые точки, без курсора - вся выборка каждому клиенту"""
+        data = start(client, total_points=50000, seed=1, pacing='max')
+        wait_finished(data['calc_id'])
+
+        first = client.get(f"/api/status/{data['calc_id']}").get_json()
+        second = client.get(f"/api/status/{data['calc_id']}").get_json()
+        again = client.get(f"/api/status/{data['calc_id']}?cursor={first['points_cursor']}").get_json()
+
+        assert len(first['points']) == 1000
+        assert second['points'] == first['points']
+        assert again['points'] == []
+        assert again['points_cursor'] == first['points_cursor']
+
+    def test_stream_event_ids(self, client):
+        """Тест курсора выборки в поле id событий и продолжения по Last-Event-ID"""
+        data = start(client, total_points=20000, seed=1, pacing='max')
+        wait_finished(data['calc_id'])
+
+        body = client.get(f"/api/stream/{data['calc_id']}?points=packed").get_data(as_text=True)
+        events = parse_events(body)
+        assert f"id: {events[-1]['points_cursor']}\n" in body
+
+        body = client.get(f"/api/stream/{data['calc_id']}?points=packed",
+                          headers={'Last-Event-ID': str(events[-1]['points_cursor'])}).get_data(as_text=True)
+        assert parse_events(body)[-1]['points_count'] == 0
+
+
+class TestDensity:
+    """Тесты растра плотности точек"""
+
+    def test_density_frame(self, client):
+        """Тест полного растра и полей статуса"""
+        data = start(client, total_points=20000, seed=1, pacing='max', density=True)
+        assert data['density'] is True
+        wait_finished(data['calc_id'])
+
+        status = client.get(f"/api/status/{data['calc_id']}").get_json()
+        response = client.get(f"/api/density/{data['calc_id']}")
+
+        assert status['density'] is True
+        assert response.status_code == 200
+        assert response.headers['X-Density-Base'] == '0'
+        assert response.headers['X-Density-Version'] == str(status['density_version'])
+        size = int(response.headers['X-Density-Size'])
+        counts = np.frombuffer(response.data, dtype=response.headers['X-Density-Dtype'])
+        assert counts.shape == (2 * size * size,)
+        assert counts.sum() == 20000
+        assert counts[:size * size].sum() == status['points_in_circle']
+
+    def test_density_controls(self, client):
+        """Тест: страница позволяет выбрать отображение и количество точек, при котором растр копится сам"""
+        page = client.get('/').get_data(as_text=True)
+        script = client.get('/static/script.js').get_data(as_text=True)
+
+        assert '<select id="displayMode">' in page
+        assert 'value="density"' in page and 'value="points"' in page
+        assert f'id="pointsCount" min="100" max="{10 ** 9}"' in page
+        assert 'request.density = display ===' in script
+        assert f'const MAX_POINTS = {10 ** 9};' in script
+
+    @pytest.mark.parametrize("density, expected", [(None, True), (False, False)])
+    def test_density_request(self, client, density, expected):
+        """Тест запроса, который страница отправляет для больших расчетов (без поля density - авто)"""
+        params = {} if density is None else {'density': density}
+        data = start(client, total_points=DENSITY_MIN_POINTS, seed=1, pacing='rate', pacing_value=1000, **params)
+        client.post(f"/api/stop/{data['calc_id']}")
+
+        assert data['density'] is expected
+
+    def test_density_delta(self, client):
+        """Тест прироста с ранее полученного кадра"""
+        data = start(client, total_points=20000, seed=1, pacing='max', density=True)
+        calculator = app_module.calculations.get(data['calc_id'])['calculator']
+        wait_finished(data['calc_id'])
+
+        first = client.get(f"/api/density/{data['calc_id']}")
+        # Новые точки после отданного кадра
+        x = np.zeros(10)
+        calculator.density.add(x, x, x == 0)
+        second = client.get(f"/api/density/{data['calc_id']}?base={first.headers['X-Density-Version']}")
+
+        assert second.headers['X-Density-Base'] == first.headers['X-Density-Version']
+        delta = np.frombuffer(second.data, dtype=second.headers['X-Density-Dtype'])
+        assert delta.sum() == 10
+
+    def test_density_gzip(self, client):
+        """Тест сжатия для клиентов, принимающих gzip"""
+        data = start(client, total_points=20000, seed=1, pacing='max', density=True)
+        wait_finished(data['calc_id'])
+
+        response = client.get(f"/api/density/{data['calc_id']}", headers={'Accept-Encoding': 'gzip'})
+
+        assert response.headers['Content-Encoding'] == 'gzip'
+        counts = np.frombuffer(gzip.decompress(response.data), dtype=response.headers['X-Density-Dtype'])
+        assert counts.sum() == 20000
+
+    def test_no_density_after_cache_hit(self, client):
+        """Тест: расчет из кэша не показывает растр только из точек предпросмотра"""
+        first = start(client, total_points=20000, seed=1, pacing='max', density=True)
+        wait_finished(first['calc_id'])
+        wait_until(lambda: app_module.result_cache.stats()['entries'] == 1)
+
+        data = start(client, total_points=20000, seed=1, pacing='max', density=True)
+        wait_finished(data['calc_id'])
+
+        assert data['cached_points'] == 20000
+        assert data['density'] is False
+        assert client.get(f"/api/density/{data['calc_id']}").status_code == 404
+        assert client.get(f"/api/status/{data['calc_id']}").get_json()['points_cursor'] > 0
+
+    def test_density_not_found(self, client):
+        """Тест неизвестного расчета и расчета без растра"""
+        assert client.get('/api/density/123').status_code == 404
+
+        data = start(client, total_points=1000, pacing='max')
+        assert data['density'] is False
+        assert client.get(f"/api/density/{data['calc_id']}").status_code == 404
+        assert client.get(f"/api/status/{data['calc_id']}").get_json()['density_version'] is None
+
+    def test_scalar_density_rejected(self, client):
+        """Тест: растр у расчета по одной точке не копится"""
+        response = client.post('/api/start', json={'total_points': 1000, 'mode': 'scalar', 'density': True})
+        assert response.get_json()['success'] is False
+
+
+class TestRegistry:
+    """Тесты ограничения реестра расчетов"""
+
+    def test_registry_stats(self, client):
+        """Тест счетчиков реестра"""
+        data = start(client, total_points=50000)
+        wait_finished(data['calc_id'])
+        client.get(f"/api/status/{data['calc_id']}")
+
+        stats = client.get('/api/registry').get_json()
+        assert stats['jobs'] == 1
+        assert stats['finished'] == 1
+        assert stats['results'] == 1
+        assert stats['bytes'] > 0
+
+    def test_start_rejected_when_full(self, client):
+        """Тест отказа в запуске, когда реестр заполнен выполняющимися расчетами"""
+        max_jobs = app_module.calculations.max_jobs
+        app_module.calculations.max_jobs = 1
+        try:
+            first = start(client, total_points=10000)
+            time.sleep(0.002)
+            response = client.post('/api/start', json={'total_points': 10000})
+        finally:
+            app_module.calculations.max_jobs = max_jobs
+            client.post(f"/api/stop/{first['calc_id']}")
+
+        assert first['success'] is True
+        # Клиент повторяет запрос позже, как при заполненной очереди планировщика
+        assert response.status_code == 503
+        assert response.get_json()['success'] is False
+        assert int(response.headers['Retry-After']) == response.get_json()['retry_after'] >= 1
+
+
+class TestHistory:
+    """Тесты истории расчетов"""
+
+    def wait_recorded(self, calc_id, timeout=10):
+        """Дождаться записи расчета в историю"""
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            entry = app_module.history.get(calc_id)
+            if entry is not None:
+                return entry
+            time.sleep(0.01)
+        raise AssertionError("Расчет не попал в историю")
+
+    def test_finished_run_is_recorded(self, client):
+        """Тест записи завершенного расчета"""
+        data = start(client, total_points=50000, seed=9)
+        entry = self.wait_recorded(data['calc_id'])
+
+        assert entry['status'] == 'completed'
+        assert entry['total_points'] == 50000
+        assert entry['points_processed'] == 50000
+        assert entry['seed'] == 9
+        assert entry['mode'] == 'vectorized'
+        assert entry['error'] == abs(entry['final_pi'] - 3.141592653589793)
+        assert entry['throughput'] > 0
+
+        history = client.get('/api/history').get_json()
+        assert [item['id'] for item in history] == [data['calc_id']]
+
+    def test_sampler_is_recorded(self, client):
+        """Тест последовательности точек в статусе и истории"""
+        data = start(client, total_points=50000, seed=9, sampler='sobol')
+        entry = self.wait_recorded(data['calc_id'])
+
+        status = client.get(f"/api/status/{data['calc_id']}").get_json()
+        assert status['sampler'] == 'sobol'
+        assert status['mc_error'] > 0
+        assert entry['sampler'] == 'sobol'
+
+    def test_estimator_is_recorded(self, client):
+        """Тест оценки и ее дисперсии в статусе и истории"""
+        data = start(client, total_points=50000, seed=9, estimator='stratified', strata=8)
+        entry = self.wait_recorded(data['calc_id'])
+
+        status = client.get(f"/api/status/{data['calc_id']}").get_json()
+        assert status['estimator'] == 'stratified'
+        assert 0 < status['variance'] < 16 * 0.25
+        assert status['std_error'] > 0
+        assert entry['estimator'] == 'stratified'
+
+    def test_history_pagination(self, client):
+        """Тест постраничной выдачи истории"""
+        for i in range(5):
+            app_module.history.record({
+                'id': str(i), 'status': 'completed', 'total_points': 100,
+                'points_processed': 100, 'final_pi': 3.0, 'error': 0.14,
+                'time_spent': 1.0, 'seed': i, 'mode': 'vectorized', 'throughput': 100.0
+            })
+
+        first = client.get('/api/history?limit=2').get_json()
+        second = client.get(f"/api/history?limit=2&before={first[-1]['seq']}").get_json()
+
+        assert [item['id'] for item in first] == ['4', '3']
+        assert [item['id'] for item in second] == ['2', '1']
+
+
+class TestCheckpoints:
+    """Тесты продолжения прерванных расчетов"""
+
+    @staticmethod
+    def interrupted_state(total_points=200000):
+        """Контрольная точка расчета, прерванного на первом блоке"""
+        calculator = MonteCarloCalculator(total_points, mode=MODE_VECTORIZED, chunk_size=20000,
+                                          seed=4, pacer=Pacer(PACING_MAX))
+        saved = []
+
+        def on_checkpoint(state):
+            saved.append(state)
+            calculator.stop()
+
+        calculator.on_checkpoint = on_checkpoint
+        calculator.checkpoint_interval = 0
+        calculator.calculate()
+        return saved[0]
+
+    def test_finished_run_leaves_no_checkpoint(self, client):
+        """Тест удаления контрольной точки после завершения расчета"""
+        data = start(client, total_points=50000, seed=1)
+        TestHistory().wait_recorded(data['calc_id'])
+
+        assert app_module.checkpoints.load(data['calc_id']) is None
+        assert client.get('/api/checkpoints').get_json() == []
+
+    def test_resume(self, client):
+        """Тест продолжения расчета с контрольной точки"""
+        state = self.interrupted_state()
+        app_module.checkpoints.save('crashed', state)
+
+        listed = client.get('/api/checkpoints').get_json()
+        assert [item['id'] for item in listed] == ['crashed']
+        assert listed[0]['points_processed'] == state['points_processed']
+
+        data = client.post('/api/resume/crashed').get_json()
+        assert data['success'] is True
+        assert data['points_processed'] == state['points_processed']
+
+        entry = TestHistory().wait_recorded('crashed')
+        whole = MonteCarloCalculator(200000, mode=MODE_VECTORIZED, seed=4, pacer=Pacer(PACING_MAX))
+        whole.calculate()
+
+        assert entry['points_processed'] == 200000
+        assert entry['final_pi'] == pytest.approx(whole.pi_estimate)
+        assert app_module.checkpoints.load('crashed') is None
+
+    def test_failed_run(self, client, monkeypatch):
+        """Тест: упавший расчет получает статус failed, освобождает место и продолжается с контрольной точки"""
+        def fail(calculator):
+            calculator.points_processed = calculator.points_in_circle = 1000
+            calculator.completed = [[0, 1000]]
+            raise OSError("Диск недоступен")
+
+        # app.py импортирует monte_carlo как модуль верхнего уровня
+        with monkeypatch.context() as patch:
+            patch.setattr(app_module.MonteCarloCalculator, '_calculate_vectorized', fail)
+            data = start(client, total_points=50000, seed=1, cache=False)
+            entry = TestHistory().wait_recorded(data['calc_id'])
+
+        assert entry['status'] == 'failed'
+        assert client.get(f"/api/status/{data['calc_id']}").get_json()['status'] == 'failed'
+        assert app_module.calculations.stats()['running'] == 0
+        listed = client.get('/api/checkpoints').get_json()
+        assert [item['id'] for item in listed] == [data['calc_id']]
+        assert listed[0]['points_processed'] == 1000
+
+        resumed = client.post(f"/api/resume/{data['calc_id']}").get_json()
+        assert resumed['success'] is True
+        assert resumed['points_processed'] == 1000
+
+    @pytest.mark.parametrize("calc_id", ['missing', '..'])
+    def test_resume_missing(self, client, calc_id):
+        """Тест продолжения без контрольной точки"""
+        data = client.post(f'/api/resume/{calc_id}').get_json()
+
+        assert data['success'] is False
+
+    def test_resume_invalid_checkpoint(self, client):
+        """Тест продолжения с некорректной контрольной точкой"""
+        app_module.checkpoints.save('broken', {'version': 1})
+
+        data = client.post('/api/resume/broken').get_json()
+
+        assert data['success'] is False
+
+
+class TestResultCache:
+    """Тесты кэша результатов расчетов с seed"""
+
+    @staticmethod
+    def run(client, **params):
+        """Выполнить расчет до конца и вернуть ответ запуска и запись истории"""
+        data = start(client, pacing='max', **params)
+        return data, TestHistory().wait_recorded(data['calc_id'])
+
+    def test_repeat_is_served_from_cache(self, client):
+        """Тест мгновенного повтора расчета с тем же seed"""
+        first, first_entry = self.run(client, total_points=100000, seed=6)
+        second, second_entry = self.run(client, total_points=100000, seed=6)
+
+        assert first['cached_points'] is None
+        assert second['cached_points'] == 100000
+        assert second_entry['final_pi'] == first_entry['final_pi']
+        assert second_entry['points_processed'] == 100000
+        # Точки из кэша не посчитаны заново и в скорость не входят
+        assert second_entry['throughput'] == 0.0
+
+        status = client.get(f"/api/status/{second['calc_id']}").get_json()
+        assert status['points_processed'] == 100000
+        assert not status['average_throughput']
+        assert len(status['points']) > 0
+        assert client.get('/api/cache').get_json()['hits'] == 1
+
+    def test_larger_run_continues_cached_prefix(self, client):
+        """Тест продолжения большего расчета с результата меньшего"""
+        self.run(client, total_points=100000, seed=6, estimator='stratified')
+        data, entry = self.run(client, total_points=250000, seed=6, estimator='stratified')
+        _, uncached = self.run(client, total_points=250000, seed=6, estimator='stratified', cache=False)
+
+        assert data['cached_points'] == 100000
+        assert entry['points_processed'] == 250000
+        assert entry['final_pi'] == pytest.approx(uncached['final_pi'])
+        assert entry['throughput'] == pytest.approx(150000 / entry['time_spent'])
+        assert client.get('/api/cache').get_json()['prefix_hits'] == 1
+
+    @pytest.mark.parametrize("params", [
+        {'seed': 6, 'sampler': 'sobol'},
+        {'seed': 7},
+        {'seed': 6, 'cache': False},
+        {'seed': 6, 'target_error': 0.01},
+        {},
+    ])
+    def test_not_served_from_cache(self, client, params):
+        """Тест расчетов, которые не берутся из кэша"""
+        self.run(client, total_points=100000, seed=6)
+        data, _ = self.run(client, total_points=100000, **params)
+
+        assert data['cached_points'] is None
+
+
+class TestScheduler:
+    """Тесты очереди расчетов"""
+
+    @pytest.fixture
+    def single_worker(self, monkeypatch):
+        """Планировщик с одним потоком и очередью из одного расчета"""
+        scheduler = app_module.JobScheduler(workers=1, max_queue=1, max_per_client=3)
+        monkeypatch.setattr(app_module, 'scheduler', scheduler)
+        yield scheduler
+        stop_calculations(scheduler)
+
+    @staticmethod
+    def start_slow(client):
+        """Запустить расчет, который выполняется около секунды"""
+        data = start(client, total_points=1000, seed=1, pacing='duration', pacing_value=1)
+        time.sleep(0.002)
+        return data
+
+    def test_queued_status_and_position(self, client, single_worker):
+        """Тест статуса queued с позицией в очереди"""
+        first = self.start_slow(client)
+        second = self.start_slow(client)
+
+        assert first['queue_position'] == 1
+        assert second['queue_position'] == 1
+
+        status = client.get(f"/api/status/{second['calc_id']}").get_json()
+        assert status['status'] == 'queued'
+        assert status['queue_position'] == 1
+        assert client.get('/api/scheduler').get_json()['queued'] == 1
+
+        wait_finished(second['calc_id'])
+        assert app_module.calculations[second['calc_id']]['status'] == 'completed'
+
+    def test_queue_full(self, client, single_worker):
+        """Тест отказа 503 с Retry-After при заполненной очереди"""
+        self.start_slow(client)
+        self.start_slow(client)
+
+        response = client.post('/api/start', json={'total_points': 1000})
+        data = response.get_json()
+
+        assert response.status_code == 503
+        assert data['success'] is False
+        assert int(response.headers['Retry-After']) == data['retry_after'] >= 1
+        assert len(app_module.calculations) == 2
+
+    def test_cache_hit_skips_queue(self, client, single_worker):
+        """Тест: результат целиком из кэша не ждет в очереди и не занимает в ней место"""
+        cached = start(client, total_points=10000, seed=6, pacing='max')
+        wait_finished(cached['calc_id'])
+        wait_until(lambda: app_module.result_cache.stats()['entries'] == 1)
+        self.start_slow(client)
+        self.start_slow(client)
+
+        response = client.post('/api/start', json={'total_points': 10000, 'seed': 6})
+        data = response.get_json()
+
+        assert response.status_code == 200
+        assert data['cached_points'] == 10000
+        assert data['queue_position'] is None
+        status = client.get(f"/api/status/{data['calc_id']}").get_json()
+        assert status['status'] == 'completed'
+        assert status['points_processed'] == 10000
+        assert app_module.history.get(data['calc_id'])['status'] == 'completed'
+        assert client.get('/api/scheduler').get_json()['queued'] == 1
+
+    def test_client_limit(self, client, monkeypatch):
+        """Тест отказа 429 при превышении лимита расчетов клиента"""
+        scheduler = app_module.JobScheduler(workers=1, max_per_client=1)
+        monkeypatch.setattr(app_module, 'scheduler', scheduler)
+        try:
+            self.start_slow(client)
+            response = client.post('/api/start', json={'total_points': 1000})
+        finally:
+            stop_calculations(scheduler)
+
+        assert response.status_code == 429
+        assert 'Retry-After' in response.headers
+
+    def test_stop_queued(self, client, single_worker):
+        """Тест остановки ожидающего расчета"""
+        self.start_slow(client)
+        queued = self.start_slow(client)
+
+        client.post(f"/api/stop/{queued['calc_id']}")
+
+        assert single_worker.stats()['queued'] == 0
+        status = client.get(f"/api/status/{queued['calc_id']}").get_json()
+        assert status['status'] == 'stopped'
+        assert status['points_processed'] == 0
+
+    def test_stop_running_frees_worker(self, client, single_worker):
+        """Тест: остановка прерывает выполняющийся расчет и освобождает поток"""
+        running = start(client, total_points=100000, seed=1, pacing='duration', pacing_value=30)
+        wait_until(lambda: single_worker.stats()['running'] == 1)
+        time.sleep(0.2)
+
+        client.post(f"/api/stop/{running['calc_id']}")
+        wait_until(lambda: single_worker.stats()['running'] == 0, timeout=2)
+
+        record = TestHistory().wait_recorded(running['calc_id'])
+        assert record['status'] == 'stopped'
+        assert 0 < record['points_processed'] < 100000
+        status = client.get(f"/api/status/{running['calc_id']}").get_json()
+        assert status['status'] == 'stopped'
+        assert status['progress'] < 100
+
+    def test_stop_finished_keeps_status(self, client):
+        """Тест: остановка завершенного расчета не меняет его статус"""
+        data = start(client, total_points=1000, seed=1, pacing='max')
+        wait_finished(data['calc_id'])
+
+        client.post(f"/api/stop/{data['calc_id']}")
+
+        assert app_module.calculations[data['calc_id']]['status'] == 'completed'
+
+    def test_invalid_priority(self, client):
+        """Тест некорректного приоритета"""
+        data = start(client, total_points=1000, priority='high')
+
+        assert data['success'] is False
+
+
+class TestMetrics:
+    """Тесты метрик расчетов и сервера"""
+
+    def test_status_instrumentation(self, client):
+        """Тест скорости и времени блоков в статусе"""
+        data = start(client, total_points=50000, seed=1, pacing='max')
+        wait_finished(data['calc_id'])
+
+        status = client.get(f"/api/status/{data['calc_id']}").get_json()
+
+        assert status['average_throughput'] > 0
+        assert status['chunk_time']['count'] > 0
+        assert status['lock_wait']['count'] > 0
+
+    def test_metrics_endpoint(self, client):
+        """Тест метрик в текстовом формате Prometheus"""
+        data = start(client, total_points=50000, seed=1, pacing='max')
+        wait_finished(data['calc_id'])
+        client.get(f"/api/status/{data['calc_id']}")
+
+        response = client.get('/api/metrics')
+        text = response.get_data(as_text=True)
+        lines = text.splitlines()
+
+        assert response.status_code == 200
+        assert response.content_type.startswith('text/plain; version=0.0.4')
+        assert 'montecarlo_jobs{status="completed"} 1' in lines
+        assert 'montecarlo_scheduler_queue_depth 0' in lines
+        assert 'montecarlo_points_processed 50000' in lines
+        assert any(line.startswith('montecarlo_chunk_seconds_count ') for line in lines)
+        assert any(line.startswith('montecarlo_lock_wait_seconds_count{lock="calculation"}') for line in lines)
+        assert 'montecarlo_http_requests_total{endpoint="get_status",code="200"} 1' in lines
+        assert any(line.startswith('montecarlo_http_request_duration_seconds_count{endpoint="start_calculation"}')
+                   for line in lines)
+
+    def test_stream_bytes_counted(self, client):
+        """Тест учета байтов потока событий"""
+        data = start(client, total_points=1000, seed=1, pacing='max')
+        wait_finished(data['calc_id'])
+        body = client.get(f"/api/stream/{data['calc_id']}").get_data()
+
+        _, _, sent = app_module.request_metrics.snapshot()
+        assert sent['stream_status'] >= len(body)
+
+
+class TestProfile:
+    """Тесты профилирования расчетов"""
+
+    def test_profiled_run(self, client):
+        """Тест профиля расчета: файл pstats и текстовый отчет"""
+        data = start(client, total_points=20000, seed=1, pacing='max', profile=True)
+        assert data['profile'] is True
+        wait_finished(data['calc_id'])
+        wait_until(lambda: app_module.profiles.exists(data['calc_id']))
+
+        status = client.get(f"/api/status/{data['calc_id']}").get_json()
+        assert status['profile'] is True
+
+        response = client.get(f"/api/profile/{data['calc_id']}")
+        assert response.status_code == 200
+        assert f"{data['calc_id']}.pstats" in response.headers['Content-Disposition']
+        assert response.get_data() == open(app_module.profiles.path(data['calc_id']), 'rb').read()
+
+        response = client.get(f"/api/profile/{data['calc_id']}?format=text&sort=tottime&lines=5")
+        assert response.status_code == 200
+        assert response.content_type.startswith('text/plain')
+        assert 'function calls' in response.get_data(as_text=True)
+
+        response = client.get(f"/api/profile/{data['calc_id']}?format=text&sort=unknown")
+        assert response.status_code == 400
+
+    def test_profiled_run_skips_cache(self, client):
+        """Тест: профилируемый расчет не берется из кэша результатов"""
+        first = start(client, total_points=20000, seed=1, pacing='max')
+        wait_finished(first['calc_id'])
+
+        data = start(client, total_points=20000, seed=1, pacing='max', profile=True)
+
+        assert data['cached_points'] is None
+
+    def test_without_profile(self, client):
+        """Тест расчета без профилирования"""
+        data = start(client, total_points=1000, seed=1, pacing='max')
+        wait_finished(data['calc_id'])
+
+        response = client.get(f"/api/profile/{data['calc_id']}")
+
+        assert response.status_code == 404
+        assert response.get_json()['message'] == 'Профиль не найден'
+
+    def test_profile_pending(self, client):
+        """Тест профиля незавершенного расчета"""
+        data = start(client, total_points=100000, seed=1, pacing='duration', pacing_value=30, profile=True)
+
+        response = client.get(f"/api/profile/{data['calc_id']}")
+
+        assert response.status_code == 404
+        assert response.get_json()['message'] == 'Профиль появится после окончания расчета'
+
+    def test_invalid_id(self, client):
+        """Тест некорректного идентификатора"""
+        assert client.get('/api/profile/.hidden').status_code == 400
+
+
+class TestLazyServices:
+    """Тесты создания истории, хранилищ и планировщика при первом обращении"""
+
+    def test_import_has_no_side_effects(self, tmp_path):
+        """Тест: импорт приложения не запускает потоки, а ключи конфигурации после импорта действуют"""
+        history_path = tmp_path / 'history.sqlite3'
+        code = (
+            "import threading\n"
+            "before = threading.active_count()\n"
+            "import app\n"
+            "assert threading.active_count() == before\n"
+            "assert app.history._instance is None and app.scheduler._instance is None\n"
+            f"app.app.config['HISTORY_PATH'] = {str(history_path)!r}\n"
+            "assert app.history.get('missing') is None\n"
+        )
+        web_dir = os.path.join(os.path.dirname(__file__), '../../web_app')
+        subprocess.run([sys.executable, '-c', code], cwd=web_dir, check=True)
+
+        assert history_path.exists()
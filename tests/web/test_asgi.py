@@ -0,0 +1,268 @@
+# tests/web/test_asgi.py
+"""Тесты для асинхронного режима веб-приложения (ASGI)"""
+import asyncio
+import json
+import threading
+import time
+
+import pytest
+import sys
+import os
+
+# Добавляем путь для импорта (asgi.py импортирует app как модуль верхнего уровня)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../web_app')))
+
+import asgi
+from history import RunHistory
+from checkpoint import CheckpointStore
+from result_cache import ResultCache
+from profiling import ProfileStore
+from scheduler import JobScheduler
+
+
+@pytest.fixture
+def web(monkeypatch, tmp_path):
+    """Фикстура для модуля приложения, который обслуживает ASGI"""
+    monkeypatch.setitem(asgi.web.app.config, 'HISTORY_PATH', str(tmp_path / 'history.sqlite3'))
+    monkeypatch.setitem(asgi.web.app.config, 'CHECKPOINT_DIR', str(tmp_path / 'checkpoints'))
+    monkeypatch.setitem(asgi.web.app.config, 'PROFILE_DIR', str(tmp_path / 'profiles'))
+    monkeypatch.setattr(asgi.web, 'history', RunHistory(str(tmp_path / 'history.sqlite3')))
+    monkeypatch.setattr(asgi.web, 'checkpoints', CheckpointStore(str(tmp_path / 'checkpoints')))
+    monkeypatch.setattr(asgi.web, 'result_cache', ResultCache())
+    monkeypatch.setattr(asgi.web, 'profiles', ProfileStore(str(tmp_path / 'profiles')))
+    scheduler = JobScheduler()
+    monkeypatch.setattr(asgi.web, 'scheduler', scheduler)
+    asgi.web.app.config['STREAM_MAX_RATE'] = 1000
+    asgi.web.app.config['STREAM_IDLE_TIMEOUT'] = 0.05
+    yield asgi.web
+    # Потоки планировщика дожидаются до отмены подмен, чтобы не писать в настоящие файлы приложения
+    for calc_data in asgi.web.calculations.values():
+        calc_data['calculator'].stop()
+    scheduler.shutdown()
+    asgi.web.calculations.clear()
+
+
+async def call(method, path, query='', body=b'', headers=()):
+    """Выполнить запрос к ASGI-приложению: статус, заголовки и тело ответа"""
+    scope = {
+        'type': 'http',
+        'method': method,
+        'path': path,
+        'query_string': query.encode('latin-1'),
+        'headers': [(b'content-type', b'application/json')] + list(headers),
+        'client': ('127.0.0.1', 50000),
+        'server': ('localhost', 5000)
+    }
+    requests = [{'type': 'http.request', 'body': body, 'more_body': False}]
+    finished = asyncio.Event()
+    messages = []
+
+    async def receive():
+        if requests:
+            return requests.pop(0)
+        await finished.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        messages.append(message)
+        if message['type'] == 'http.response.body' and not message.get('more_body', False):
+            finished.set()
+
+    await asgi.app(scope, receive, send)
+    finished.set()
+
+    start = messages[0]
+    content = b''.join(message.get('body', b'') for message in messages[1:])
+    return start['status'], dict(start['headers']), content
+
+
+def request(method, path, **kwargs):
+    """Синхронная обертка над call"""
+    return asyncio.run(call(method, path, **kwargs))
+
+
+def start(**params):
+    """Запустить расчет через ASGI и вернуть ответ API"""
+    _, _, content = request('POST', '/api/start', body=json.dumps(params).encode('utf-8'))
+    return json.loads(content)
+
+
+def parse_events(body):
+    """Разобрать тело ответа text/event-stream"""
+    return [json.loads(line[len('data: '):])
+            for chunk in body.decode('utf-8').split('\n\n') for line in chunk.split('\n') if line.startswith('data: ')]
+
+
+def wait_finished(web, calc_id, timeout=10):
+    """Дождаться окончания расчета"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if web.calculations[calc_id]['status'] not in ('queued', 'running'):
+            return
+        time.sleep(0.01)
+    raise AssertionError("Расчет не завершился")
+
+
+class TestRoutes:
+    """Тесты маршрутов API в асинхронном режиме"""
+
+    def test_index_forwarded_to_flask(self, web):
+        """Тест главной страницы через приложение Flask"""
+        status, headers, content = request('GET', '/')
+
+        assert status == 200
+        assert headers[b'content-type'].startswith(b'text/html')
+        assert content
+
+    def test_start_status_and_stop(self, web):
+        """Тест запуска, статуса и остановки в прежнем формате API"""
+        data = start(total_points=100000, seed=2, pacing='duration', pacing_value=30)
+        assert data['success'] is True
+
+        status, headers, content = request('GET', f"/api/status/{data['calc_id']}")
+        result = json.loads(content)
+        assert status == 200
+        assert headers[b'content-type'] == b'application/json'
+        assert result['status'] in ('queued', 'running')
+        assert result['seed'] == 2
+
+        _, _, content = request('POST', f"/api/stop/{data['calc_id']}")
+        assert json.loads(content)['success'] is True
+        wait_finished(web, data['calc_id'])
+        assert web.calculations[data['calc_id']]['status'] == 'stopped'
+
+    def test_status_not_found(self, web):
+        """Тест статуса неизвестного расчета"""
+        _, _, content = request('GET', '/api/status/unknown')
+
+        assert json.loads(content)['status'] == 'not_found'
+
+    def test_status_does_not_block_loop(self, web):
+        """Тест: пока статус ждет calculation_lock, цикл событий продолжает работать"""
+        ticks = []
+
+        async def tick():
+            while True:
+                ticks.append(time.monotonic())
+                await asyncio.sleep(0.01)
+
+        async def status_while_locked():
+            ticker = asyncio.ensure_future(tick())
+            web.calculation_lock.acquire()
+            threading.Timer(0.2, web.calculation_lock.release).start()
+            try:
+                return await call('GET', '/api/status/unknown')
+            finally:
+                ticker.cancel()
+
+        _, _, content = asyncio.run(status_while_locked())
+
+        assert json.loads(content)['status'] == 'not_found'
+        assert len(ticks) > 5
+
+    def test_packed_points(self, web):
+        """Тест двоичного формата точек"""
+        data = start(total_points=5000, seed=1, pacing='max')
+        wait_finished(web, data['calc_id'])
+
+        _, _, content = request('GET', f"/api/status/{data['calc_id']}", query='points=packed')
+        result = json.loads(content)
+
+        assert 'points_packed' in result
+        assert result['points_count'] > 0
+
+    def test_points_cursor(self, web):
+        """Тест курсора выборки точек: параметр cursor и заголовок Last-Event-ID"""
+        data = start(total_points=5000, seed=1, pacing='max')
+        wait_finished(web, data['calc_id'])
+
+        _, _, content = request('GET', f"/api/status/{data['calc_id']}", query='points=packed')
+        cursor = json.loads(content)['points_cursor']
+        _, _, content = request('GET', f"/api/status/{data['calc_id']}", query=f'points=packed&cursor={cursor}')
+        assert json.loads(content)['points_count'] == 0
+
+        _, _, content = request('GET', f"/api/stream/{data['calc_id']}", query='points=packed',
+                                headers=[(b'last-event-id', str(cursor).encode('latin-1'))])
+        assert parse_events(content)[-1]['points_count'] == 0
+        assert f'id: {cursor}'.encode('latin-1') in content
+
+
+class TestStream:
+    """Тесты потока статуса в асинхронном режиме"""
+
+    def test_stream_until_completed(self, web):
+        """Тест событий до завершения расчета"""
+        data = start(total_points=50000, seed=4, pacing='duration', pacing_value=0.3)
+        status, headers, content = request('GET', f"/api/stream/{data['calc_id']}")
+        events = parse_events(content)
+
+        assert status == 200
+        assert headers[b'content-type'].startswith(b'text/event-stream')
+        assert events[-1]['status'] == 'completed'
+        assert events[-1]['points_processed'] == 50000
+
+    def test_stream_not_found(self, web):
+        """Тест потока неизвестного расчета"""
+        _, _, content = request('GET', '/api/stream/unknown')
+
+        assert parse_events(content) == [{'status': 'not_found', 'message': 'Расчет не найден'}]
+
+    def test_many_viewers_without_threads(self, web):
+        """Тест: зрители потока не занимают по потоку на подключение"""
+        data = start(total_points=50000, seed=5, pacing='duration', pacing_value=0.5)
+        threads = threading.active_count()
+        peak = []
+
+        async def watch_all():
+            viewers = [asyncio.ensure_future(call('GET', f"/api/stream/{data['calc_id']}")) for _ in range(200)]
+            await asyncio.sleep(0.2)
+            peak.append(threading.active_count())
+            return await asyncio.gather(*viewers)
+
+        responses = asyncio.run(watch_all())
+
+        assert peak[0] - threads < 5
+        assert all(parse_events(content)[-1]['status'] == 'completed' for _, _, content in responses)
+
+
+class TestWaitForUpdate:
+    """Тесты асинхронного ожидания обновлений"""
+
+    def test_timeout(self, web):
+        """Тест возврата той же версии, если обновлений не было"""
+        calculator = web.MonteCarloCalculator(total_points=100)
+
+        assert asyncio.run(asgi.wait_for_update(calculator, 0, 0.01)) == 0
+        assert calculator._listeners == []
+
+    def test_wakes_on_results(self, web):
+        """Тест пробуждения при обновлении результатов из другого потока"""
+        calculator = web.MonteCarloCalculator(total_points=100)
+
+        async def wait():
+            threading.Timer(0.05, calculator._update_results, args=(0,)).start()
+            started = time.monotonic()
+            version = await asgi.wait_for_update(calculator, 0, 5)
+            return version, time.monotonic() - started
+
+        version, waited = asyncio.run(wait())
+
+        assert version == 1
+        assert waited < 1
+
+
+def test_lifespan():
+    """Тест запуска и остановки сервера"""
+    messages = [{'type': 'lifespan.startup'}, {'type': 'lifespan.shutdown'}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message['type'])
+
+    application = asgi.AsgiApp(asgi.web.app, threads=1)
+    asyncio.run(application({'type': 'lifespan'}, receive, send))
+
+    assert sent == ['lifespan.startup.complete', 'lifespan.shutdown.complete']
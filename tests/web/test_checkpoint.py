@@ -0,0 +1,59 @@
+# tests/web/test_checkpoint.py
+"""Тесты для хранилища контрольных точек CheckpointStore"""
+import os
+
+import pytest
+import sys
+
+# Добавляем путь для импорта
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from web_app.checkpoint import CheckpointStore
+
+
+class TestCheckpointStore:
+    """Тесты для класса CheckpointStore"""
+
+    def test_save_and_load(self, tmp_path):
+        """Тест сохранения и чтения контрольной точки"""
+        store = CheckpointStore(str(tmp_path))
+        store.save('calc-1', {'points_processed': 100, 'saved_at': 1.0})
+
+        assert store.load('calc-1') == {'id': 'calc-1', 'points_processed': 100, 'saved_at': 1.0}
+        assert store.load('missing') is None
+
+    def test_save_replaces_previous(self, tmp_path):
+        """Тест замены контрольной точки без временных файлов"""
+        store = CheckpointStore(str(tmp_path))
+        store.save('calc-1', {'points_processed': 100})
+        store.save('calc-1', {'points_processed': 200})
+
+        assert store.load('calc-1')['points_processed'] == 200
+        assert os.listdir(tmp_path) == ['calc-1.json']
+
+    def test_delete(self, tmp_path):
+        """Тест удаления контрольной точки"""
+        store = CheckpointStore(str(tmp_path))
+        store.save('calc-1', {})
+        store.delete('calc-1')
+        store.delete('calc-1')
+
+        assert store.load('calc-1') is None
+
+    def test_list_sorted_by_time(self, tmp_path):
+        """Тест списка контрольных точек от давних к недавним"""
+        store = CheckpointStore(str(tmp_path))
+        store.save('b', {'saved_at': 2.0})
+        store.save('a', {'saved_at': 3.0})
+        store.save('c', {'saved_at': 1.0})
+        (tmp_path / 'broken.json').write_text('{')
+
+        assert [state['id'] for state in store.list()] == ['c', 'b', 'a']
+
+    @pytest.mark.parametrize("calc_id", ['', '..', '.hidden', 'a/b'])
+    def test_invalid_id(self, tmp_path, calc_id):
+        """Тест отклонения идентификаторов вне каталога"""
+        store = CheckpointStore(str(tmp_path))
+
+        with pytest.raises(ValueError):
+            store.save(calc_id, {})
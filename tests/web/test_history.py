@@ -0,0 +1,120 @@
+# tests/web/test_history.py
+"""Тесты для истории расчетов RunHistory"""
+import sqlite3
+
+import pytest
+import sys
+import os
+
+# Добавляем путь для импорта
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from web_app.history import RunHistory
+
+
+def make_entry(i):
+    """Запись о расчете с номером i"""
+    return {
+        'id': f'calc-{i}',
+        'status': 'completed',
+        'total_points': 1000 * i,
+        'points_processed': 1000 * i,
+        'final_pi': 3.14,
+        'error': 0.0016,
+        'time_spent': 0.5,
+        'seed': i,
+        'mode': 'vectorized',
+        'throughput': 2000.0 * i
+    }
+
+
+class TestRunHistory:
+    """Тесты для класса RunHistory"""
+
+    def test_record_and_get(self):
+        """Тест добавления и получения записи"""
+        history = RunHistory(':memory:')
+        recorded = history.record(make_entry(1))
+
+        entry = history.get('calc-1')
+        assert entry['seq'] == recorded['seq']
+        assert entry['total_points'] == 1000
+        assert entry['seed'] == 1
+        assert entry['finished_at'] > 0
+        assert history.get('missing') is None
+
+    def test_page_newest_first(self):
+        """Тест порядка записей от новых к старым"""
+        history = RunHistory(':memory:')
+        for i in range(5):
+            history.record(make_entry(i))
+
+        assert [entry['id'] for entry in history.page(limit=3)] == ['calc-4', 'calc-3', 'calc-2']
+
+    @pytest.mark.parametrize("cache_size", [3, 100])
+    def test_pagination_beyond_cache(self, cache_size):
+        """Тест выдачи страниц из кэша и из базы"""
+        history = RunHistory(':memory:', cache_size=cache_size)
+        for i in range(10):
+            history.record(make_entry(i))
+
+        ids = []
+        before = None
+        while True:
+            page = history.page(limit=4, before=before)
+            if not page:
+                break
+            ids.extend(entry['id'] for entry in page)
+            before = page[-1]['seq']
+
+        assert ids == [f'calc-{i}' for i in range(9, -1, -1)]
+
+    def test_persistence(self, tmp_path):
+        """Тест сохранения истории между запусками"""
+        path = str(tmp_path / 'history.sqlite3')
+        history = RunHistory(path)
+        for i in range(3):
+            history.record(make_entry(i))
+        history.close()
+
+        reopened = RunHistory(path, cache_size=2)
+        assert reopened.count() == 3
+        assert [entry['id'] for entry in reopened.page(limit=3)] == ['calc-2', 'calc-1', 'calc-0']
+
+    def test_cache_is_bounded(self):
+        """Тест ограничения кэша последних записей"""
+        history = RunHistory(':memory:', cache_size=5)
+        for i in range(20):
+            history.record(make_entry(i))
+
+        assert len(history._cache) == 5
+        assert history.count() == 20
+
+    def test_adds_columns_to_old_database(self, tmp_path):
+        """Тест добавления новых столбцов в базу прежней версии"""
+        path = str(tmp_path / 'history.sqlite3')
+        connection = sqlite3.connect(path)
+        connection.execute('''
+            CREATE TABLE runs (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT, id TEXT NOT NULL, status TEXT NOT NULL,
+                total_points INTEGER NOT NULL, points_processed INTEGER NOT NULL,
+                final_pi REAL NOT NULL, error REAL NOT NULL, time_spent REAL NOT NULL,
+                seed INTEGER, mode TEXT, throughput REAL NOT NULL, finished_at REAL NOT NULL
+            )
+        ''')
+        connection.execute(
+            "INSERT INTO runs (id, status, total_points, points_processed, final_pi, error, "
+            "time_spent, seed, mode, throughput, finished_at) "
+            "VALUES ('old', 'completed', 1, 1, 4.0, 0.86, 0.1, 1, 'scalar', 10.0, 0)"
+        )
+        connection.commit()
+        connection.close()
+
+        history = RunHistory(path)
+        history.record(dict(make_entry(1), sampler='halton', estimator='quarter'))
+
+        assert history.get('old')['sampler'] is None
+        assert history.get('old')['estimator'] is None
+        assert history.get('calc-1')['sampler'] == 'halton'
+        assert history.get('calc-1')['estimator'] == 'quarter'
+        history.close()
@@ -0,0 +1,98 @@
+# tests/web/test_metrics.py
+"""Тесты для метрик сервера"""
+import threading
+import time
+
+import pytest
+import sys
+import os
+
+# Добавляем пути для импорта (metrics.py импортирует monte_carlo как модуль верхнего уровня)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../web_app')))
+
+from web_app.metrics import TimedLock, RequestMetrics, MetricsWriter, merge_histograms
+
+
+class TestTimedLock:
+    """Тесты блокировки с учетом ожидания"""
+
+    def test_records_wait(self):
+        """Тест учета времени ожидания захвата"""
+        lock = TimedLock()
+        lock.acquire()
+        threading.Timer(0.05, lock.release).start()
+
+        with lock:
+            assert lock.locked()
+
+        snapshot = lock.waits.snapshot()
+        assert snapshot['count'] == 2
+        assert snapshot['sum'] >= 0.04
+        assert not lock.locked()
+
+    def test_non_blocking(self):
+        """Тест неудачного захвата без ожидания"""
+        lock = TimedLock()
+        with lock:
+            assert lock.acquire(blocking=False) is False
+
+        assert lock.waits.snapshot()['count'] == 1
+
+
+class TestRequestMetrics:
+    """Тесты метрик запросов"""
+
+    def test_observe(self):
+        """Тест учета длительности, количества и байтов"""
+        metrics = RequestMetrics(buckets=(0.01, 0.1))
+        metrics.observe('get_status', 200, 0.005, 100)
+        metrics.observe('get_status', 200, 0.05, 50)
+        metrics.observe('get_status', 404, 0.5)
+        metrics.add_bytes('stream_status', 30)
+
+        durations, requests, sent = metrics.snapshot()
+        assert durations['get_status']['buckets'] == [[0.01, 1], [0.1, 2]]
+        assert durations['get_status']['count'] == 3
+        assert requests == {('get_status', 200): 2, ('get_status', 404): 1}
+        assert sent == {'get_status': 150, 'stream_status': 30}
+
+
+class TestMetricsWriter:
+    """Тесты текстового формата Prometheus"""
+
+    def test_merge_histograms(self):
+        """Тест сложения гистограмм"""
+        first = {'buckets': [[0.1, 1], [1.0, 2]], 'sum': 0.5, 'count': 2}
+        second = {'buckets': [[0.1, 0], [1.0, 1]], 'sum': 0.7, 'count': 3}
+
+        merged = merge_histograms([first, second])
+
+        assert merged == {'buckets': [[0.1, 1], [1.0, 3]], 'sum': pytest.approx(1.2), 'count': 5}
+        assert first['buckets'] == [[0.1, 1], [1.0, 2]]
+        assert merge_histograms([]) is None
+
+    def test_text(self):
+        """Тест строк метрик"""
+        writer = MetricsWriter()
+        writer.gauge('jobs', 'Расчеты', [({'status': 'running'}, 2)])
+        writer.counter('requests_total', 'Запросы', 5)
+        writer.histogram('latency_seconds', 'Задержка',
+                         [({'endpoint': 'a"b'}, {'buckets': [[0.1, 1]], 'sum': 0.25, 'count': 2})])
+
+        lines = writer.text().splitlines()
+
+        assert lines[:3] == ['# HELP jobs Расчеты', '# TYPE jobs gauge', 'jobs{status="running"} 2']
+        assert 'requests_total 5' in lines
+        assert '# TYPE latency_seconds histogram' in lines
+        assert 'latency_seconds_bucket{endpoint="a\\"b",le="0.1"} 1' in lines
+        assert 'latency_seconds_bucket{endpoint="a\\"b",le="+Inf"} 2' in lines
+        assert 'latency_seconds_sum{endpoint="a\\"b"} 0.25' in lines
+        assert 'latency_seconds_count{endpoint="a\\"b"} 2' in lines
+
+    def test_missing_value(self):
+        """Тест отсутствующего значения"""
+        writer = MetricsWriter()
+        writer.gauge('value', 'Значение', None)
+
+        assert writer.text().splitlines()[-1] == 'value NaN'
@@ -1,5 +1,7 @@
 # tests/web/test_monte_carlo.py
 """Тесты для класса MonteCarloCalculator"""
+import json
+import math
 import threading
 
 import pytest
@@ -11,7 +13,15 @@ import os
 # Добавляем путь для импорта
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
 
-from web_app.monte_carlo import MonteCarloCalculator
+from web_app.monte_carlo import (
+    MonteCarloCalculator, PointStream, PointReservoir, VISUAL_SAMPLE_SIZE, pack_points, MODE_SCALAR, MODE_VECTORIZED, MODE_PARALLEL,
+    STREAM_BLOCK_SIZE, count_points_in_circle, Pacer, PACING_AUTO, PACING_MAX, PACING_RATE, PACING_DURATION,
+    VISUAL_POINTS_PER_SECOND, pi_half_width, make_stream, radical_inverse, SobolStream, HaltonStream,
+    SAMPLER_RANDOM, SAMPLER_SOBOL, SAMPLER_HALTON, SOBOL_MAX_POINTS, Estimator, ESTIMATORS, ESTIMATOR_PLAIN, ESTIMATOR_ANTITHETIC,
+    ESTIMATOR_STRATIFIED, ESTIMATOR_QUARTER, merge_ranges, missing_ranges, Histogram,
+    DensityGrid, DENSITY_SIZE, DENSITY_MIN_POINTS, DENSITY_KEYFRAMES, density_cells, density_bins, pack_density
+)
+import numpy as np
 
 
 class TestMonteCarloCalculator:
@@ -26,7 +36,7 @@ class TestMonteCarloCalculator:
         assert calculator.points_in_circle == 0
         assert calculator.pi_estimate == 0
         assert calculator.is_running is False
-        assert len(calculator.latest_points) == 0
+        assert len(calculator.points_sample) == 0
         assert calculator.latest_results == {}
 
     def test_calculate_basic(self):
@@ -71,6 +81,19 @@ class TestMonteCarloCalculator:
 
         assert calculator.points_processed < 10000
         assert calculator.is_running is False
+        assert calculator.get_latest_results()['progress'] < 100
+
+    def test_stop_before_start(self):
+        """Тест: расчет, остановленный до запуска, не выполняется"""
+        calculator = MonteCarloCalculator(total_points=10000, mode=MODE_VECTORIZED, pacer=Pacer(PACING_MAX))
+        calculator.stop()
+        calculator.calculate()
+
+        assert calculator.points_processed == 0
+
+        # Остановка действует на один запуск
+        calculator.calculate()
+        assert calculator.points_processed == 10000
 
     def test_get_progress(self):
         """Тест получения прогресса"""
@@ -107,8 +130,8 @@ class TestMonteCarloCalculator:
             assert results['points_processed'] == 500
             assert results['progress'] == 100
 
-    def test_latest_points_storage(self):
-        """Тест хранения последних точек"""
+    def test_points_sample_storage(self):
+        """Тест хранения точек в выборке"""
         calculator = MonteCarloCalculator(total_points=200)  # Уменьшаем количество точек
         
         # Создаем список значений для random.uniform (по 2 значения на точку)
@@ -120,11 +143,10 @@ class TestMonteCarloCalculator:
         with patch('random.uniform', side_effect=mock_values):
             calculator.calculate()
             
-            points = calculator.get_latest_points()
+            points, _ = calculator.get_points()
             
-            # Проверяем, что точки сохраняются (каждая 10-я)
-            # Для 200 точек должно быть 20 точек (200/10)
-            assert len(points) == 20
+            # Пока выборка не заполнена, в нее попадает каждая точка
+            assert len(points) == 200
             
             # Проверяем структуру точки
             if points:
@@ -140,14 +162,12 @@ class TestMonteCarloCalculator:
                 assert first_point['x'] == 0.1
                 assert first_point['y'] == 0.2
 
-    def test_latest_points_storage_with_different_intervals(self):
-        """Тест хранения точек с разными интервалами"""
-        # Тест для проверки, что каждая 10-я точка сохраняется
-        
+    def test_points_sample_storage_in_order(self):
+        """Тест хранения точек в порядке расчета, пока выборка не заполнена"""
         test_cases = [
-            (100, 10),   # 100 точек, ожидаем 10 сохраненных (каждая 10-я)
-            (150, 15),   # 150 точек, ожидаем 15 сохраненных
-            (250, 25),   # 250 точек, ожидаем 25 сохраненных
+            (100, 100),
+            (150, 150),
+            (250, 250),
         ]
         
         for total_points, expected_points in test_cases:
@@ -160,14 +180,15 @@ class TestMonteCarloCalculator:
             
             with patch('random.uniform', side_effect=mock_values):
                 calculator.calculate()
-                points = calculator.get_latest_points()
+                points, _ = calculator.get_points()
                 
-                # Проверяем количество сохраненных точек
+                # Проверяем количество и порядок сохраненных точек
                 assert len(points) == expected_points, \
                     f"Для {total_points} точек ожидалось {expected_points}, получено {len(points)}"
+                assert [point['x'] for point in points] == [i / 1000 for i in range(total_points)]
 
-    def test_latest_points_clear_after_get(self):
-        """Тест очистки точек после получения"""
+    def test_points_cursor(self):
+        """Тест курсора: повторное чтение с курсором - без точек, с нулевым - вся выборка"""
         calculator = MonteCarloCalculator(total_points=100)
         
         # Создаем мок-значения
@@ -176,15 +197,15 @@ class TestMonteCarloCalculator:
         with patch('random.uniform', side_effect=mock_values):
             calculator.calculate()
             
-            assert len(calculator.latest_points) > 0
-            
-            points = calculator.get_latest_points()
-            assert len(points) > 0
-            assert len(calculator.latest_points) == 0  # Очистилось после получения
+            points, cursor = calculator.get_points()
+            assert len(points) == 100
+            assert calculator.get_points(cursor) == ([], cursor)
+            # Чтение не очищает выборку: другой клиент получит все точки
+            assert len(calculator.get_points()[0]) == 100
 
-    def test_latest_points_max_limit(self):
+    def test_points_sample_max_limit(self):
         """Тест ограничения на количество хранимых точек"""
-        calculator = MonteCarloCalculator(total_points=20000)  # Больше чем maxlen=1000
+        calculator = MonteCarloCalculator(total_points=20000)  # Больше размера выборки
         
         # Создаем мок-значения
         mock_values = [0.1, 0.2] * 20000
@@ -192,10 +213,10 @@ class TestMonteCarloCalculator:
         with patch('random.uniform', side_effect=mock_values):
             calculator.calculate()
             
-            points = calculator.get_latest_points()
+            points, _ = calculator.get_points()
             
-            # Должно быть не больше 1000 точек (maxlen)
-            assert len(points) <= 1000
+            # Выборка заполнена целиком
+            assert len(points) == VISUAL_SAMPLE_SIZE
 
     def test_boundary_conditions(self):
         """Тест граничных условий"""
@@ -215,7 +236,7 @@ class TestMonteCarloCalculator:
             assert calculator.pi_estimate == 4.0
             
             # Проверяем, что точки на границе помечены как внутри круга
-            points = calculator.get_latest_points()
+            points, _ = calculator.get_points()
             for point in points:
                 assert point['in_circle'] is True
 
@@ -231,9 +252,7 @@ class TestMonteCarloCalculator:
             calculator.calculate()
             
             assert calculator.points_processed == total_points
-            # Количество сохраненных точек = total_points // 10 + (1 если total_points % 10 != 0)
-            expected_points = total_points // 10 + (1 if total_points % 10 != 0 else 0)
-            assert len(calculator.get_latest_points()) <= expected_points
+            assert len(calculator.get_points()[0]) == min(total_points, VISUAL_SAMPLE_SIZE)
 
     def test_calculation_with_real_random(self):
         """Тест расчета с реальными случайными числами (без мока)"""
@@ -243,9 +262,1053 @@ class TestMonteCarloCalculator:
         assert calculator.points_processed == 1000
         assert 3.0 <= calculator.pi_estimate <= 3.3  # Примерная оценка
         
-        points = calculator.get_latest_points()
+        points, _ = calculator.get_points()
         assert len(points) > 0
         
         # Проверяем, что есть и точки внутри, и снаружи круга
         in_circle_count = sum(1 for p in points if p['in_circle'])
-        assert 0 < in_circle_count < len(points)
\ No newline at end of file
+        assert 0 < in_circle_count < len(points)
+
+class TestVectorizedMode:
+    """Тесты векторизованного режима расчета"""
+
+    def test_invalid_mode(self):
+        """Тест неизвестного режима"""
+        with pytest.raises(ValueError):
+            MonteCarloCalculator(total_points=100, mode='unknown')
+
+    def test_invalid_chunk_size(self):
+        """Тест неположительного размера блока"""
+        with pytest.raises(ValueError):
+            MonteCarloCalculator(total_points=100, mode=MODE_VECTORIZED, chunk_size=0)
+
+    @pytest.mark.parametrize("total_points", [1, 99, 100, 250, 20001])
+    def test_processes_all_points(self, total_points):
+        """Тест обработки всех точек блоками"""
+        calculator = MonteCarloCalculator(total_points=total_points, mode=MODE_VECTORIZED,
+                                          chunk_size=4096)
+        calculator.calculate()
+
+        assert calculator.points_processed == total_points
+        assert 0 <= calculator.points_in_circle <= total_points
+        assert calculator.pi_estimate == 4 * calculator.points_in_circle / total_points
+        assert calculator.is_running is False
+
+    def test_pi_accuracy(self):
+        """Тест точности на большом количестве точек"""
+        calculator = MonteCarloCalculator(total_points=1000000, mode=MODE_VECTORIZED)
+        calculator.calculate()
+
+        assert abs(calculator.pi_estimate - 3.141592653589793) < 0.01
+
+    def test_latest_results(self):
+        """Тест итоговых результатов"""
+        calculator = MonteCarloCalculator(total_points=50000, mode=MODE_VECTORIZED,
+                                          chunk_size=8192)
+        calculator.calculate()
+
+        results = calculator.get_latest_results()
+        assert results['points_processed'] == 50000
+        assert results['points_in_circle'] == calculator.points_in_circle
+        assert results['pi_estimate'] == calculator.pi_estimate
+        assert results['progress'] == 100
+
+    @pytest.mark.parametrize("total_points, chunk_size", [(200, 7), (250, 100), (1000, 33)])
+    def test_points_sample_keeps_every_point(self, total_points, chunk_size):
+        """Тест: пока выборка не заполнена, в нее попадает каждая точка независимо от границ блоков"""
+        calculator = MonteCarloCalculator(total_points=total_points, mode=MODE_VECTORIZED,
+                                          chunk_size=chunk_size)
+        with patch('web_app.monte_carlo.time.sleep'):
+            calculator.calculate()
+
+        points, _ = calculator.get_points()
+        assert len(points) == total_points
+
+        first_point = points[0]
+        assert isinstance(first_point['x'], float)
+        assert isinstance(first_point['y'], float)
+        assert isinstance(first_point['in_circle'], bool)
+        assert first_point['in_circle'] == (first_point['x'] ** 2 + first_point['y'] ** 2 <= 1.0)
+
+    def test_points_sample_max_limit(self):
+        """Тест ограничения количества хранимых точек"""
+        calculator = MonteCarloCalculator(total_points=200000, mode=MODE_VECTORIZED)
+        calculator.calculate()
+
+        assert len(calculator.get_points()[0]) == VISUAL_SAMPLE_SIZE
+
+    def test_stop_calculation(self):
+        """Тест остановки расчета между блоками"""
+        calculator = MonteCarloCalculator(total_points=10000, mode=MODE_VECTORIZED)
+
+        def stop_after_delay():
+            time.sleep(0.1)
+            calculator.stop()
+
+        thread = threading.Thread(target=stop_after_delay)
+        thread.start()
+
+        calculator.calculate()
+        thread.join()
+
+        assert calculator.points_processed < 10000
+        assert calculator.points_processed % 100 == 0
+        assert calculator.is_running is False
+
+
+class TestParallelMode:
+    """Тесты параллельного режима в пуле процессов"""
+
+    def test_invalid_workers(self):
+        """Тест неположительного количества процессов"""
+        with pytest.raises(ValueError):
+            MonteCarloCalculator(total_points=100, mode=MODE_PARALLEL, workers=0)
+
+    def test_workers_are_capped_by_cpu_count(self):
+        """Тест ограничения количества процессов числом ядер"""
+        with patch('web_app.monte_carlo.os.cpu_count', return_value=4):
+            calculator = MonteCarloCalculator(total_points=100, mode=MODE_PARALLEL, workers=10 ** 6)
+            restored = MonteCarloCalculator.from_checkpoint(dict(calculator.checkpoint(), workers=64))
+
+        assert calculator.workers == 4
+        assert restored.workers == 4
+
+    def test_count_points_in_circle(self):
+        """Тест подсчета точек одной задачей"""
+        inside, total, sample, _, bins = count_points_in_circle(1, 0, 10000, chunk_size=3000)
+
+        assert total == 10000
+        assert 0 < inside < total
+        x, y, in_circle = sample
+        assert len(x) == len(y) == len(in_circle) == 100
+        assert np.array_equal(in_circle, x ** 2 + y ** 2 <= 1.0)
+        assert bins is None
+
+        # Размер блока расчета не влияет на результат
+        assert count_points_in_circle(1, 0, 10000, chunk_size=4096)[0] == inside
+
+    def test_processes_all_points(self):
+        """Тест объединения частичных результатов процессов"""
+        with patch('web_app.monte_carlo.PARALLEL_TASK_SIZE', 100000):
+            calculator = MonteCarloCalculator(total_points=1000001, mode=MODE_PARALLEL, workers=2)
+            calculator.calculate()
+
+        assert calculator.points_processed == 1000001
+        assert abs(calculator.pi_estimate - 3.141592653589793) < 0.01
+        assert calculator.is_running is False
+
+        results = calculator.get_latest_results()
+        assert results['points_processed'] == 1000001
+        assert results['points_in_circle'] == calculator.points_in_circle
+        assert results['progress'] == 100
+        assert len(calculator.get_points()[0]) > 0
+
+    def test_stop_calculation(self):
+        """Тест остановки с отменой задач в очереди"""
+        with patch('web_app.monte_carlo.PARALLEL_TASK_SIZE', 100000):
+            calculator = MonteCarloCalculator(total_points=10 ** 9, mode=MODE_PARALLEL, workers=2)
+
+            def stop_after_delay():
+                time.sleep(0.5)
+                calculator.stop()
+
+            thread = threading.Thread(target=stop_after_delay)
+            thread.start()
+
+            calculator.calculate()
+            thread.join()
+
+        assert 0 <= calculator.points_processed < 10 ** 9
+        assert calculator.points_processed % 100000 == 0
+        assert calculator.is_running is False
+
+
+class TestReproducibility:
+    """Тесты воспроизводимости расчета по seed"""
+
+    def test_stream_ranges_regenerate_independently(self):
+        """Тест восстановления любого диапазона потока"""
+        total = 2 * STREAM_BLOCK_SIZE + 1000
+        x, y, in_circle = PointStream(7).generate(0, total)
+
+        # Диапазон, пересекающий границу блоков, из нового потока
+        start = STREAM_BLOCK_SIZE - 50
+        part_x, part_y, part_in_circle = PointStream(7).generate(start, 200)
+        assert np.array_equal(part_x, x[start:start + 200])
+        assert np.array_equal(part_y, y[start:start + 200])
+        assert np.array_equal(part_in_circle, in_circle[start:start + 200])
+
+        # Последовательное чтение мелкими блоками дает те же точки
+        stream = PointStream(7)
+        chunks = [stream.generate(start, 37)[0] for start in range(0, 1000, 37)]
+        assert np.array_equal(np.concatenate(chunks)[:1000], x[:1000])
+
+    def test_negative_seed(self):
+        """Тест отрицательного seed"""
+        with pytest.raises(ValueError):
+            MonteCarloCalculator(total_points=100, seed=-1)
+
+    def test_seed_is_generated(self):
+        """Тест генерации seed, если он не задан"""
+        calculator = MonteCarloCalculator(total_points=100, mode=MODE_VECTORIZED)
+        assert 0 <= calculator.seed < 2 ** 53
+
+    @pytest.mark.parametrize("mode", [MODE_SCALAR, MODE_VECTORIZED])
+    def test_reported_seed_replays_run(self, mode):
+        """Тест: сообщенный seed повторяет расчет, а неповторимый расчет seed не сообщает"""
+        calculator = MonteCarloCalculator(total_points=5000, mode=mode, pacer=Pacer(PACING_MAX))
+        calculator.calculate()
+
+        if mode == MODE_SCALAR:
+            # Без seed расчет по одной точке использует модуль random
+            assert calculator.seed is None
+            return
+        replay = MonteCarloCalculator(total_points=5000, mode=mode, seed=calculator.seed, pacer=Pacer(PACING_MAX))
+        replay.calculate()
+        assert replay.points_in_circle == calculator.points_in_circle
+
+    def test_different_seeds_differ(self):
+        """Тест различия потоков при разных seed"""
+        assert not np.array_equal(PointStream(1).generate(0, 100)[0],
+                                  PointStream(2).generate(0, 100)[0])
+
+    def test_same_counts_in_all_modes(self):
+        """Тест совпадения счетчиков в последовательном, блочном и параллельном режимах"""
+        total_points = 300001
+        results = []
+
+        with patch('web_app.monte_carlo.PARALLEL_TASK_SIZE', 3 * STREAM_BLOCK_SIZE):
+            for mode, chunk_size in [(MODE_SCALAR, 1000), (MODE_VECTORIZED, 1000),
+                                     (MODE_VECTORIZED, 65536), (MODE_VECTORIZED, 99991),
+                                     (MODE_PARALLEL, 12345)]:
+                calculator = MonteCarloCalculator(total_points=total_points, mode=mode,
+                                                  chunk_size=chunk_size, workers=2, seed=2024)
+                calculator.calculate()
+                results.append((calculator.points_processed, calculator.points_in_circle))
+
+        assert len(set(results)) == 1
+        assert results[0][0] == total_points
+
+    def test_seeded_scalar_ignores_random_module(self):
+        """Тест независимости расчета с seed от модуля random"""
+        reference = MonteCarloCalculator(total_points=500, mode=MODE_VECTORIZED, seed=5)
+        with patch('web_app.monte_carlo.time.sleep'):
+            reference.calculate()
+
+        calculator = MonteCarloCalculator(total_points=500, seed=5)
+        with patch('random.uniform', side_effect=AssertionError), \
+                patch('web_app.monte_carlo.time.sleep'):
+            calculator.calculate()
+
+        assert calculator.points_in_circle == reference.points_in_circle
+
+
+class TestUpdateNotification:
+    """Тесты ожидания обновления результатов"""
+
+    def test_wait_for_update_timeout(self):
+        """Тест возврата той же версии, если обновлений не было"""
+        calculator = MonteCarloCalculator(total_points=100)
+        assert calculator.wait_for_update(calculator.results_version, timeout=0.01) == 0
+
+    def test_wait_for_update_wakes_on_results(self):
+        """Тест пробуждения читателя при обновлении результатов"""
+        calculator = MonteCarloCalculator(total_points=50000, mode=MODE_VECTORIZED)
+        thread = threading.Thread(target=calculator.calculate)
+        thread.start()
+
+        version = calculator.wait_for_update(0, timeout=5)
+        thread.join()
+
+        assert version > 0
+        assert calculator.results_version >= version
+
+    def test_snapshot_is_immutable(self):
+        """Тест неизменяемости опубликованного снимка результатов"""
+        calculator = MonteCarloCalculator(total_points=1000, mode=MODE_VECTORIZED, chunk_size=100,
+                                          pacer=Pacer(PACING_MAX))
+        calculator._update_results(0)
+        snapshot = calculator.snapshot()
+
+        with pytest.raises(TypeError):
+            snapshot['pi_estimate'] = 0
+
+        calculator.calculate()
+        # Новые результаты публикуются новым снимком, прежний не меняется
+        assert snapshot['points_processed'] == 0
+        assert calculator.snapshot()['points_processed'] == 1000
+        assert calculator.snapshot()['version'] == calculator.results_version
+
+
+class TestPointTransport:
+    """Тесты выборки точек и двоичного формата"""
+
+    def test_reservoir_fills_in_order(self):
+        """Тест заполнения выборки по порядку"""
+        reservoir = PointReservoir(5, seed=1)
+        reservoir.append(0.0, 0.0, True)
+        # Точки, предложенные по одной, попадают в выборку пачкой
+        assert len(reservoir) == 0
+        reservoir.flush()
+        reservoir.extend(np.arange(1.0, 4.0), np.zeros(3), np.zeros(3, dtype=bool))
+
+        assert len(reservoir) == 4
+        x, y, in_circle, cursor = reservoir.since(0)
+        assert x.tolist() == [0.0, 1.0, 2.0, 3.0]
+        assert in_circle.tolist() == [True, False, False, False]
+        assert cursor == 4
+
+    def test_reservoir_cursor(self):
+        """Тест чтения только новых точек по курсору"""
+        reservoir = PointReservoir(5, seed=1)
+        reservoir.extend(np.arange(3.0), np.zeros(3), np.ones(3, dtype=bool))
+        _, _, _, cursor = reservoir.since(0)
+
+        reservoir.extend(np.arange(3.0, 5.0), np.zeros(3), np.ones(3, dtype=bool))
+
+        assert reservoir.since(cursor)[0].tolist() == [3.0, 4.0]
+        assert reservoir.since(reservoir.cursor)[0].tolist() == []
+        # Курсор новее выборки (например, после очистки) считается нулевым
+        assert len(reservoir.since(reservoir.cursor + 100)[0]) == 5
+
+    def test_reservoir_fixed_size(self):
+        """Тест: размер выборки не зависит от количества точек"""
+        reservoir = PointReservoir(100, seed=2)
+        for start in range(0, 100000, 7000):
+            x = np.arange(start, min(start + 7000, 100000), dtype=np.float64)
+            reservoir.extend(x, x, np.ones(len(x), dtype=bool))
+
+        x, _, _, cursor = reservoir.since(0)
+        assert len(reservoir) == 100
+        assert reservoir.seen == 100000
+        assert len(np.unique(x)) == 100
+        # Замены идут реже с ростом расчета: около capacity * ln(n / capacity) записей
+        assert 100 < cursor < 2000
+
+    def test_reservoir_uniform_over_run(self):
+        """Тест равномерности выборки по всему расчету, а не только по его концу"""
+        counts = np.zeros(4)
+        for seed in range(20):
+            reservoir = PointReservoir(200, seed=seed)
+            for start in range(0, 40000, 3000):
+                x = np.arange(start, min(start + 3000, 40000), dtype=np.float64)
+                reservoir.extend(x, x, np.ones(len(x), dtype=bool))
+            counts += np.histogram(reservoir.since(0)[0], bins=4, range=(0, 40000))[0]
+
+        shares = counts / counts.sum()
+        assert np.all(np.abs(shares - 0.25) < 0.03)
+
+    def test_reservoir_single_points(self):
+        """Тест предложения точек по одной"""
+        reservoir = PointReservoir(50, seed=3)
+        for i in range(10000):
+            reservoir.append(float(i), 0.0, True)
+
+        x = reservoir.since(0)[0]
+        assert len(np.unique(x)) == 50
+        assert reservoir.seen == 10000
+        # Выборка не сводится к последним точкам
+        assert x.min() < 5000
+
+    def test_reservoir_clear(self):
+        """Тест очистки выборки"""
+        reservoir = PointReservoir(5, seed=1)
+        reservoir.extend(np.arange(10.0), np.zeros(10), np.ones(10, dtype=bool))
+        reservoir.clear()
+
+        assert len(reservoir) == 0
+        assert reservoir.seen == 0
+        assert reservoir.since(0)[0].tolist() == []
+
+    def test_reservoir_invalid_capacity(self):
+        """Тест некорректного размера выборки"""
+        with pytest.raises(ValueError):
+            PointReservoir(0)
+
+    def test_pack_points_layout(self):
+        """Тест формата упакованных точек"""
+        x = np.array([0.5, -0.25, 1.0])
+        y = np.array([0.0, 0.75, -1.0])
+        in_circle = np.array([True, False, True])
+
+        data = pack_points(x, y, in_circle)
+
+        assert len(data) == 3 * 4 * 2 + 1
+        assert np.frombuffer(data[:12], dtype='<f4').tolist() == [0.5, -0.25, 1.0]
+        assert np.frombuffer(data[12:24], dtype='<f4').tolist() == [0.0, 0.75, -1.0]
+        assert data[24] == 0b101
+
+    def test_points_packed(self):
+        """Тест получения точек выборки в двоичном формате"""
+        calculator = MonteCarloCalculator(total_points=50000, mode=MODE_VECTORIZED, seed=1)
+        calculator.calculate()
+
+        count, data, cursor = calculator.get_points_packed()
+        assert count == 1000
+        assert len(data) == 1000 * 8 + 125
+        assert calculator.get_points_packed(cursor) == (0, b'', cursor)
+
+        x = np.frombuffer(data[:4000], dtype='<f4')
+        y = np.frombuffer(data[4000:8000], dtype='<f4')
+        mask = np.unpackbits(np.frombuffer(data[8000:], dtype=np.uint8), bitorder='little')
+        assert np.array_equal(mask.astype(bool), x.astype(np.float64) ** 2 + y.astype(np.float64) ** 2 <= 1.0)
+
+
+class TestPacing:
+    """Тесты ограничения скорости расчета"""
+
+    @pytest.mark.parametrize("mode, value", [
+        ('unknown', None),
+        (PACING_RATE, None),
+        (PACING_DURATION, 0),
+    ])
+    def test_invalid_pacing(self, mode, value):
+        """Тест некорректных параметров темпа"""
+        with pytest.raises(ValueError):
+            Pacer(mode, value)
+
+    def test_auto_pacing(self):
+        """Тест замедления только небольших расчетов в режиме auto"""
+        pacer = Pacer(PACING_AUTO)
+
+        pacer.start(10000)
+        assert pacer.rate == VISUAL_POINTS_PER_SECOND
+        assert pacer.chunk_size(65536) == 100
+
+        pacer.start(10001)
+        assert pacer.rate is None
+        assert pacer.chunk_size(65536) == 65536
+
+    def test_duration_pacing_rate(self):
+        """Тест скорости в режиме заданной длительности"""
+        pacer = Pacer(PACING_DURATION, 2.0)
+        pacer.start(100000)
+
+        assert pacer.rate == 50000
+        assert pacer.chunk_size(65536) == 5000
+
+    def test_max_pacing_does_not_sleep(self):
+        """Тест расчета без задержек в режиме max"""
+        calculator = MonteCarloCalculator(total_points=10000, mode=MODE_VECTORIZED, pacer=Pacer(PACING_MAX))
+
+        with patch('web_app.monte_carlo.time.sleep') as mock_sleep:
+            calculator.calculate()
+
+        assert not mock_sleep.called
+        assert calculator.points_processed == 10000
+
+    @pytest.mark.parametrize("mode", [MODE_SCALAR, MODE_VECTORIZED])
+    def test_rate_pacing(self, mode):
+        """Тест выдерживания заданной скорости"""
+        calculator = MonteCarloCalculator(total_points=2000, mode=mode, seed=1,
+                                          pacer=Pacer(PACING_RATE, 10000))
+
+        started = time.monotonic()
+        calculator.calculate()
+        elapsed = time.monotonic() - started
+
+        assert calculator.points_processed == 2000
+        assert 0.15 <= elapsed < 1.0
+
+    def test_pacing_sleeps_per_chunk(self):
+        """Тест задержки на блок, а не на каждую точку"""
+        calculator = MonteCarloCalculator(total_points=5000, mode=MODE_SCALAR, pacer=Pacer(PACING_RATE, 1000))
+
+        with patch('web_app.monte_carlo.time.sleep') as mock_sleep:
+            calculator.calculate()
+
+        assert mock_sleep.call_count <= 50
+
+
+class TestPrecisionStopping:
+    """Тесты остановки по достижении целевой погрешности"""
+
+    def test_pi_half_width(self):
+        """Тест полуширины доверительного интервала"""
+        assert pi_half_width(750, 1000, 1.96) == pytest.approx(4 * 1.96 * math.sqrt(0.75 * 0.25 / 1000))
+        assert pi_half_width(0, 0, 1.96) == math.inf
+
+    @pytest.mark.parametrize("params", [
+        {'target_error': 0},
+        {'confidence': 1},
+        {'confidence': 0},
+    ])
+    def test_invalid_params(self, params):
+        """Тест некорректных параметров точности"""
+        with pytest.raises(ValueError):
+            MonteCarloCalculator(total_points=1000, **params)
+
+    @pytest.mark.parametrize("mode", [MODE_SCALAR, MODE_VECTORIZED])
+    def test_stops_at_target_error(self, mode):
+        """Тест ранней остановки при достижении точности"""
+        calculator = MonteCarloCalculator(total_points=10000000, mode=mode, chunk_size=8192,
+                                          seed=5, target_error=0.02)
+        calculator.calculate()
+
+        results = calculator.get_latest_results()
+        assert calculator.converged is True
+        assert calculator.points_processed < 100000
+        assert results['converged'] is True
+        assert results['ci_half_width'] < 0.02
+        assert results['ci_low'] <= results['pi_estimate'] <= results['ci_high']
+        assert results['confidence'] == 0.95
+
+    def test_higher_confidence_needs_more_points(self):
+        """Тест зависимости объема выборки от уровня доверия"""
+        processed = []
+        for confidence in (0.9, 0.99):
+            calculator = MonteCarloCalculator(total_points=10000000, mode=MODE_VECTORIZED, chunk_size=1000,
+                                              seed=5, target_error=0.02, confidence=confidence)
+            calculator.calculate()
+            processed.append(calculator.points_processed)
+
+        assert processed[0] < processed[1]
+
+    def test_stops_parallel(self):
+        """Тест ранней остановки в пуле процессов"""
+        with patch('web_app.monte_carlo.PARALLEL_TASK_SIZE', 100000):
+            calculator = MonteCarloCalculator(total_points=100000000, mode=MODE_PARALLEL, workers=1,
+                                              seed=5, target_error=0.01)
+            calculator.calculate()
+
+        assert calculator.converged is True
+        assert calculator.points_processed % 100000 == 0
+        assert calculator.points_processed < 1000000
+
+    def test_without_target_processes_all_points(self):
+        """Тест расчета всех точек без целевой погрешности"""
+        calculator = MonteCarloCalculator(total_points=50000, mode=MODE_VECTORIZED, seed=5)
+        calculator.calculate()
+
+        results = calculator.get_latest_results()
+        assert calculator.points_processed == 50000
+        assert results['converged'] is False
+        assert results['ci_half_width'] == pytest.approx(calculator.half_width())
+
+
+class TestQuasiRandomSamplers:
+    """Тесты квазислучайных последовательностей"""
+
+    def test_unknown_sampler(self):
+        """Тест неизвестной последовательности"""
+        with pytest.raises(ValueError):
+            make_stream('unknown', 1)
+        with pytest.raises(ValueError):
+            MonteCarloCalculator(total_points=100, sampler='unknown')
+
+    def test_make_stream(self):
+        """Тест выбора класса потока"""
+        assert type(make_stream(SAMPLER_RANDOM, 1)) is PointStream
+        assert isinstance(make_stream(SAMPLER_SOBOL, 1), SobolStream)
+        assert isinstance(make_stream(SAMPLER_HALTON, 1), HaltonStream)
+
+    def test_radical_inverse(self):
+        """Тест последовательности ван дер Корпута"""
+        indices = np.arange(1, 4, dtype=np.uint64)
+        assert radical_inverse(indices, 2) == pytest.approx([0.5, 0.25, 0.75])
+        assert radical_inverse(indices, 3) == pytest.approx([1 / 3, 2 / 3, 1 / 9])
+
+    @pytest.mark.parametrize("sampler", [SAMPLER_SOBOL, SAMPLER_HALTON])
+    def test_points_in_square(self, sampler):
+        """Тест попадания точек в квадрат [-1, 1] x [-1, 1]"""
+        x, y, in_circle = make_stream(sampler, 3).generate(0, 10000)
+        assert np.all((-1 <= x) & (x < 1) & (-1 <= y) & (y < 1))
+        assert np.array_equal(in_circle, x * x + y * y <= 1.0)
+
+    def test_sobol_stratification(self):
+        """Тест равномерности: каждый блок из 2^k точек Соболя попадает по одной в 2^k полос"""
+        stream = make_stream(SAMPLER_SOBOL, 7)
+        for start in (0, 64, 1024):
+            x, y, _ = stream.generate(start, 64)
+            for coordinate in (x, y):
+                strips = np.floor((coordinate + 1) / 2 * 64).astype(int)
+                assert sorted(strips) == list(range(64))
+
+    def test_sobol_point_limit(self):
+        """Тест: расчет Соболя больше чем на 2^32 точек отклоняется (точки после 2^32 повторяются)"""
+        stream = make_stream(SAMPLER_SOBOL, 7)
+        assert np.array_equal(stream.generate(SOBOL_MAX_POINTS, 16)[0], stream.generate(0, 16)[0])
+
+        MonteCarloCalculator(total_points=SOBOL_MAX_POINTS, mode=MODE_VECTORIZED, sampler=SAMPLER_SOBOL)
+        with pytest.raises(ValueError):
+            MonteCarloCalculator(total_points=SOBOL_MAX_POINTS + 1, mode=MODE_VECTORIZED, sampler=SAMPLER_SOBOL)
+        MonteCarloCalculator(total_points=SOBOL_MAX_POINTS + 1, mode=MODE_VECTORIZED, sampler=SAMPLER_HALTON)
+
+    @pytest.mark.parametrize("sampler", [SAMPLER_SOBOL, SAMPLER_HALTON])
+    def test_independent_of_chunking(self, sampler):
+        """Тест независимости точек от разбиения на блоки"""
+        whole = make_stream(sampler, 5).generate(0, 100000)[0]
+        stream = make_stream(sampler, 5)
+        parts = np.concatenate([stream.generate(start, min(30000, 100000 - start))[0]
+                                for start in range(0, 100000, 30000)])
+        assert np.array_equal(whole, parts)
+
+    @pytest.mark.parametrize("sampler", [SAMPLER_SOBOL, SAMPLER_HALTON])
+    def test_seed_randomizes_sequence(self, sampler):
+        """Тест рандомизации последовательности seed"""
+        first = make_stream(sampler, 1).generate(0, 100)[0]
+        assert np.array_equal(first, make_stream(sampler, 1).generate(0, 100)[0])
+        assert not np.array_equal(first, make_stream(sampler, 2).generate(0, 100)[0])
+
+    @pytest.mark.parametrize("sampler", [SAMPLER_SOBOL, SAMPLER_HALTON])
+    def test_faster_convergence(self, sampler):
+        """Тест меньшей ошибки, чем у псевдослучайных точек"""
+        def mean_error(name):
+            errors = []
+            for seed in range(5):
+                calculator = MonteCarloCalculator(total_points=100000, mode=MODE_VECTORIZED,
+                                                  seed=seed, sampler=name)
+                calculator.calculate()
+                errors.append(abs(calculator.pi_estimate - math.pi))
+            return np.mean(errors)
+
+        assert mean_error(sampler) < mean_error(SAMPLER_RANDOM) / 2
+
+    @pytest.mark.parametrize("sampler", [SAMPLER_SOBOL, SAMPLER_HALTON])
+    def test_modes_agree(self, sampler):
+        """Тест совпадения результатов всех режимов расчета"""
+        counts = []
+        for mode in (MODE_SCALAR, MODE_VECTORIZED):
+            calculator = MonteCarloCalculator(total_points=20001, mode=mode, seed=4, sampler=sampler)
+            with patch('web_app.monte_carlo.time.sleep'):
+                calculator.calculate()
+            counts.append(calculator.points_in_circle)
+        assert count_points_in_circle(4, 0, 20001, chunk_size=3000, sampler=sampler)[0] == counts[0]
+        assert counts[0] == counts[1]
+
+    def test_unseeded_scalar_uses_sequence(self):
+        """Тест расчета по одной точке без seed по квазислучайной последовательности"""
+        calculator = MonteCarloCalculator(total_points=1000, sampler=SAMPLER_SOBOL)
+        with patch('random.uniform') as mock_uniform, patch('web_app.monte_carlo.time.sleep'):
+            calculator.calculate()
+
+        assert not mock_uniform.called
+        assert calculator.points_processed == 1000
+
+    def test_results_report_mc_error(self):
+        """Тест ошибки обычного Монте-Карло в результатах"""
+        calculator = MonteCarloCalculator(total_points=50000, mode=MODE_VECTORIZED, seed=1, sampler=SAMPLER_SOBOL)
+        calculator.calculate()
+
+        results = calculator.get_latest_results()
+        assert results['sampler'] == SAMPLER_SOBOL
+        assert results['mc_error'] == pytest.approx(
+            pi_half_width(calculator.points_in_circle, calculator.points_processed, 1))
+
+
+class TestEstimators:
+    """Тесты оценок с понижением дисперсии"""
+
+    @staticmethod
+    def run(estimator, total_points=200000, mode=MODE_VECTORIZED, **kwargs):
+        """Выполнить расчет с заданной оценкой"""
+        calculator = MonteCarloCalculator(total_points=total_points, mode=mode, seed=3,
+                                          estimator=estimator, **kwargs)
+        calculator.calculate()
+        return calculator
+
+    def test_invalid_estimator(self):
+        """Тест некорректных параметров оценки"""
+        with pytest.raises(ValueError):
+            Estimator('unknown')
+        with pytest.raises(ValueError):
+            Estimator(ESTIMATOR_STRATIFIED, strata=0)
+        with pytest.raises(ValueError):
+            MonteCarloCalculator(total_points=100, mode=MODE_SCALAR, estimator=ESTIMATOR_QUARTER)
+
+    @pytest.mark.parametrize("total_points", [1000, 1234])
+    def test_scalar_estimator_follows_counts(self, total_points):
+        """Тест: оценка расчета по одной точке, заполняемая блоками, совпадает со счетчиками"""
+        calculator = self.run(ESTIMATOR_PLAIN, total_points=total_points, mode=MODE_SCALAR, pacer=Pacer(PACING_MAX))
+
+        assert calculator.estimator.samples == total_points
+        assert calculator.estimator.sums[0] == calculator.points_in_circle
+        assert calculator.estimator.estimate() == calculator.pi_estimate
+        assert calculator.points_sample.seen == total_points
+
+    def test_scalar_results_are_throttled(self):
+        """Тест: расчет по одной точке без ограничения темпа публикует снимки по времени, а не каждые 100 точек"""
+        calculator = self.run(ESTIMATOR_PLAIN, total_points=100000, mode=MODE_SCALAR, pacer=Pacer(PACING_MAX))
+
+        assert calculator.results_version < 1000 // 2
+        assert calculator.snapshot()['points_processed'] == 100000
+        assert calculator.snapshot()['progress'] == 100
+
+    def test_scalar_estimator_after_error(self, monkeypatch):
+        """Тест: при ошибке расчета по одной точке оценка учитывает все посчитанные точки"""
+        calculator = MonteCarloCalculator(total_points=1000, mode=MODE_SCALAR, seed=3, pacer=Pacer(PACING_MAX))
+
+        def fail(*args):
+            raise OSError("disk full")
+
+        # Ошибка на сотой точке, когда в оценку перенесена только первая
+        monkeypatch.setattr(calculator.pacer, 'acquire', fail)
+        with pytest.raises(OSError):
+            calculator.calculate()
+
+        assert calculator.points_processed == 100
+        assert calculator.estimator.samples == 100
+
+    def test_plain_matches_counts(self):
+        """Тест совпадения обычной оценки с долей точек в круге"""
+        calculator = self.run(ESTIMATOR_PLAIN)
+        p = calculator.points_in_circle / calculator.points_processed
+
+        assert calculator.pi_estimate == 4 * calculator.points_in_circle / calculator.points_processed
+        assert calculator.estimator.variance() == pytest.approx(16 * p * (1 - p), rel=1e-4)
+
+    def test_stratified_cells_filled_evenly(self):
+        """Тест равного заполнения клеток сетки"""
+        estimator = Estimator(ESTIMATOR_STRATIFIED, strata=4)
+        x, y, _ = PointStream(1).generate(0, 1600)
+        (px, py, _), values, cells = estimator.transform(0, x, y)
+        estimator.add(values, cells)
+
+        assert np.all(estimator.counts == 100)
+        # Точка клетки 5 (второй ряд, второй столбец) лежит в квадрате [-0.5, 0] x [-0.5, 0]
+        assert np.all((-0.5 <= px[5::16]) & (px[5::16] < 0) & (-0.5 <= py[5::16]) & (py[5::16] < 0))
+
+    def test_merge(self):
+        """Тест объединения частичных оценок"""
+        x, y, _ = PointStream(1).generate(0, 10000)
+        whole = Estimator(ESTIMATOR_STRATIFIED)
+        whole.add(*whole.transform(0, x, y)[1:])
+
+        merged = Estimator(ESTIMATOR_STRATIFIED)
+        for start in (0, 3000):
+            part = Estimator(ESTIMATOR_STRATIFIED)
+            end = start + 3000 if start == 0 else 10000
+            part.add(*part.transform(start, x[start:end], y[start:end])[1:])
+            merged.merge(part.state())
+
+        assert merged.estimate() == pytest.approx(whole.estimate())
+        assert merged.variance() == pytest.approx(whole.variance())
+
+    @pytest.mark.parametrize("estimator", [ESTIMATOR_ANTITHETIC, ESTIMATOR_STRATIFIED, ESTIMATOR_QUARTER])
+    def test_lower_variance(self, estimator):
+        """Тест меньшей дисперсии на точку, чем у обычной оценки"""
+        plain = self.run(ESTIMATOR_PLAIN)
+        reduced = self.run(estimator)
+
+        assert reduced.estimator.variance() < plain.estimator.variance() / 2
+        assert abs(reduced.pi_estimate - math.pi) < 4 * reduced.half_width()
+
+    @pytest.mark.parametrize("estimator", ESTIMATORS)
+    def test_results_report_variance(self, estimator):
+        """Тест дисперсии и стандартной ошибки в результатах"""
+        calculator = self.run(estimator, total_points=50000)
+
+        results = calculator.get_latest_results()
+        assert results['estimator'] == estimator
+        assert results['variance'] == calculator.estimator.variance()
+        assert results['std_error'] == pytest.approx(math.sqrt(results['variance'] / 50000))
+
+    @pytest.mark.parametrize("estimator", ESTIMATORS)
+    def test_parallel_matches_vectorized(self, estimator):
+        """Тест совпадения оценки в пуле процессов и в одном процессе"""
+        vectorized = self.run(estimator, total_points=250001, chunk_size=30000)
+        with patch('web_app.monte_carlo.PARALLEL_TASK_SIZE', 100000):
+            parallel = self.run(estimator, total_points=250001, mode=MODE_PARALLEL, workers=1)
+
+        assert parallel.points_in_circle == vectorized.points_in_circle
+        assert parallel.pi_estimate == pytest.approx(vectorized.pi_estimate)
+        assert parallel.estimator.variance() == pytest.approx(vectorized.estimator.variance())
+
+    def test_reduced_variance_stops_earlier(self):
+        """Тест более ранней остановки по точности при меньшей дисперсии"""
+        plain = self.run(ESTIMATOR_PLAIN, total_points=10000000, chunk_size=4096, target_error=0.01)
+        stratified = self.run(ESTIMATOR_STRATIFIED, total_points=10000000, chunk_size=4096, target_error=0.01)
+
+        assert stratified.converged and plain.converged
+        assert stratified.points_processed < plain.points_processed / 2
+
+
+class TestCheckpoints:
+    """Тесты контрольных точек и продолжения расчета"""
+
+    @staticmethod
+    def interrupt(calculator):
+        """Остановить расчет на первой контрольной точке и вернуть ее (через JSON, как с диска)"""
+        saved = []
+
+        def on_checkpoint(state):
+            saved.append(json.loads(json.dumps(state)))
+            calculator.stop()
+
+        calculator.on_checkpoint = on_checkpoint
+        calculator.checkpoint_interval = 0
+        calculator.calculate()
+        return saved[0]
+
+    def test_ranges(self):
+        """Тест объединения и дополнения диапазонов"""
+        assert merge_ranges([[5, 8], [0, 3], [3, 4], [7, 10]]) == [[0, 4], [5, 10]]
+        assert list(missing_ranges([[2, 4], [6, 7]], 10, 3)) == [(0, 2), (4, 2), (7, 3)]
+        assert list(missing_ranges([], 5, 2)) == [(0, 2), (2, 2), (4, 1)]
+        assert list(missing_ranges([[0, 12]], 10, 3)) == []
+
+    @pytest.mark.parametrize("mode, kwargs", [
+        (MODE_SCALAR, {'total_points': 5000}),
+        (MODE_VECTORIZED, {'total_points': 200000, 'chunk_size': 30000, 'estimator': ESTIMATOR_STRATIFIED}),
+        (MODE_VECTORIZED, {'total_points': 200000, 'chunk_size': 30000, 'sampler': SAMPLER_SOBOL}),
+        (MODE_PARALLEL, {'total_points': 250001, 'workers': 1, 'estimator': ESTIMATOR_ANTITHETIC}),
+    ])
+    def test_resume_matches_uninterrupted(self, mode, kwargs):
+        """Тест продолжения с контрольной точки без потерь и повторов точек"""
+        def make():
+            return MonteCarloCalculator(mode=mode, seed=5, pacer=Pacer(PACING_MAX), **kwargs)
+
+        with patch('web_app.monte_carlo.PARALLEL_TASK_SIZE', 100000):
+            whole = make()
+            whole.calculate()
+
+            state = self.interrupt(make())
+            assert 0 < state['points_processed'] < kwargs['total_points']
+
+            resumed = MonteCarloCalculator.from_checkpoint(state)
+            assert resumed.points_processed == state['points_processed']
+            resumed.calculate()
+
+        assert resumed.points_processed == whole.points_processed
+        assert resumed.points_in_circle == whole.points_in_circle
+        assert resumed.pi_estimate == pytest.approx(whole.pi_estimate)
+        assert resumed.estimator.variance() == pytest.approx(whole.estimator.variance())
+        assert resumed.completed_ranges() == [[0, kwargs['total_points']]]
+
+    def test_parallel_checkpoint_records_ranges(self):
+        """Тест сохранения завершенных не по порядку задач пула процессов"""
+        calculator = MonteCarloCalculator(total_points=1000000, mode=MODE_PARALLEL, seed=1)
+        calculator.restore(dict(calculator.checkpoint(), points_processed=300, completed=[[200, 500]]))
+
+        assert calculator.completed_ranges() == [[200, 500]]
+        assert list(missing_ranges(calculator.completed, 1000, 400)) == [(0, 200), (500, 400), (900, 100)]
+
+    def test_elapsed_time_accumulates(self):
+        """Тест учета времени сеансов до продолжения"""
+        calculator = MonteCarloCalculator(total_points=100000, mode=MODE_VECTORIZED, chunk_size=1000,
+                                          seed=2, pacer=Pacer(PACING_MAX))
+        state = self.interrupt(calculator)
+        state['elapsed_time'] = 10.0
+
+        resumed = MonteCarloCalculator.from_checkpoint(state)
+        resumed.calculate()
+
+        assert resumed.elapsed_time > 10.0
+
+    def test_restore_publishes_results(self):
+        """Тест результатов восстановленного расчета до его продолжения"""
+        calculator = MonteCarloCalculator(total_points=100000, mode=MODE_VECTORIZED, chunk_size=1000,
+                                          seed=2, pacer=Pacer(PACING_MAX))
+        state = self.interrupt(calculator)
+
+        resumed = MonteCarloCalculator.from_checkpoint(state)
+        results = resumed.get_latest_results()
+        assert results['points_processed'] == state['points_processed']
+        assert results['pi_estimate'] == pytest.approx(calculator.pi_estimate)
+
+    def test_unsupported_version(self):
+        """Тест отклонения контрольной точки другой версии"""
+        state = dict(MonteCarloCalculator(total_points=100).checkpoint(), version=0)
+
+        with pytest.raises(ValueError):
+            MonteCarloCalculator.from_checkpoint(state)
+
+    def test_checkpoint_interval(self):
+        """Тест частоты контрольных точек"""
+        on_checkpoint = Mock()
+        calculator = MonteCarloCalculator(total_points=100000, mode=MODE_VECTORIZED, chunk_size=1000,
+                                          pacer=Pacer(PACING_MAX), on_checkpoint=on_checkpoint,
+                                          checkpoint_interval=3600)
+        calculator.calculate()
+
+        on_checkpoint.assert_not_called()
+
+
+class TestInstrumentation:
+    """Тесты измерения скорости и времени блоков"""
+
+    def test_histogram(self):
+        """Тест накопленных счетчиков корзин"""
+        histogram = Histogram((0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 2.0):
+            histogram.observe(value)
+
+        snapshot = histogram.snapshot()
+        assert snapshot['buckets'] == [[0.1, 2], [1.0, 3]]
+        assert snapshot['count'] == 4
+        assert snapshot['sum'] == pytest.approx(2.65)
+
+    def test_chunk_times(self):
+        """Тест учета каждого блока векторизованного расчета"""
+        calculator = MonteCarloCalculator(total_points=10000, mode=MODE_VECTORIZED, chunk_size=1000,
+                                          pacer=Pacer(PACING_MAX))
+        calculator.calculate()
+
+        results = calculator.get_latest_results()
+        assert results['chunk_time']['count'] == 10
+        assert results['chunk_time']['sum'] > 0
+        assert results['lock_wait']['count'] >= 10
+
+    def test_chunk_times_exclude_pacing(self):
+        """Тест: ожидание темпа не входит во время блока"""
+        calculator = MonteCarloCalculator(total_points=300, mode=MODE_VECTORIZED,
+                                          pacer=Pacer(PACING_DURATION, 0.3))
+        calculator.calculate()
+
+        chunk_time = calculator.get_latest_results()['chunk_time']
+        assert chunk_time['count'] > 1
+        assert chunk_time['sum'] < 0.1
+
+    def test_scalar_chunk_times(self):
+        """Тест учета блоков по 100 точек в расчете по одной точке"""
+        calculator = MonteCarloCalculator(total_points=1000, mode=MODE_SCALAR, pacer=Pacer(PACING_MAX))
+        calculator.calculate()
+
+        assert calculator.get_latest_results()['chunk_time']['count'] == 10
+
+    def test_throughput(self):
+        """Тест мгновенной и средней скорости"""
+        calculator = MonteCarloCalculator(total_points=2000, mode=MODE_VECTORIZED,
+                                          pacer=Pacer(PACING_RATE, 2000))
+        throughputs = []
+
+        def on_update():
+            throughputs.append(calculator.snapshot()['throughput'])
+
+        calculator.add_listener(on_update)
+        calculator.calculate()
+
+        measured = [throughput for throughput in throughputs if throughput is not None]
+        assert measured
+        assert measured[-1] == pytest.approx(2000, rel=0.3)
+
+        results = calculator.get_latest_results()
+        # После окончания расчета мгновенной скорости нет, средняя остается
+        assert results['throughput'] is None
+        assert results['average_throughput'] == pytest.approx(2000, rel=0.3)
+
+
+class TestDensity:
+    """Тесты растра плотности точек"""
+
+    def test_density_cells(self):
+        """Тест номеров пикселей: строки сверху вниз, вторая плоскость - вне круга"""
+        x = np.array([-1.0, 0.999, 0.0, -0.01, 1.0])
+        y = np.array([1.0, -1.0, 0.0, 0.01, -1.0])
+        in_circle = x ** 2 + y ** 2 <= 1.0
+
+        cells = density_cells(x, y, in_circle, size=4)
+
+        # Граница квадрата x = 1 и y = -1 попадает в крайний пиксель
+        assert cells.tolist() == [16 + 0, 16 + 15, 10, 5, 16 + 15]
+        assert density_bins(cells, size=4).reshape(2, 4, 4)[1, 3, 3] == 2
+
+    def test_density_bins_of_chunks(self):
+        """Тест подсчета по списку блоков номеров пикселей"""
+        assert density_bins([np.array([0, 1]), np.array([1])], size=2).tolist() == [1, 2, 0, 0, 0, 0, 0, 0]
+        assert density_bins([], size=2).sum() == 0
+
+    def test_grid_counts_points(self):
+        """Тест: растр содержит все добавленные точки"""
+        grid = DensityGrid()
+        x = np.random.default_rng(1).uniform(-1, 1, 10000)
+        y = np.random.default_rng(2).uniform(-1, 1, 10000)
+        in_circle = x ** 2 + y ** 2 <= 1.0
+
+        grid.add(x, y, in_circle)
+        grid.add(x, y, in_circle)
+        counts, version, base = grid.frame()
+
+        assert counts.shape == (2, DENSITY_SIZE, DENSITY_SIZE)
+        assert counts.dtype == np.uint32
+        assert version == 2
+        assert base == 0
+        assert counts[0].sum() == 2 * np.count_nonzero(in_circle)
+        assert counts.sum() == 20000
+
+    def test_grid_delta_frame(self):
+        """Тест разности с ранее отданным кадром"""
+        grid = DensityGrid(size=4)
+        grid.add_bins(np.ones(32, dtype=np.uint32))
+        full, version, _ = grid.frame()
+        grid.add_bins(np.arange(32, dtype=np.uint32))
+
+        delta, new_version, base = grid.frame(version)
+
+        assert base == version
+        assert new_version == version + 1
+        assert np.array_equal(delta.reshape(-1), np.arange(32))
+        assert np.array_equal(full + delta, grid.counts)
+
+    def test_grid_forgets_old_frames(self):
+        """Тест: по неизвестной или давней версии отдается полный растр"""
+        grid = DensityGrid(size=4)
+        grid.add_bins(np.ones(32, dtype=np.uint32))
+        first = grid.frame()[1]
+        for _ in range(DENSITY_KEYFRAMES):
+            grid.add_bins(np.ones(32, dtype=np.uint32))
+            grid.frame()
+
+        counts, _, base = grid.frame(first)
+        assert base == 0
+        assert counts.sum() == 32 * (DENSITY_KEYFRAMES + 1)
+        assert grid.frame(12345)[2] == 0
+
+        grid.release_frames()
+        assert grid.frame(grid.version)[2] == 0
+
+    def test_pack_density(self):
+        """Тест выбора наименьшего типа"""
+        assert pack_density(np.array([0, 255], dtype=np.uint32)) == ('uint8', b'\x00\xff')
+        assert pack_density(np.array([256], dtype=np.uint32)) == ('uint16', b'\x00\x01')
+        assert pack_density(np.array([65536], dtype=np.uint32)) == ('uint32', b'\x00\x00\x01\x00')
+
+    def test_density_by_default_for_large_runs(self):
+        """Тест: растр по умолчанию копится у больших расчетов блоками"""
+        assert MonteCarloCalculator(total_points=DENSITY_MIN_POINTS, mode=MODE_VECTORIZED).density is not None
+        assert MonteCarloCalculator(total_points=DENSITY_MIN_POINTS - 1, mode=MODE_VECTORIZED).density is None
+        assert MonteCarloCalculator(total_points=DENSITY_MIN_POINTS, mode=MODE_SCALAR).density is None
+        assert MonteCarloCalculator(total_points=100, mode=MODE_VECTORIZED, density=True).density is not None
+        assert MonteCarloCalculator(total_points=DENSITY_MIN_POINTS, mode=MODE_VECTORIZED, density=False).density is None
+
+    def test_scalar_density_rejected(self):
+        """Тест: расчет по одной точке не копит растр"""
+        with pytest.raises(ValueError):
+            MonteCarloCalculator(total_points=100, mode=MODE_SCALAR, density=True)
+
+    def test_vectorized_density(self):
+        """Тест растра векторизованного расчета"""
+        calculator = MonteCarloCalculator(total_points=30000, mode=MODE_VECTORIZED, chunk_size=7000, seed=1,
+                                          pacer=Pacer(PACING_MAX), density=True)
+        calculator.calculate()
+
+        counts = calculator.density.counts
+        assert counts.sum() == 30000
+        assert counts[0].sum() == calculator.points_in_circle
+        assert calculator.density.version == 5
+
+    def test_parallel_density(self):
+        """Тест растра, собранного из задач пула процессов"""
+        inside, _, _, _, bins = count_points_in_circle(1, 0, 10000, chunk_size=3000, density=True)
+        assert bins.dtype == np.uint32
+        assert bins.sum() == 10000
+        assert bins[:DENSITY_SIZE * DENSITY_SIZE].sum() == inside
+
+        calculator = MonteCarloCalculator(total_points=20000, mode=MODE_PARALLEL, workers=2, seed=1,
+                                          pacer=Pacer(PACING_MAX), density=True)
+        calculator.calculate()
+        assert calculator.density.counts.sum() == 20000
+        assert calculator.density.counts[0].sum() == calculator.points_in_circle
+
+    def test_no_density_after_restore(self):
+        """Тест: продолженный расчет не копит растр, в котором не было бы точек до контрольной точки"""
+        calculator = MonteCarloCalculator(total_points=20000, mode=MODE_VECTORIZED, seed=1,
+                                          pacer=Pacer(PACING_MAX), density=True)
+        calculator.calculate()
+        state = json.loads(json.dumps(calculator.checkpoint()))
+
+        resumed = MonteCarloCalculator.from_checkpoint(state)
+        resumed.show_preview()
+
+        assert resumed.density is None
+        assert len(resumed.points_sample) > 0
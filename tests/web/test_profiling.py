@@ -0,0 +1,93 @@
+# tests/web/test_profiling.py
+"""Тесты для хранилища профилей расчетов ProfileStore"""
+import os
+import pstats
+import time
+
+import pytest
+import sys
+
+# Добавляем путь для импорта
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from web_app.profiling import ProfileStore
+
+
+def busy(n):
+    """Функция, которая должна попасть в профиль"""
+    return sum(i * i for i in range(n))
+
+
+class TestProfileStore:
+    """Тесты для класса ProfileStore"""
+
+    def test_run_saves_profile(self, tmp_path):
+        """Тест сохранения профиля и результата функции"""
+        store = ProfileStore(str(tmp_path))
+
+        result = store.run('calc-1', lambda: busy(1000))
+
+        assert result == busy(1000)
+        assert store.exists('calc-1')
+        functions = {name for _, _, name in pstats.Stats(store.path('calc-1')).stats}
+        assert 'busy' in functions
+        assert os.listdir(tmp_path) == ['calc-1.pstats']
+
+    def test_profile_saved_on_error(self, tmp_path):
+        """Тест: профиль сохраняется, даже если функция упала"""
+        store = ProfileStore(str(tmp_path))
+
+        def fail():
+            raise RuntimeError("ошибка")
+
+        with pytest.raises(RuntimeError):
+            store.run('calc-1', fail)
+        assert store.exists('calc-1')
+
+    def test_report(self, tmp_path):
+        """Тест текстового отчета"""
+        store = ProfileStore(str(tmp_path))
+        store.run('calc-1', lambda: busy(1000))
+
+        assert 'busy' in store.report('calc-1', 'tottime', 10)
+        with pytest.raises(ValueError):
+            store.report('calc-1', 'unknown')
+
+    def test_missing_and_delete(self, tmp_path):
+        """Тест отсутствующего и удаленного профиля"""
+        store = ProfileStore(str(tmp_path))
+        assert not store.exists('calc-1')
+
+        store.run('calc-1', lambda: None)
+        store.delete('calc-1')
+        store.delete('calc-1')
+
+        assert not store.exists('calc-1')
+
+    def test_old_profiles_removed(self, tmp_path):
+        """Тест: сверх max_profiles удаляются самые старые профили"""
+        store = ProfileStore(str(tmp_path), max_profiles=2)
+        for calc_id in ('calc-1', 'calc-2', 'calc-3'):
+            store.run(calc_id, lambda: None)
+            # Разное время изменения файлов
+            time.sleep(0.02)
+
+        assert store.list() == ['calc-2', 'calc-3']
+        assert not store.exists('calc-1')
+
+    def test_resaved_profile_is_newest(self, tmp_path):
+        """Тест: повторно сохраненный профиль не удаляется первым"""
+        store = ProfileStore(str(tmp_path), max_profiles=2)
+        for calc_id in ('calc-1', 'calc-2', 'calc-1', 'calc-3'):
+            store.run(calc_id, lambda: None)
+            time.sleep(0.02)
+
+        assert store.list() == ['calc-1', 'calc-3']
+
+    @pytest.mark.parametrize("calc_id", ['', '../calc', 'a/b', '.hidden'])
+    def test_invalid_id(self, tmp_path, calc_id):
+        """Тест некорректных идентификаторов"""
+        store = ProfileStore(str(tmp_path))
+
+        with pytest.raises(ValueError):
+            store.path(calc_id)
@@ -0,0 +1,189 @@
+# tests/web/test_registry.py
+"""Тесты для реестра расчетов JobRegistry"""
+import numpy as np
+import pytest
+from unittest.mock import Mock, patch
+import sys
+import os
+
+# Добавляем путь для импорта
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from web_app.registry import JobRegistry, deep_sizeof
+from web_app.monte_carlo import DensityGrid
+
+
+def finish(registry, calc_id):
+    """Пометить расчет завершенным"""
+    registry[calc_id]['status'] = 'completed'
+
+
+class TestJobRegistry:
+    """Тесты для класса JobRegistry"""
+
+    def test_add_and_get(self):
+        """Тест регистрации расчета"""
+        registry = JobRegistry()
+        calculator = Mock(density=None)
+
+        calc_data = registry.add('a', calculator)
+
+        assert calc_data['calculator'] is calculator
+        assert calc_data['status'] == 'running'
+        assert 'a' in registry
+        assert registry.get('a') is calc_data
+        assert registry.get('missing') is None
+        assert len(registry) == 1
+
+    def test_evicts_least_recently_used_finished_job(self):
+        """Тест вытеснения давнее всех использованного завершенного расчета"""
+        registry = JobRegistry(max_jobs=3)
+        for calc_id in ('a', 'b', 'c'):
+            registry.add(calc_id, Mock(density=None))
+            finish(registry, calc_id)
+
+        # Обращение делает 'a' недавно использованным
+        registry.get('a')
+        registry.add('d', Mock(density=None))
+
+        assert 'b' not in registry
+        assert {'a', 'c', 'd'} == {calc_id for calc_id in ('a', 'b', 'c', 'd') if calc_id in registry}
+        assert registry.stats()['evicted'] == 1
+
+    def test_running_jobs_are_not_evicted(self):
+        """Тест отказа в регистрации, когда все расчеты выполняются"""
+        registry = JobRegistry(max_jobs=2)
+        registry.add('a', Mock(density=None))
+        registry.add('b', Mock(density=None))
+
+        assert registry.add('c', Mock(density=None)) is None
+        assert 'a' in registry and 'b' in registry
+
+    def test_idle_ttl(self):
+        """Тест удаления завершенных расчетов без обращений"""
+        registry = JobRegistry(idle_ttl=10)
+        with patch('web_app.registry.time.time', return_value=1000.0):
+            registry.add('finished', Mock(density=None))
+            registry.add('running', Mock(density=None))
+        finish(registry, 'finished')
+
+        with patch('web_app.registry.time.time', return_value=1011.0):
+            registry.sweep()
+
+        assert 'finished' not in registry
+        assert 'running' in registry
+
+    def test_history_is_capped(self):
+        """Тест ограничения истории результатов и точек"""
+        registry = JobRegistry(max_results=5, max_point_batches=3)
+        calc_data = registry.add('a', Mock(density=None))
+        points = (np.zeros(10), np.zeros(10), np.zeros(10, dtype=bool))
+
+        for i in range(20):
+            registry.record(calc_data, {'points_processed': i}, points)
+
+        assert len(calc_data['results']) == 5
+        assert calc_data['results'][-1] == {'points_processed': 19}
+        assert len(calc_data['points']) == 3
+
+    def test_empty_point_batches_are_skipped(self):
+        """Тест пропуска пустых пачек точек"""
+        registry = JobRegistry()
+        calc_data = registry.add('a', Mock(density=None))
+        registry.record(calc_data, {}, (np.zeros(0), np.zeros(0), np.zeros(0, dtype=bool)))
+
+        assert len(calc_data['points']) == 0
+
+    def test_stats(self):
+        """Тест счетчиков и объема истории"""
+        registry = JobRegistry(max_jobs=10)
+        calc_data = registry.add('a', Mock(density=None))
+        registry.add('b', Mock(density=None))
+        finish(registry, 'b')
+        registry.record(calc_data, {'points_processed': 1},
+                        (np.zeros(10), np.zeros(10), np.zeros(10, dtype=bool)))
+
+        stats = registry.stats()
+
+        assert stats['jobs'] == 2
+        assert stats['running'] == 1
+        assert stats['finished'] == 1
+        assert stats['max_jobs'] == 10
+        assert stats['results'] == 1
+        assert stats['points_bytes'] == 80 + 80 + 10
+        assert stats['density_bytes'] == 0
+        assert stats['bytes'] == stats['points_bytes'] + stats['results_bytes']
+
+    def test_results_bytes_include_nested_values(self):
+        """Тест: объем результатов учитывает вложенные списки и массивы, а не только внешний словарь"""
+        registry = JobRegistry()
+        calc_data = registry.add('a', Mock(density=None))
+        registry.record(calc_data, {'points_processed': 1, 'history': list(range(1000)), 'grid': np.zeros(1000)},
+                        (np.zeros(0), np.zeros(0), np.zeros(0, dtype=bool)))
+
+        stats = registry.stats()
+
+        # Указатели списка и данные массива, не считая самих чисел
+        assert stats['results_bytes'] > 1000 * 8 + 1000 * 8
+
+    def test_results_bytes_follow_trimmed_history(self):
+        """Тест: объем результатов уменьшается вместе с вытесненными из истории результатами"""
+        registry = JobRegistry(max_results=2)
+        calc_data = registry.add('a', Mock(density=None))
+        no_points = (np.zeros(0), np.zeros(0), np.zeros(0, dtype=bool))
+        registry.record(calc_data, {'history': list(range(1000))}, no_points)
+        registry.record(calc_data, {'points_processed': 1}, no_points)
+        registry.record(calc_data, {'points_processed': 2}, no_points)
+
+        assert registry.stats()['results_bytes'] == sum(deep_sizeof(results) for results in calc_data['results'])
+
+    def test_density_bytes(self):
+        """Тест учета растров плотности и хранимых кадров"""
+        registry = JobRegistry()
+        grid = DensityGrid(size=10)
+        registry.add('a', Mock(density=grid))
+        assert registry.stats()['density_bytes'] == 2 * 10 * 10 * 4
+
+        grid.frame()
+        stats = registry.stats()
+        assert stats['density_bytes'] == 2 * 2 * 10 * 10 * 4
+        assert stats['bytes'] == stats['points_bytes'] + stats['results_bytes'] + stats['density_bytes']
+
+    def test_queued_job_is_not_evicted(self):
+        """Тест: ожидающий в очереди расчет не вытесняется"""
+        registry = JobRegistry(max_jobs=1)
+        registry.add('a', Mock(density=None), status='queued')
+
+        assert registry.add('b', Mock(density=None)) is None
+        assert registry.stats()['queued'] == 1
+        assert registry.stats()['finished'] == 0
+
+    def test_discard(self):
+        """Тест удаления расчета"""
+        registry = JobRegistry()
+        registry.add('a', Mock(density=None))
+        registry.discard('a')
+        registry.discard('a')
+
+        assert 'a' not in registry
+
+
+class TestDeepSizeof:
+    """Тесты для оценки объема deep_sizeof"""
+
+    def test_nested_containers(self):
+        """Тест учета вложенных контейнеров"""
+        inner = [1.5, 2.5]
+        assert deep_sizeof({'a': inner}) == (sys.getsizeof({'a': inner}) + sys.getsizeof('a')
+                                             + sys.getsizeof(inner) + 2 * sys.getsizeof(1.5))
+
+    def test_shared_objects_counted_once(self):
+        """Тест: общий объект учитывается один раз"""
+        inner = list(range(100))
+        assert deep_sizeof([inner, inner]) == sys.getsizeof([inner, inner]) + deep_sizeof(inner)
+
+    def test_numpy_arrays(self):
+        """Тест учета данных массивов и представлений"""
+        array = np.zeros(1000)
+        assert deep_sizeof(array) >= array.nbytes
+        assert deep_sizeof(array[:500]) >= 500 * 8
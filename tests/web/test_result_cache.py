@@ -0,0 +1,76 @@
+# tests/web/test_result_cache.py
+"""Тесты для кэша результатов ResultCache"""
+import os
+
+import pytest
+import sys
+
+# Добавляем путь для импорта
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from web_app.result_cache import ResultCache, cache_key
+
+KEY = cache_key(1, 'random', 'plain', 1)
+
+
+def make_state(points_processed):
+    """Состояние расчета на points_processed точках"""
+    return {'points_processed': points_processed, 'points_in_circle': points_processed * 3 // 4}
+
+
+class TestResultCache:
+    """Тесты для класса ResultCache"""
+
+    def test_exact_and_prefix(self):
+        """Тест выбора результата на том же или наибольшем меньшем количестве точек"""
+        cache = ResultCache()
+        cache.put(KEY, make_state(1000))
+        cache.put(KEY, make_state(5000))
+
+        assert cache.get(KEY, 5000) == make_state(5000)
+        assert cache.get(KEY, 4000) == make_state(1000)
+        assert cache.get(KEY, 500) is None
+        assert cache.get(cache_key(2, 'random', 'plain', 1), 5000) is None
+
+        stats = cache.stats()
+        assert (stats['hits'], stats['prefix_hits'], stats['misses']) == (1, 1, 2)
+
+    def test_lru_eviction(self):
+        """Тест вытеснения давно использованных результатов"""
+        cache = ResultCache(max_entries=2)
+        cache.put(KEY, make_state(1))
+        cache.put(KEY, make_state(2))
+        cache.get(KEY, 1)
+        cache.put(KEY, make_state(3))
+
+        assert cache.get(KEY, 1) == make_state(1)
+        assert cache.get(KEY, 2) == make_state(1)
+        assert cache.stats()['entries'] == 2
+
+    def test_disk_tier(self, tmp_path):
+        """Тест результатов на диске после перезапуска"""
+        ResultCache(directory=str(tmp_path)).put(KEY, make_state(1000))
+
+        cache = ResultCache(directory=str(tmp_path))
+        assert cache.stats()['entries'] == 0
+        assert cache.get(KEY, 2000) == make_state(1000)
+        assert cache.stats()['entries'] == 1
+
+    def test_disk_size_limit(self, tmp_path):
+        """Тест удаления давно использованных файлов сверх лимита"""
+        cache = ResultCache(max_entries=1, directory=str(tmp_path), max_disk_bytes=200)
+        for points in (1000, 2000, 3000):
+            cache.put(KEY, dict(make_state(points), padding='x' * 60))
+            os.utime(tmp_path / f'{KEY}-{points}.json', (points, points))
+
+        names = sorted(os.listdir(tmp_path))
+        assert names == [f'{KEY}-3000.json']
+        assert cache.stats()['disk_bytes'] <= 200
+
+    def test_memory_only(self):
+        """Тест кэша без каталога"""
+        cache = ResultCache()
+        cache.put(KEY, make_state(1000))
+
+        assert cache.stats()['disk_bytes'] == 0
+        assert cache.stats()['max_disk_bytes'] == 0
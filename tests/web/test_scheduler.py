@@ -0,0 +1,180 @@
+# tests/web/test_scheduler.py
+"""Тесты для планировщика расчетов JobScheduler"""
+import threading
+import time
+
+import pytest
+import sys
+import os
+
+# Добавляем путь для импорта
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from web_app.scheduler import JobScheduler, QueueFullError, ClientLimitError
+
+
+@pytest.fixture
+def make_scheduler():
+    """Фикстура для создания планировщика с остановкой после теста"""
+    schedulers = []
+
+    def factory(**kwargs):
+        scheduler = JobScheduler(**kwargs)
+        schedulers.append(scheduler)
+        return scheduler
+
+    yield factory
+    for scheduler in schedulers:
+        scheduler.shutdown(wait=False)
+
+
+def wait_until(condition, timeout=5):
+    """Дождаться выполнения условия"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return
+        time.sleep(0.01)
+    raise AssertionError("Условие не выполнено")
+
+
+class TestJobScheduler:
+    """Тесты для класса JobScheduler"""
+
+    def test_runs_jobs(self, make_scheduler):
+        """Тест выполнения задач пулом"""
+        scheduler = make_scheduler(workers=2)
+        done = []
+        for i in range(5):
+            scheduler.submit(str(i), lambda i=i: done.append(i))
+
+        wait_until(lambda: scheduler.stats()['completed'] == 5)
+        assert sorted(done) == [0, 1, 2, 3, 4]
+        assert scheduler.stats()['average_duration'] is not None
+
+    def test_invalid_workers(self):
+        """Тест неположительного количества потоков"""
+        with pytest.raises(ValueError):
+            JobScheduler(workers=0)
+
+    def test_pool_size_is_bounded(self, make_scheduler):
+        """Тест ограничения количества одновременных задач"""
+        scheduler = make_scheduler(workers=2)
+        release = threading.Event()
+        active = []
+        peak = []
+
+        def job():
+            active.append(1)
+            peak.append(len(active))
+            release.wait()
+            active.pop()
+
+        for i in range(6):
+            scheduler.submit(str(i), job)
+
+        wait_until(lambda: scheduler.stats()['running'] == 2)
+        assert scheduler.stats()['queued'] == 4
+        release.set()
+        wait_until(lambda: scheduler.stats()['completed'] == 6)
+        assert max(peak) == 2
+
+    def test_priority_and_position(self, make_scheduler):
+        """Тест порядка очереди по приоритету и поступлению"""
+        scheduler = make_scheduler(workers=1)
+        release = threading.Event()
+        order = []
+        scheduler.submit('blocker', release.wait)
+        wait_until(lambda: scheduler.stats()['running'] == 1)
+
+        assert scheduler.submit('low', lambda: order.append('low')) == 1
+        assert scheduler.submit('normal', lambda: order.append('normal'), priority=1) == 1
+        assert scheduler.submit('high', lambda: order.append('high'), priority=5) == 1
+        assert scheduler.submit('normal-2', lambda: order.append('normal-2'), priority=1) == 3
+
+        assert scheduler.position('low') == 4
+        assert scheduler.position('blocker') is None
+
+        release.set()
+        wait_until(lambda: len(order) == 4)
+        assert order == ['high', 'normal', 'normal-2', 'low']
+
+    def test_cancel(self, make_scheduler):
+        """Тест отмены ожидающей задачи"""
+        scheduler = make_scheduler(workers=1)
+        release = threading.Event()
+        done = []
+        scheduler.submit('blocker', release.wait)
+        wait_until(lambda: scheduler.stats()['running'] == 1)
+        scheduler.submit('a', lambda: done.append('a'))
+        scheduler.submit('b', lambda: done.append('b'))
+
+        assert scheduler.cancel('a') is True
+        assert scheduler.cancel('a') is False
+        assert scheduler.position('b') == 1
+
+        release.set()
+        wait_until(lambda: scheduler.stats()['completed'] == 2)
+        assert done == ['b']
+
+    def test_queue_limit(self, make_scheduler):
+        """Тест отказа при заполненной очереди"""
+        scheduler = make_scheduler(workers=1, max_queue=1)
+        release = threading.Event()
+        scheduler.submit('blocker', release.wait)
+        wait_until(lambda: scheduler.stats()['running'] == 1)
+        scheduler.submit('queued', lambda: None)
+
+        with pytest.raises(QueueFullError) as error:
+            scheduler.submit('rejected', lambda: None)
+
+        assert error.value.status_code == 503
+        assert error.value.retry_after >= 1
+        assert scheduler.stats()['rejected'] == 1
+        release.set()
+
+    def test_client_limit(self, make_scheduler):
+        """Тест ограничения расчетов одного клиента"""
+        scheduler = make_scheduler(workers=1, max_per_client=2)
+        release = threading.Event()
+        scheduler.submit('a', release.wait, client='alice')
+        scheduler.submit('b', lambda: None, client='alice')
+
+        with pytest.raises(ClientLimitError) as error:
+            scheduler.submit('c', lambda: None, client='alice')
+        assert error.value.status_code == 429
+
+        # Другой клиент не ограничен чужими расчетами
+        scheduler.submit('d', lambda: None, client='bob')
+
+        release.set()
+        wait_until(lambda: scheduler.stats()['completed'] == 3)
+        scheduler.submit('e', lambda: None, client='alice')
+
+    def test_failing_job_does_not_stop_worker(self, make_scheduler):
+        """Тест продолжения работы после ошибки задачи"""
+        scheduler = make_scheduler(workers=1)
+        done = []
+
+        def fail():
+            raise RuntimeError("ошибка")
+
+        scheduler.submit('fail', fail)
+        scheduler.submit('ok', lambda: done.append('ok'))
+
+        wait_until(lambda: done == ['ok'])
+
+    def test_shutdown_cancels_queued(self, make_scheduler):
+        """Тест остановки планировщика"""
+        scheduler = make_scheduler(workers=1)
+        release = threading.Event()
+        done = []
+        scheduler.submit('blocker', release.wait)
+        scheduler.submit('queued', lambda: done.append('queued'))
+
+        release.set()
+        scheduler.shutdown()
+
+        with pytest.raises(QueueFullError):
+            scheduler.submit('late', lambda: None)
+        assert scheduler.stats()['queued'] == 0
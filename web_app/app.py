@@ -1,14 +1,119 @@
-from flask import Flask, render_template, jsonify, request
+from flask import Flask, Response, g, render_template, jsonify, request, send_file, stream_with_context
+import base64
+import gzip
 import json
-import time
+import logging
+import os
 import threading
-from monte_carlo import MonteCarloCalculator
+import time
+from monte_carlo import (MonteCarloCalculator, Pacer, MODES, MODE_VECTORIZED, PACING_AUTO, DEFAULT_CONFIDENCE,
+                         SAMPLER_RANDOM, ESTIMATOR_PLAIN, DEFAULT_STRATA, DEFAULT_CHECKPOINT_INTERVAL,
+                         pack_points, points_as_dicts, pack_density)
+from registry import JobRegistry, ACTIVE_STATUSES
+from scheduler import JobScheduler, AdmissionError, QueueFullError, DEFAULT_WORKERS, DEFAULT_MAX_QUEUE, DEFAULT_MAX_PER_CLIENT
+from history import RunHistory, DEFAULT_PAGE_SIZE
+from checkpoint import CheckpointStore
+from result_cache import ResultCache, cache_key, DEFAULT_MAX_ENTRIES, DEFAULT_MAX_DISK_BYTES
+from profiling import ProfileStore, PROFILE_SORTS, DEFAULT_REPORT_LINES, DEFAULT_MAX_PROFILES
+from metrics import TimedLock, RequestMetrics, MetricsWriter, merge_histograms, PROMETHEUS_CONTENT_TYPE
 
 app = Flask(__name__)
+logger = logging.getLogger(__name__)
+
+# Максимальная частота событий потока /api/stream (событий в секунду)
+app.config.setdefault('STREAM_MAX_RATE', 10)
+# Как долго поток ждет новых результатов, прежде чем перепроверить статус (с)
+app.config.setdefault('STREAM_IDLE_TIMEOUT', 1.0)
+# Файл базы истории расчетов
+app.config.setdefault('HISTORY_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'history.sqlite3'))
+# Максимальный размер страницы /api/history
+app.config.setdefault('HISTORY_MAX_PAGE_SIZE', 100)
+# Каталог контрольных точек выполняющихся расчетов
+app.config.setdefault('CHECKPOINT_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'checkpoints'))
+# Как часто сохраняется контрольная точка расчета (с)
+app.config.setdefault('CHECKPOINT_INTERVAL', DEFAULT_CHECKPOINT_INTERVAL)
+# Каталог профилей расчетов, запущенных с profile=true
+app.config.setdefault('PROFILE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'profiles'))
+# Сколько последних профилей хранится (старые удаляются)
+app.config.setdefault('PROFILE_MAX_FILES', DEFAULT_MAX_PROFILES)
+# Кэш результатов: количество в памяти, каталог на диске (None - только память) и его предельный размер
+app.config.setdefault('RESULT_CACHE_SIZE', DEFAULT_MAX_ENTRIES)
+app.config.setdefault('RESULT_CACHE_DIR', None)
+app.config.setdefault('RESULT_CACHE_MAX_BYTES', DEFAULT_MAX_DISK_BYTES)
+# Планировщик: количество одновременных расчетов, длина очереди и лимит расчетов одного клиента
+app.config.setdefault('SCHEDULER_WORKERS', DEFAULT_WORKERS)
+app.config.setdefault('SCHEDULER_MAX_QUEUE', DEFAULT_MAX_QUEUE)
+app.config.setdefault('SCHEDULER_MAX_PER_CLIENT', DEFAULT_MAX_PER_CLIENT)
+
+
+class LazyService:
+    """Объект, создаваемый при первом обращении
+
+    Файлы истории, каталоги и потоки планировщика создаются не при импорте
+    модуля, а при первом использовании, поэтому ключи app.config, заданные
+    после импорта (например, в тестах или при встраивании), действуют.
+    """
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._instance = None
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        return getattr(self.instance, name)
+
+    @property
+    def instance(self):
+        """Созданный объект (создается при первом вызове)"""
+        if self._instance is None:
+            with self._lock:
+                if self._instance is None:
+                    self._instance = self._factory()
+        return self._instance
+
+
+# Глобальный реестр для хранения состояния вычислений
+calculations = JobRegistry()
+# Время ожидания блокировки попадает в /api/metrics
+calculation_lock = TimedLock()
+# Последний выданный ID расчета
+last_calc_id = 0
+
+# История завершенных расчетов
+history = LazyService(lambda: RunHistory(app.config['HISTORY_PATH']))
+
+# Контрольные точки для продолжения расчетов после перезапуска сервера
+checkpoints = LazyService(lambda: CheckpointStore(app.config['CHECKPOINT_DIR']))
+
+# Профили cProfile для поиска узких мест расчета
+profiles = LazyService(lambda: ProfileStore(app.config['PROFILE_DIR'], app.config['PROFILE_MAX_FILES']))
+
+# Результаты расчетов с seed для мгновенного повтора и продолжения
+result_cache = LazyService(lambda: ResultCache(app.config['RESULT_CACHE_SIZE'], app.config['RESULT_CACHE_DIR'],
+                                               app.config['RESULT_CACHE_MAX_BYTES']))
+
+# Расчеты выполняются пулом потоков планировщика, а не потоком на запрос
+scheduler = LazyService(lambda: JobScheduler(app.config['SCHEDULER_WORKERS'], app.config['SCHEDULER_MAX_QUEUE'],
+                                             app.config['SCHEDULER_MAX_PER_CLIENT']))
+
+# Длительность запросов и отправленные байты для /api/metrics
+request_metrics = RequestMetrics()
 
-# Глобальный объект для хранения состояния вычислений
-calculations = {}
-calculation_lock = threading.Lock()
+
+@app.before_request
+def start_request_timer():
+    """Запомнить время начала обработки запроса"""
+    g.request_started = time.perf_counter()
+
+
+@app.after_request
+def record_request(response):
+    """Учесть длительность обработки и размер ответа (байты потока событий учитываются по мере отправки)"""
+    started = g.get('request_started')
+    if started is not None:
+        request_metrics.observe(request.endpoint or 'not_found', response.status_code,
+                                time.perf_counter() - started, response.calculate_content_length() or 0)
+    return response
 
 
 @app.route('/')
@@ -21,78 +126,206 @@ def index():
 def start_calculation():
     """Начать новое вычисление"""
     data = request.json
-    total_points = int(data.get('total_points', 10000))
+    total_points = data.get('total_points', 10000)
+    mode = data.get('mode', MODE_VECTORIZED)
+    workers = data.get('workers')
+    seed = data.get('seed')
+    # Последовательность точек: random, sobol или halton
+    sampler = data.get('sampler', SAMPLER_RANDOM)
+    # Оценка: plain, antithetic, stratified (strata - сторона сетки) или quarter
+    estimator = data.get('estimator', ESTIMATOR_PLAIN)
+    strata = data.get('strata', DEFAULT_STRATA)
+    # Темп: auto, max, rate (pacing_value - точек в секунду) или duration (pacing_value - секунд)
+    pacing = data.get('pacing', PACING_AUTO)
+    pacing_value = data.get('pacing_value')
+    # Остановка по точности: целевая полуширина доверительного интервала и уровень доверия
+    target_error = data.get('target_error')
+    confidence = data.get('confidence', DEFAULT_CONFIDENCE)
+    # Использовать ли кэш результатов (только для расчетов с seed)
+    use_cache = bool(data.get('cache', True))
+    # Приоритет в очереди: больший выполняется раньше
+    priority = data.get('priority', 0)
+    # Профилировать ли поток расчета (профиль - /api/profile/<calc_id>)
+    profile = bool(data.get('profile', False))
+    # Копить ли растр плотности точек (/api/density/<calc_id>); по умолчанию - у больших расчетов блоками
+    density = data.get('density')
+
+    # Числовые параметры приводятся до проверок: строка вместо числа - ошибка запроса, а не сервера
+    try:
+        total_points = int(total_points)
+        workers = int(workers) if workers is not None else None
+        seed = int(seed) if seed is not None else None
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'message': 'Количество точек, процессов и seed должны быть целыми числами'})
+
+    if mode not in MODES:
+        return jsonify({'success': False, 'message': 'Неизвестный режим расчета'})
+    if workers is not None and workers <= 0:
+        return jsonify({'success': False, 'message': 'Количество процессов должно быть положительным'})
+    if seed is not None and seed < 0:
+        return jsonify({'success': False, 'message': 'seed должен быть неотрицательным'})
+    if not isinstance(priority, int):
+        return jsonify({'success': False, 'message': 'Приоритет должен быть целым числом'})
 
-    # Создаем уникальный ID для расчета
-    calc_id = str(int(time.time() * 1000))
+    try:
+        pacer = Pacer(pacing, float(pacing_value) if pacing_value is not None else None)
+        # Создаем калькулятор (запускается в отдельном потоке)
+        calculator = MonteCarloCalculator(
+            total_points,
+            mode=mode,
+            workers=workers,
+            seed=seed,
+            pacer=pacer,
+            target_error=float(target_error) if target_error is not None else None,
+            confidence=float(confidence),
+            sampler=sampler,
+            estimator=estimator,
+            strata=int(strata),
+            checkpoint_interval=app.config['CHECKPOINT_INTERVAL'],
+            density=bool(density) if density is not None else None
+        )
+    except (TypeError, ValueError) as e:
+        return jsonify({'success': False, 'message': str(e)})
 
-    # Создаем и запускаем калькулятор в отдельном потоке
-    calculator = MonteCarloCalculator(total_points)
+    # Расчет с seed продолжается с результата того же потока точек из кэша:
+    # при совпадении количества точек досчитывать нечего
+    cached_points = None
+    # Профиль расчета из кэша был бы пустым
+    if use_cache and not profile and calculator.seeded and calculator.target_error is None:
+        state = result_cache.get(result_key(calculator), calculator.total_points)
+        if state is not None:
+            # Время и скорость расчета учитывают только досчитанные точки
+            calculator.restore_cached(state)
+            calculator.show_preview()
+            cached_points = state['points_processed']
+    # Результат целиком из кэша завершается сразу, без очереди планировщика
+    served_from_cache = cached_points is not None and cached_points >= calculator.total_points
 
     with calculation_lock:
-        calculations[calc_id] = {
-            'calculator': calculator,
-            'status': 'running',
-            'start_time': time.time(),
-            'results': [],
-            'points': [],
-            'last_update': time.time()
-        }
+        calc_id = new_calc_id()
+        calc_data = calculations.add(calc_id, calculator, status='completed' if served_from_cache else 'queued')
+        if calc_data is not None:
+            calc_data['profile'] = profile
+    if calc_data is None:
+        return registry_full()
 
-    # Запускаем расчет в отдельном потоке
-    thread = threading.Thread(
-        target=run_calculation,
-        args=(calc_id, calculator)
-    )
-    thread.daemon = True
-    thread.start()
+    if served_from_cache:
+        finish_calculation(calc_id, calculator, 'completed')
+        position = None
+    else:
+        try:
+            position = launch_calculation(calc_id, calculator, priority, profile)
+        except AdmissionError as e:
+            return rejected(calc_id, e)
 
     return jsonify({
         'success': True,
         'calc_id': calc_id,
+        'seed': calculator.seed,
+        'cached_points': cached_points,
+        'queue_position': position,
+        'profile': profile,
+        'density': calculator.density is not None,
         'message': 'Расчет начат'
     })
 
 
+@app.route('/api/checkpoints')
+def get_checkpoints():
+    """Получить прерванные расчеты, которые можно продолжить с контрольной точки"""
+    states = checkpoints.list()
+    with calculation_lock:
+        # Контрольные точки выполняющихся расчетов не считаются прерванными
+        states = [state for state in states
+                  if state['id'] not in calculations or calculations[state['id']]['status'] not in ACTIVE_STATUSES]
+
+    return jsonify([
+        {
+            'id': state['id'],
+            'total_points': state['total_points'],
+            'points_processed': state['points_processed'],
+            'progress': state['points_processed'] / state['total_points'] * 100 if state['total_points'] else 0,
+            'mode': state['mode'],
+            'seed': state['seed'],
+            'sampler': state['sampler'],
+            'estimator': state['estimator'],
+            'elapsed_time': state['elapsed_time'],
+            'saved_at': state['saved_at']
+        }
+        for state in states
+    ])
+
+
+@app.route('/api/resume/<calc_id>', methods=['POST'])
+def resume_calculation(calc_id):
+    """Продолжить прерванный расчет с последней контрольной точки"""
+    try:
+        state = checkpoints.load(calc_id)
+    except ValueError:
+        state = None
+    if state is None:
+        return jsonify({'success': False, 'message': 'Контрольная точка не найдена'})
+
+    try:
+        calculator = MonteCarloCalculator.from_checkpoint(
+            state, checkpoint_interval=app.config['CHECKPOINT_INTERVAL']
+        )
+    except (ValueError, KeyError) as e:
+        return jsonify({'success': False, 'message': f'Некорректная контрольная точка: {e}'})
+
+    with calculation_lock:
+        calc_data = calculations.get(calc_id)
+        if calc_data is not None and calc_data['status'] in ACTIVE_STATUSES:
+            return jsonify({'success': False, 'message': 'Расчет уже выполняется'})
+
+        registered = calculations.add(calc_id, calculator, status='queued') is not None
+    if not registered:
+        return registry_full()
+
+    try:
+        position = launch_calculation(calc_id, calculator)
+    except AdmissionError as e:
+        return rejected(calc_id, e)
+
+    return jsonify({
+        'success': True,
+        'calc_id': calc_id,
+        'seed': calculator.seed,
+        'points_processed': calculator.points_processed,
+        'queue_position': position,
+        'message': 'Расчет продолжен'
+    })
+
+
 @app.route('/api/stop/<calc_id>', methods=['POST'])
 def stop_calculation(calc_id):
-    """Остановить вычисление"""
+    """Остановить вычисление
+
+    Ожидающий расчет убирается из очереди, а выполняющийся прерывается после
+    текущего блока точек: поток планировщика освобождается, а частичный
+    результат записывается в историю со статусом stopped.
+    """
     with calculation_lock:
-        if calc_id in calculations:
-            calculations[calc_id]['status'] = 'stopped'
+        calc_data = calculations.get(calc_id)
+        if calc_data is not None:
+            if calc_data['status'] in ACTIVE_STATUSES:
+                scheduler.cancel(calc_id)
+                calc_data['calculator'].stop()
+                calc_data['status'] = 'stopped'
             return jsonify({'success': True, 'message': 'Расчет остановлен'})
     return jsonify({'success': False, 'message': 'Расчет не найден'})
 
 
 @app.route('/api/status/<calc_id>')
 def get_status(calc_id):
-    """Получить статус вычисления"""
-    with calculation_lock:
-        if calc_id in calculations:
-            calc_data = calculations[calc_id]
-
-            # Получаем последние результаты
-            results = calc_data['calculator'].get_latest_results()
-            points = calc_data['calculator'].get_latest_points()
-
-            status = {
-                'status': calc_data['status'],
-                'progress': calc_data['calculator'].get_progress(),
-                'current_pi': results.get('pi_estimate', 0),
-                'points_processed': results.get('points_processed', 0),
-                'points_in_circle': results.get('points_in_circle', 0),
-                'elapsed_time': time.time() - calc_data['start_time'],
-                'points': points,
-                'error': abs(results.get('pi_estimate', 0) - 3.141592653589793)
-            }
-
-            # Сохраняем результаты
-            if results:
-                calc_data['results'].append(results)
-                calc_data['points'].extend(points)
-                calc_data['last_update'] = time.time()
-
-            return jsonify(status)
+    """Получить статус вычисления
+
+    Точки - из выборки расчета, записанные после курсора cursor (поле
+    points_cursor прошлого ответа); без него - вся выборка.
+    """
+    calc_data = find_calculation(calc_id)
+    if calc_data is not None:
+        return jsonify(collect_status(calc_data, packed_points_requested(), points_cursor()))
 
     return jsonify({
         'status': 'not_found',
@@ -100,9 +333,433 @@ def get_status(calc_id):
     })
 
 
-def run_calculation(calc_id, calculator):
-    """Запуск расчета в отдельном потоке"""
-    calculator.calculate()
+@app.route('/api/stream/<calc_id>')
+def stream_status(calc_id):
+    """Поток статуса вычисления (Server-Sent Events)
+
+    Событие отправляется, когда калькулятор обновил результаты, но не чаще
+    STREAM_MAX_RATE раз в секунду. Каждое событие несет точки выборки,
+    записанные после прошлого события; курсор выборки передается как id
+    события, так что переподключившийся EventSource (Last-Event-ID) получает
+    только новые точки, а новый зритель - всю выборку.
+    """
+    interval = stream_interval(request.args.get('rate', type=float))
+    idle_timeout = app.config['STREAM_IDLE_TIMEOUT']
+    packed = packed_points_requested()
+    cursor = points_cursor()
+
+    def generate():
+        nonlocal cursor
+        version = None
+        while True:
+            calc_data = find_calculation(calc_id)
+            if calc_data is None:
+                yield format_event({'status': 'not_found', 'message': 'Расчет не найден'})
+                return
+            status = collect_status(calc_data, packed, cursor)
+            cursor = status['points_cursor']
+
+            event = format_event(status, cursor)
+            request_metrics.add_bytes('stream_status', len(event.encode('utf-8')))
+            yield event
+            if status['status'] not in ACTIVE_STATUSES:
+                return
+
+            # Объединяем обновления, пришедшие за интервал, в одно событие
+            time.sleep(interval)
+            version = calc_data['calculator'].wait_for_update(version, idle_timeout)
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
+@app.route('/api/registry')
+def get_registry_stats():
+    """Получить размер реестра расчетов"""
+    with calculation_lock:
+        calculations.sweep()
+        return jsonify(calculations.stats())
+
+
+@app.route('/api/scheduler')
+def get_scheduler_stats():
+    """Получить загрузку пула расчетов и очереди"""
+    return jsonify(scheduler.stats())
+
+
+@app.route('/api/cache')
+def get_cache_stats():
+    """Получить размер кэша результатов и количество попаданий"""
+    return jsonify(result_cache.stats())
+
+
+@app.route('/api/profile/<calc_id>')
+def get_profile(calc_id):
+    """Профиль расчета, запущенного с profile=true
+
+    По умолчанию - файл pstats (python -m pstats, snakeviz); format=text -
+    текстовый отчет о самых затратных функциях с сортировкой sort
+    (cumulative, tottime или calls) и количеством строк lines.
+    """
+    try:
+        available = profiles.exists(calc_id)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+
+    if not available:
+        calc_data = find_calculation(calc_id)
+        if calc_data is not None and calc_data.get('profile') and calc_data['status'] in ACTIVE_STATUSES:
+            message = 'Профиль появится после окончания расчета'
+        else:
+            message = 'Профиль не найден'
+        return jsonify({'success': False, 'message': message}), 404
+
+    if request.args.get('format') == 'text':
+        sort = request.args.get('sort', PROFILE_SORTS[0])
+        if sort not in PROFILE_SORTS:
+            return jsonify({'success': False, 'message': 'Неизвестный порядок сортировки'}), 400
+        lines = max(request.args.get('lines', DEFAULT_REPORT_LINES, type=int), 1)
+        return Response(profiles.report(calc_id, sort, lines), mimetype='text/plain')
+
+    return send_file(profiles.path(calc_id), mimetype='application/octet-stream',
+                     as_attachment=True, download_name=f'{calc_id}.pstats')
+
+
+@app.route('/api/density/<calc_id>')
+def get_density(calc_id):
+    """Растр плотности точек расчета
+
+    Тело - массив 2 x size x size (точки в круге и вне круга, строки сверху
+    вниз) в типе из заголовка X-Density-Dtype (uint8, uint16 или uint32,
+    little-endian). С base=<версия ранее полученного кадра> передается
+    прирост с него, если сервер еще хранит этот кадр; X-Density-Base - версия,
+    к которой прибавлять данные (0 - полный растр). Клиентам, принимающим
+    gzip, тело сжимается.
+    """
+    calc_data = find_calculation(calc_id)
+    if calc_data is None:
+        return jsonify({'success': False, 'message': 'Расчет не найден'}), 404
+    grid = calc_data['calculator'].density
+    if grid is None:
+        return jsonify({'success': False, 'message': 'Растр плотности не копится'}), 404
+
+    counts, version, base = grid.frame(request.args.get('base', type=int))
+    dtype, body = pack_density(counts)
+
+    response = Response(body, mimetype='application/octet-stream')
+    if 'gzip' in request.accept_encodings:
+        # Быстрое сжатие: растр отдается много раз за расчет
+        response.set_data(gzip.compress(body, compresslevel=1))
+        response.headers['Content-Encoding'] = 'gzip'
+    response.headers['Vary'] = 'Accept-Encoding'
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Density-Version'] = str(version)
+    response.headers['X-Density-Base'] = str(base)
+    response.headers['X-Density-Dtype'] = dtype
+    response.headers['X-Density-Size'] = str(grid.size)
+    return response
+
+
+@app.route('/api/metrics')
+def get_metrics():
+    """Метрики сервера в текстовом формате Prometheus"""
+    return Response(render_metrics(), content_type=PROMETHEUS_CONTENT_TYPE)
+
+
+@app.route('/api/history')
+def get_history():
+    """Получить историю расчетов (от новых к старым)
+
+    Параметры: limit - размер страницы, before - seq последней записи
+    предыдущей страницы.
+    """
+    limit = min(request.args.get('limit', DEFAULT_PAGE_SIZE, type=int),
+                app.config['HISTORY_MAX_PAGE_SIZE'])
+    before = request.args.get('before', type=int)
+    return jsonify(history.page(max(limit, 1), before))
+
+
+def rejected(calc_id, error):
+    """Ответ на расчет, не принятый планировщиком (429 или 503 с заголовком Retry-After)"""
+    with calculation_lock:
+        calculations.discard(calc_id)
+
+    return admission_error(error)
+
+
+def registry_full():
+    """Ответ на расчет, для которого нет места в реестре (503 с Retry-After, как при заполненной очереди)"""
+    return admission_error(QueueFullError('Слишком много выполняющихся расчетов', scheduler.stats()['retry_after']))
+
+
+def admission_error(error):
+    """Ответ на отказ AdmissionError: его HTTP-статус и заголовок Retry-After"""
+    response = jsonify({'success': False, 'message': str(error), 'retry_after': error.retry_after})
+    response.status_code = error.status_code
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response
+
+
+def new_calc_id():
+    """Уникальный ID расчета (вызывается под calculation_lock)
+
+    ID - время в миллисекундах; расчетам, запущенным в одну миллисекунду,
+    достаются следующие числа, чтобы второй не заменил первый в реестре.
+    """
+    global last_calc_id
+    last_calc_id = max(int(time.time() * 1000), last_calc_id + 1)
+    return str(last_calc_id)
+
+
+def find_calculation(calc_id):
+    """Данные расчета или None (под calculation_lock только поиск в реестре)"""
+    with calculation_lock:
+        return calculations.get(calc_id)
+
+
+def stream_interval(rate=None):
+    """Интервал между событиями потока статуса для запрошенной частоты (не чаще STREAM_MAX_RATE)"""
+    max_rate = app.config['STREAM_MAX_RATE']
+    rate = min(rate if rate is not None else max_rate, max_rate)
+    return 1.0 / rate if rate > 0 else 1.0 / max_rate
+
+
+def client_id():
+    """Идентификатор клиента для лимита одновременных расчетов"""
+    return request.remote_addr
+
+
+def result_key(calculator):
+    """Ключ кэша результатов для потока точек расчета"""
+    return cache_key(calculator.seed, calculator.sampler, calculator.estimator_kind, calculator.estimator.strata)
+
+
+def packed_points_requested():
+    """Запросил ли клиент точки в двоичном формате (?points=packed)"""
+    return request.args.get('points') == 'packed'
+
+
+def points_cursor():
+    """Курсор выборки точек клиента: ?cursor= или заголовок Last-Event-ID (по умолчанию 0)"""
+    cursor = request.args.get('cursor', type=int)
+    if cursor is None:
+        cursor = request.headers.get('Last-Event-ID', type=int)
+    return max(cursor or 0, 0)
+
+
+def collect_status(calc_data, packed=False, cursor=0):
+    """Собрать статус вычисления и сохранить результаты
+
+    Вызывается без calculation_lock: результаты берутся из неизменяемого
+    снимка калькулятора, точки читаются из выборки с собственной
+    блокировкой, а глобальная блокировка нужна только для записи в реестр.
+    Поэтому запросы статуса разных расчетов не ждут друг друга.
+
+    Точки - записанные в выборку после курсора cursor, новый курсор - в поле
+    points_cursor. При packed=True точки передаются полями points_count и
+    points_packed (base64 от pack_points) вместо списка словарей points.
+    """
+    calculator = calc_data['calculator']
+    job_status = calc_data['status']
+
+    # Получаем последний снимок результатов и новые для клиента точки выборки
+    results = calculator.snapshot()
+    x, y, in_circle, cursor = calculator.points_sample.since(cursor)
+
+    status = {
+        'status': job_status,
+        'queue_position': scheduler.position(calc_data['id']) if job_status == 'queued' else None,
+        'seed': calculator.seed,
+        'sampler': calculator.sampler,
+        'estimator': calculator.estimator_kind,
+        'pacing': calculator.pacer.describe(),
+        'progress': results.get('progress', 0),
+        'current_pi': results.get('pi_estimate', 0),
+        'points_processed': results.get('points_processed', 0),
+        'points_in_circle': results.get('points_in_circle', 0),
+        'elapsed_time': time.time() - calc_data['start_time'],
+        'error': abs(results.get('pi_estimate', 0) - 3.141592653589793),
+        'variance': results.get('variance'),
+        'std_error': results.get('std_error'),
+        'mc_error': results.get('mc_error'),
+        'target_error': calculator.target_error,
+        'confidence': calculator.confidence,
+        'ci_half_width': results.get('ci_half_width'),
+        'ci_low': results.get('ci_low'),
+        'ci_high': results.get('ci_high'),
+        'converged': results.get('converged', False),
+        'profile': calc_data.get('profile', False),
+        'density': calculator.density is not None,
+        'density_version': calculator.density.version if calculator.density is not None else None,
+        'throughput': results.get('throughput'),
+        'average_throughput': results.get('average_throughput'),
+        'chunk_time': results.get('chunk_time'),
+        'lock_wait': results.get('lock_wait'),
+        'points_cursor': cursor
+    }
+
+    if packed:
+        status['points_count'] = len(x)
+        status['points_packed'] = base64.b64encode(pack_points(x, y, in_circle)).decode('ascii')
+    else:
+        status['points'] = points_as_dicts(x, y, in_circle)
+
+    # Сохраняем результаты (точки - массивами, по пачке на запрос)
+    if results:
+        with calculation_lock:
+            calculations.record(calc_data, dict(results), (x, y, in_circle))
+
+    return status
+
+
+def render_metrics():
+    """Собрать метрики расчетов, реестра, планировщика, кэша и запросов"""
+    with calculation_lock:
+        jobs = [(calc_data['status'], calc_data['calculator']) for calc_data in calculations.values()]
+        registry_stats = calculations.stats()
+    scheduler_stats = scheduler.stats()
+    cache_stats = result_cache.stats()
+    durations, requests, sent = request_metrics.snapshot()
+
+    statuses = {}
+    for status, _ in jobs:
+        statuses[status] = statuses.get(status, 0) + 1
+    running = [calculator for status, calculator in jobs if status == 'running']
+
+    writer = MetricsWriter()
+    writer.gauge('montecarlo_jobs', 'Расчеты в реестре по статусу',
+                 [({'status': status}, count) for status, count in sorted(statuses.items())])
+    writer.gauge('montecarlo_registry_bytes', 'Примерный объем истории результатов, точек и растров плотности в реестре',
+                 registry_stats['bytes'])
+    writer.counter('montecarlo_registry_evicted_total', 'Расчеты, удаленные из реестра', registry_stats['evicted'])
+    writer.gauge('montecarlo_scheduler_workers', 'Потоки пула расчетов', scheduler_stats['workers'])
+    writer.gauge('montecarlo_scheduler_running', 'Выполняющиеся расчеты', scheduler_stats['running'])
+    writer.gauge('montecarlo_scheduler_queue_depth', 'Расчеты, ожидающие в очереди', scheduler_stats['queued'])
+    writer.counter('montecarlo_scheduler_completed_total', 'Выполненные расчеты', scheduler_stats['completed'])
+    writer.counter('montecarlo_scheduler_rejected_total', 'Расчеты, не принятые в очередь',
+                   scheduler_stats['rejected'])
+    writer.gauge('montecarlo_throughput_points_per_second', 'Суммарная мгновенная скорость выполняющихся расчетов',
+                 sum(calculator.throughput or 0 for calculator in running))
+    writer.gauge('montecarlo_points_processed', 'Обработанные точки расчетов в реестре',
+                 sum(calculator.points_processed for _, calculator in jobs))
+
+    chunk_times = merge_histograms(calculator.chunk_times.snapshot() for _, calculator in jobs)
+    if chunk_times is not None:
+        writer.histogram('montecarlo_chunk_seconds', 'Время обработки блока точек', [({}, chunk_times)])
+    lock_waits = [({'lock': 'calculation'}, calculation_lock.waits.snapshot())]
+    point_waits = merge_histograms(calculator.points_sample.lock_waits.snapshot() for _, calculator in jobs)
+    if point_waits is not None:
+        lock_waits.append(({'lock': 'points'}, point_waits))
+    writer.histogram('montecarlo_lock_wait_seconds', 'Ожидание захвата блокировки', lock_waits)
+
+    writer.counter('montecarlo_result_cache_hits_total', 'Обращения к кэшу результатов',
+                   [({'result': result}, cache_stats[key])
+                    for result, key in (('hit', 'hits'), ('prefix', 'prefix_hits'), ('miss', 'misses'))])
+
+    writer.histogram('montecarlo_http_request_duration_seconds', 'Длительность обработки запроса',
+                     [({'endpoint': endpoint}, snapshot) for endpoint, snapshot in sorted(durations.items())])
+    writer.counter('montecarlo_http_requests_total', 'Обработанные запросы',
+                   [({'endpoint': endpoint, 'code': code}, count)
+                    for (endpoint, code), count in sorted(requests.items())])
+    writer.counter('montecarlo_http_response_bytes_total', 'Отправленные байты ответов',
+                   [({'endpoint': endpoint}, size) for endpoint, size in sorted(sent.items())])
+    return writer.text()
+
+
+def format_event(data, event_id=None):
+    """Сформировать событие Server-Sent Events (с полем id, если event_id задан)"""
+    if event_id is not None:
+        return f"id: {event_id}\ndata: {json.dumps(data)}\n\n"
+    return f"data: {json.dumps(data)}\n\n"
+
+
+def launch_calculation(calc_id, calculator, priority=0, profile=False):
+    """Поставить зарегистрированный расчет в очередь планировщика
+
+    Возвращает позицию в очереди; при отказе бросает AdmissionError.
+    """
+    calculator.on_checkpoint = lambda state: checkpoints.save(calc_id, state)
+    return scheduler.submit(calc_id, lambda: run_calculation(calc_id, calculator, profile),
+                            client=client_id(), priority=priority)
+
+
+def run_calculation(calc_id, calculator, profile=False):
+    """Выполнение расчета в потоке планировщика
+
+    Пока расчет идет, его контрольная точка периодически сохраняется; после
+    завершения она удаляется, так что на диске остаются только расчеты,
+    прерванные падением или перезапуском сервера. При profile=True расчет
+    выполняется под cProfile, профиль сохраняется в profiles.
+    """
+    with calculation_lock:
+        calc_data = calculations.get(calc_id)
+        if calc_data is not None and calc_data['status'] == 'stopped':
+            # Остановлен, пока ждал в очереди
+            return
+        if calc_data is not None and calc_data['status'] == 'queued':
+            calc_data['status'] = 'running'
+            # Время в статусе отсчитывается с начала расчета (включая сеансы до
+            # продолжения с контрольной точки), а не с постановки в очередь
+            calc_data['start_time'] = time.time() - calculator.elapsed_time
+
+    try:
+        if profile:
+            profiles.run(calc_id, calculator.calculate)
+        else:
+            calculator.calculate()
+    except Exception:
+        # Контрольная точка остается: упавший расчет можно продолжить через /api/resume
+        save_failed_checkpoint(calc_id, calculator)
+        finish_calculation(calc_id, calculator, 'failed')
+        raise
+
+    checkpoints.delete(calc_id)
+    finish_calculation(calc_id, calculator, 'completed')
+
+    # Результат с seed, покрывающий начало потока без пропусков, пригоден для повтора и продолжения
+    if calculator.seeded and calculator.completed_ranges() == [[0, calculator.points_processed]]:
+        result_cache.put(result_key(calculator), calculator.checkpoint())
+
+
+def finish_calculation(calc_id, calculator, final_status):
+    """Перевести выполнявшийся расчет в final_status (completed или failed) и записать его в историю
+
+    Остановленный расчет сохраняет статус stopped.
+    """
+    # Время с учетом сеансов до продолжения с контрольной точки
+    time_spent = calculator.elapsed_time
+
+    with calculation_lock:
+        calc_data = calculations.get(calc_id)
+        if calc_data is not None and calc_data['status'] in ACTIVE_STATUSES:
+            calc_data['status'] = final_status
+        status = calc_data['status'] if calc_data is not None else final_status
+
+    history.record({
+        'id': calc_id,
+        'status': status,
+        'total_points': calculator.total_points,
+        'points_processed': calculator.points_processed,
+        'final_pi': calculator.pi_estimate,
+        'error': abs(calculator.pi_estimate - 3.141592653589793),
+        'time_spent': time_spent,
+        'seed': calculator.seed,
+        'mode': calculator.mode,
+        'sampler': calculator.sampler,
+        'estimator': calculator.estimator_kind,
+        'throughput': calculator.average_throughput() or 0.0
+    })
+
+
+def save_failed_checkpoint(calc_id, calculator):
+    """Сохранить состояние упавшего расчета; при ошибке записи остается прежняя контрольная точка"""
+    try:
+        checkpoints.save(calc_id, calculator.checkpoint())
+    except Exception:
+        logger.exception("Не удалось сохранить контрольную точку расчета %s", calc_id)
 
 
 if __name__ == '__main__':
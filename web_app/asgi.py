@@ -0,0 +1,299 @@
+import asyncio
+import io
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs
+
+import app as web
+from registry import ACTIVE_STATUSES
+
+# Сколько потоков выполняют запросы, переданные приложению Flask
+DEFAULT_BRIDGE_THREADS = 32
+# Сколько потоков собирают статус для маршрутов цикла событий
+DEFAULT_STATUS_THREADS = 4
+# Маршруты, которые обслуживаются прямо в цикле событий
+STATUS_PREFIX = '/api/status/'
+STREAM_PREFIX = '/api/stream/'
+
+NOT_FOUND = {'status': 'not_found', 'message': 'Расчет не найден'}
+
+
+async def wait_for_update(calculator, version, timeout):
+    """Асинхронный аналог MonteCarloCalculator.wait_for_update
+
+    Не занимает поток на время ожидания: поток расчета будит читателя через
+    call_soon_threadsafe. Возвращает текущую версию результатов.
+    """
+    loop = asyncio.get_running_loop()
+    updated = asyncio.Event()
+
+    def listener():
+        try:
+            loop.call_soon_threadsafe(updated.set)
+        except RuntimeError:
+            # Цикл событий уже закрыт
+            pass
+
+    calculator.add_listener(listener)
+    try:
+        if calculator.results_version == version:
+            try:
+                await asyncio.wait_for(updated.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+    finally:
+        calculator.remove_listener(listener)
+    return calculator.results_version
+
+
+class AsgiApp:
+    """ASGI-приложение поверх веб-приложения Flask
+
+    Статус и поток статуса обслуживаются в цикле событий: статус собирается
+    из неизменяемого снимка калькулятора в небольшом пуле из status_threads
+    потоков, а поток ждет обновлений без отдельного потока на зрителя,
+    поэтому один процесс держит тысячи подключений. Остальные маршруты выполняет приложение Flask в пуле из
+    threads потоков, так что API (/api/start, /api/stop, /api/status и
+    остальные) не меняется. Сами расчеты, как и раньше, выполняет пул
+    планировщика.
+    """
+
+    def __init__(self, wsgi_app, threads=DEFAULT_BRIDGE_THREADS, status_threads=DEFAULT_STATUS_THREADS):
+        self.wsgi_app = wsgi_app
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='asgi-wsgi')
+        # Отдельный небольшой пул: статус не ждет медленных запросов Flask, а зрители не множат потоки
+        self.status_executor = ThreadPoolExecutor(max_workers=status_threads, thread_name_prefix='asgi-status')
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            raise ValueError(f"Неподдерживаемый тип подключения: {scope['type']}")
+
+        path = scope['path']
+        if scope['method'] == 'GET':
+            for prefix, handler in ((STATUS_PREFIX, self.status), (STREAM_PREFIX, self.stream)):
+                calc_id = path[len(prefix):]
+                if path.startswith(prefix) and calc_id and '/' not in calc_id:
+                    await handler(scope, receive, send, calc_id)
+                    return
+
+        await self.forward(scope, receive, send)
+
+    async def lifespan(self, receive, send):
+        """Запуск и остановка сервера"""
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=False)
+                self.status_executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def status(self, scope, receive, send, calc_id):
+        """GET /api/status/<calc_id>"""
+        started = time.perf_counter()
+        query = parse_query(scope)
+        calc_data, data = await self.load_status(calc_id, query.get('points') == 'packed', points_cursor(scope, query))
+        if calc_data is None:
+            data = NOT_FOUND
+        body = json.dumps(data).encode('utf-8')
+
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [(b'content-type', b'application/json')]
+        })
+        await send({'type': 'http.response.body', 'body': body})
+        web.request_metrics.observe('get_status', 200, time.perf_counter() - started, len(body))
+
+    async def stream(self, scope, receive, send, calc_id):
+        """GET /api/stream/<calc_id> - поток статуса (Server-Sent Events), как у приложения Flask"""
+        query = parse_query(scope)
+        try:
+            rate = float(query['rate']) if 'rate' in query else None
+        except ValueError:
+            rate = None
+        interval = web.stream_interval(rate)
+        idle_timeout = web.app.config['STREAM_IDLE_TIMEOUT']
+        packed = query.get('points') == 'packed'
+        cursor = points_cursor(scope, query)
+
+        started = time.perf_counter()
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [
+                (b'content-type', b'text/event-stream; charset=utf-8'),
+                (b'cache-control', b'no-cache'),
+                (b'x-accel-buffering', b'no')
+            ]
+        })
+        # Как и в приложении Flask, длительность - до начала ответа, байты событий считаются по мере отправки
+        web.request_metrics.observe('stream_status', 200, time.perf_counter() - started)
+
+        # Зритель может закрыть подключение в любой момент
+        disconnected = asyncio.ensure_future(wait_disconnect(receive))
+        try:
+            version = None
+            while not disconnected.done():
+                calc_data, status = await self.load_status(calc_id, packed, cursor)
+                if calc_data is None:
+                    await send_event(send, NOT_FOUND)
+                    break
+
+                cursor = status['points_cursor']
+                await send_event(send, status, cursor)
+                if status['status'] not in ACTIVE_STATUSES:
+                    break
+
+                # Объединяем обновления, пришедшие за интервал, в одно событие
+                await asyncio.sleep(interval)
+                version = await wait_for_update(calc_data['calculator'], version, idle_timeout)
+
+            if not disconnected.done():
+                await send({'type': 'http.response.body', 'body': b''})
+        finally:
+            disconnected.cancel()
+
+    async def load_status(self, calc_id, packed, cursor):
+        """Данные расчета и его статус или (None, None)
+
+        Поиск ждет calculation_lock, а сборка статуса копирует точки, поэтому
+        оба выполняются в пуле потоков, не останавливая цикл событий.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.status_executor, find_status, calc_id, packed, cursor)
+
+    async def forward(self, scope, receive, send):
+        """Выполнить запрос приложением Flask в пуле потоков"""
+        body = await read_body(receive)
+        loop = asyncio.get_running_loop()
+        status, headers, content = await loop.run_in_executor(
+            self.executor, self.call_wsgi, make_environ(scope, body)
+        )
+
+        await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+        await send({'type': 'http.response.body', 'body': content})
+
+    def call_wsgi(self, environ):
+        """Вызвать WSGI-приложение и собрать ответ: статус, заголовки и тело"""
+        response = {}
+        chunks = []
+
+        def start_response(status, headers, exc_info=None):
+            response['status'] = int(status.split(' ', 1)[0])
+            response['headers'] = [(name.lower().encode('latin-1'), value.encode('latin-1'))
+                                   for name, value in headers]
+            return chunks.append
+
+        result = self.wsgi_app(environ, start_response)
+        try:
+            for chunk in result:
+                chunks.append(chunk)
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
+
+        return response['status'], response['headers'], b''.join(chunks)
+
+
+def find_status(calc_id, packed, cursor):
+    """Найти расчет и собрать его статус (выполняется в пуле потоков)"""
+    calc_data = web.find_calculation(calc_id)
+    if calc_data is None:
+        return None, None
+    return calc_data, web.collect_status(calc_data, packed, cursor)
+
+
+def parse_query(scope):
+    """Параметры строки запроса (первое значение каждого)"""
+    query = parse_qs(scope.get('query_string', b'').decode('latin-1'))
+    return {name: values[0] for name, values in query.items()}
+
+
+def points_cursor(scope, query):
+    """Курсор выборки точек клиента, как у приложения Flask: ?cursor= или Last-Event-ID"""
+    headers = dict(scope.get('headers', []))
+    for value in (query.get('cursor'), headers.get(b'last-event-id', b'').decode('latin-1')):
+        try:
+            return max(int(value), 0)
+        except (TypeError, ValueError):
+            continue
+    return 0
+
+
+async def read_body(receive):
+    """Прочитать тело запроса целиком"""
+    body = b''
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            return body
+        body += message.get('body', b'')
+        if not message.get('more_body', False):
+            return body
+
+
+async def wait_disconnect(receive):
+    """Дождаться закрытия подключения клиентом"""
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+async def send_event(send, data, event_id=None):
+    """Отправить событие Server-Sent Events"""
+    event = web.format_event(data, event_id).encode('utf-8')
+    await send({'type': 'http.response.body', 'body': event, 'more_body': True})
+    web.request_metrics.add_bytes('stream_status', len(event))
+
+
+def make_environ(scope, body):
+    """Окружение WSGI для запроса ASGI"""
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': client[0],
+        'REMOTE_PORT': str(client[1]),
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False
+    }
+
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin-1')
+        value = value.decode('latin-1')
+        if name == 'content-type':
+            environ['CONTENT_TYPE'] = value
+        elif name != 'content-length':
+            key = 'HTTP_' + name.upper().replace('-', '_')
+            environ[key] = f'{environ[key]},{value}' if key in environ else value
+    return environ
+
+
+app = AsgiApp(web.app)
+
+
+if __name__ == '__main__':
+    try:
+        import uvicorn
+    except ImportError:
+        sys.exit("Для асинхронного режима установите uvicorn: pip install uvicorn")
+    uvicorn.run(app, port=5000)
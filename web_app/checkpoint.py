@@ -0,0 +1,60 @@
+import json
+import os
+import threading
+
+# Расширение файлов контрольных точек
+CHECKPOINT_SUFFIX = '.json'
+
+
+class CheckpointStore:
+    """Контрольные точки выполняющихся расчетов в каталоге, по файлу на расчет
+
+    Файл записывается во временный и атомарно заменяет прежний, поэтому
+    при падении процесса на диске остается последняя целая контрольная точка.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, calc_id):
+        """Путь к файлу контрольной точки расчета"""
+        if not calc_id or os.path.basename(calc_id) != calc_id or calc_id.startswith('.'):
+            raise ValueError(f"Некорректный идентификатор расчета: {calc_id}")
+        return os.path.join(self.directory, calc_id + CHECKPOINT_SUFFIX)
+
+    def save(self, calc_id, state):
+        """Сохранить состояние расчета"""
+        path = self.path(calc_id)
+        temporary = f'{path}.{threading.get_ident()}.tmp'
+        with open(temporary, 'w', encoding='utf-8') as file:
+            json.dump(dict(state, id=calc_id), file)
+        with self._lock:
+            os.replace(temporary, path)
+
+    def load(self, calc_id):
+        """Состояние расчета или None, если контрольной точки нет"""
+        try:
+            with open(self.path(calc_id), encoding='utf-8') as file:
+                return json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def delete(self, calc_id):
+        """Удалить контрольную точку (после завершения расчета)"""
+        with self._lock:
+            try:
+                os.remove(self.path(calc_id))
+            except FileNotFoundError:
+                pass
+
+    def list(self):
+        """Состояния всех сохраненных расчетов, от давних к недавним"""
+        states = []
+        for name in os.listdir(self.directory):
+            if name.endswith(CHECKPOINT_SUFFIX):
+                state = self.load(name[:-len(CHECKPOINT_SUFFIX)])
+                if state is not None:
+                    states.append(state)
+        return sorted(states, key=lambda state: state.get('saved_at', 0))
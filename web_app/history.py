@@ -0,0 +1,117 @@
+import sqlite3
+import threading
+import time
+from collections import deque
+
+# Сколько последних записей держится в памяти
+DEFAULT_CACHE_SIZE = 100
+# Размер страницы истории по умолчанию
+DEFAULT_PAGE_SIZE = 20
+
+# Поля записи в порядке столбцов таблицы
+FIELDS = (
+    'seq', 'id', 'status', 'total_points', 'points_processed', 'final_pi', 'error',
+    'time_spent', 'seed', 'mode', 'throughput', 'finished_at', 'sampler', 'estimator'
+)
+# Столбцы, добавленные после первой версии таблицы
+ADDED_COLUMNS = (('sampler', 'TEXT'), ('estimator', 'TEXT'))
+
+
+class RunHistory:
+    """История завершенных расчетов в SQLite
+
+    Записи только добавляются. Страницы выбираются по курсору seq (номер
+    записи), поэтому время запроса не зависит от размера истории, а первые
+    страницы отдаются из кэша последних записей без обращения к базе.
+    """
+
+    def __init__(self, path, cache_size=DEFAULT_CACHE_SIZE):
+        self.path = path
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+
+        with self._lock, self._connection:
+            self._connection.execute('''
+                CREATE TABLE IF NOT EXISTS runs (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    id TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    total_points INTEGER NOT NULL,
+                    points_processed INTEGER NOT NULL,
+                    final_pi REAL NOT NULL,
+                    error REAL NOT NULL,
+                    time_spent REAL NOT NULL,
+                    seed INTEGER,
+                    mode TEXT,
+                    throughput REAL NOT NULL,
+                    finished_at REAL NOT NULL,
+                    sampler TEXT,
+                    estimator TEXT
+                )
+            ''')
+            # Базы, созданные предыдущими версиями, дополняются новыми столбцами
+            columns = {row[1] for row in self._connection.execute('PRAGMA table_info(runs)')}
+            for column, column_type in ADDED_COLUMNS:
+                if column not in columns:
+                    self._connection.execute(f'ALTER TABLE runs ADD COLUMN {column} {column_type}')
+            self._connection.execute('CREATE INDEX IF NOT EXISTS runs_id ON runs (id)')
+
+        # Последние записи, от новых к старым
+        self._cache = deque(maxlen=cache_size)
+        self._cache.extend(self._select('ORDER BY seq DESC LIMIT ?', (cache_size,)))
+
+    def record(self, entry):
+        """Добавить запись о расчете и вернуть ее с присвоенным seq"""
+        entry = dict(entry)
+        entry.setdefault('finished_at', time.time())
+        columns = FIELDS[1:]
+
+        with self._lock:
+            with self._connection:
+                cursor = self._connection.execute(
+                    f"INSERT INTO runs ({', '.join(columns)}) "
+                    f"VALUES ({', '.join('?' for _ in columns)})",
+                    tuple(entry.get(column) for column in columns)
+                )
+            entry['seq'] = cursor.lastrowid
+            self._cache.appendleft({field: entry.get(field) for field in FIELDS})
+
+        return entry
+
+    def page(self, limit=DEFAULT_PAGE_SIZE, before=None):
+        """Получить до limit записей от новых к старым
+
+        before - seq, начиная с которого (не включительно) продолжить выдачу.
+        """
+        with self._lock:
+            cached = [entry for entry in self._cache if before is None or entry['seq'] < before]
+            # Кэш покрывает запрос, если в нем хватает записей или в базе их больше нет
+            if len(cached) >= limit or len(self._cache) < self._cache.maxlen:
+                return [dict(entry) for entry in cached[:limit]]
+
+        if before is None:
+            return self._select('ORDER BY seq DESC LIMIT ?', (limit,))
+        return self._select('WHERE seq < ? ORDER BY seq DESC LIMIT ?', (before, limit))
+
+    def get(self, calc_id):
+        """Получить запись по идентификатору расчета"""
+        rows = self._select('WHERE id = ? ORDER BY seq DESC LIMIT 1', (calc_id,))
+        return rows[0] if rows else None
+
+    def count(self):
+        """Количество записей"""
+        with self._lock:
+            return self._connection.execute('SELECT COUNT(*) FROM runs').fetchone()[0]
+
+    def close(self):
+        """Закрыть соединение с базой"""
+        with self._lock:
+            self._connection.close()
+
+    def _select(self, clause, params):
+        """Выбрать записи с условием clause"""
+        with self._lock:
+            rows = self._connection.execute(
+                f"SELECT {', '.join(FIELDS)} FROM runs {clause}", params
+            ).fetchall()
+        return [dict(zip(FIELDS, row)) for row in rows]
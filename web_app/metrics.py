@@ -0,0 +1,151 @@
+import threading
+import time
+from collections import Counter
+
+from monte_carlo import Histogram, LOCK_WAIT_BUCKETS
+
+# Границы гистограммы длительности обработки запросов (с)
+REQUEST_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+# Тип содержимого текстового формата Prometheus
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class TimedLock:
+    """Блокировка, которая учитывает время ожидания захвата
+
+    Заменяет threading.Lock (with, acquire, release, locked); время
+    ожидания попадает в гистограмму waits.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.waits = Histogram(LOCK_WAIT_BUCKETS)
+
+    def acquire(self, blocking=True, timeout=-1):
+        started = time.perf_counter()
+        acquired = self._lock.acquire(blocking, timeout)
+        if acquired:
+            self.waits.observe(time.perf_counter() - started)
+        return acquired
+
+    def release(self):
+        self._lock.release()
+
+    def locked(self):
+        return self._lock.locked()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+
+class RequestMetrics:
+    """Длительность обработки, количество запросов и отправленные байты по маршрутам"""
+
+    def __init__(self, buckets=REQUEST_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._durations = {}
+        self._requests = Counter()
+        self._bytes = Counter()
+
+    def observe(self, endpoint, status, duration, size=0):
+        """Учесть обработанный запрос"""
+        with self._lock:
+            histogram = self._durations.get(endpoint)
+            if histogram is None:
+                histogram = self._durations[endpoint] = Histogram(self.buckets)
+            self._requests[(endpoint, status)] += 1
+            self._bytes[endpoint] += size
+        histogram.observe(duration)
+
+    def add_bytes(self, endpoint, size):
+        """Учесть байты, отправленные после ответа (поток событий)"""
+        with self._lock:
+            self._bytes[endpoint] += size
+
+    def snapshot(self):
+        """Гистограммы длительности, счетчики запросов и байтов"""
+        with self._lock:
+            durations = dict(self._durations)
+            requests = dict(self._requests)
+            sent = dict(self._bytes)
+        return {endpoint: histogram.snapshot() for endpoint, histogram in durations.items()}, requests, sent
+
+
+def merge_histograms(snapshots):
+    """Сложить снимки гистограмм с одинаковыми границами; None, если снимков нет"""
+    merged = None
+    for snapshot in snapshots:
+        if merged is None:
+            merged = {'buckets': [list(bucket) for bucket in snapshot['buckets']],
+                      'sum': snapshot['sum'], 'count': snapshot['count']}
+            continue
+        for bucket, (_, count) in zip(merged['buckets'], snapshot['buckets']):
+            bucket[1] += count
+        merged['sum'] += snapshot['sum']
+        merged['count'] += snapshot['count']
+    return merged
+
+
+class MetricsWriter:
+    """Метрики в текстовом формате Prometheus"""
+
+    def __init__(self):
+        self._lines = []
+
+    def gauge(self, name, help_text, samples):
+        """Текущее значение; samples - число или список (метки, значение)"""
+        self._family(name, 'gauge', help_text, samples)
+
+    def counter(self, name, help_text, samples):
+        """Монотонно растущий счетчик"""
+        self._family(name, 'counter', help_text, samples)
+
+    def histogram(self, name, help_text, samples):
+        """Гистограмма; samples - список (метки, снимок Histogram.snapshot)"""
+        self._header(name, 'histogram', help_text)
+        for labels, snapshot in samples:
+            for bound, count in snapshot['buckets']:
+                self._sample(f'{name}_bucket', {**labels, 'le': format_value(bound)}, count)
+            self._sample(f'{name}_bucket', {**labels, 'le': '+Inf'}, snapshot['count'])
+            self._sample(f'{name}_sum', labels, snapshot['sum'])
+            self._sample(f'{name}_count', labels, snapshot['count'])
+
+    def text(self):
+        """Готовый текст ответа"""
+        return '\n'.join(self._lines) + '\n'
+
+    def _family(self, name, kind, help_text, samples):
+        self._header(name, kind, help_text)
+        if not isinstance(samples, list):
+            samples = [({}, samples)]
+        for labels, value in samples:
+            self._sample(name, labels, value)
+
+    def _header(self, name, kind, help_text):
+        self._lines.append(f'# HELP {name} {help_text}')
+        self._lines.append(f'# TYPE {name} {kind}')
+
+    def _sample(self, name, labels, value):
+        if labels:
+            label_text = ','.join(f'{key}="{escape_label(str(label))}"' for key, label in labels.items())
+            name = f'{name}{{{label_text}}}'
+        self._lines.append(f'{name} {format_value(value)}')
+
+
+def escape_label(value):
+    """Экранировать значение метки"""
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_value(value):
+    """Число в формате Prometheus"""
+    if value is None:
+        return 'NaN'
+    if isinstance(value, bool):
+        return '1' if value else '0'
+    return repr(float(value)) if isinstance(value, float) else str(value)
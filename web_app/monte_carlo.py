@@ -1,84 +1,1389 @@
+import bisect
 import random
 import math
+import multiprocessing
+import os
+import secrets
+import threading
 import time
-from collections import deque
+from collections import OrderedDict
+from contextlib import contextmanager
+from types import MappingProxyType
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from statistics import NormalDist
+
+import numpy as np
+
+# Режимы расчета
+MODE_SCALAR = 'scalar'  # по одной точке через модуль random
+MODE_VECTORIZED = 'vectorized'  # блоками точек через NumPy
+MODE_PARALLEL = 'parallel'  # блоками точек в нескольких процессах
+MODES = (MODE_SCALAR, MODE_VECTORIZED, MODE_PARALLEL)
+
+# Размер блока точек в векторизованном режиме
+DEFAULT_CHUNK_SIZE = 65536
+# Последовательности точек
+SAMPLER_RANDOM = 'random'  # псевдослучайные точки, ошибка убывает как O(1/sqrt(N))
+SAMPLER_SOBOL = 'sobol'  # последовательность Соболя со случайным цифровым сдвигом
+SAMPLER_HALTON = 'halton'  # последовательность Холтона со случайным сдвигом
+SAMPLERS = (SAMPLER_RANDOM, SAMPLER_SOBOL, SAMPLER_HALTON)
+# Разрядность точек последовательности Соболя
+SOBOL_BITS = 32
+# Сколько разных точек дает последовательность Соболя (номера старше повторяют первые)
+SOBOL_MAX_POINTS = 1 << SOBOL_BITS
+
+# Оценки π
+ESTIMATOR_PLAIN = 'plain'  # доля точек в круге
+ESTIMATOR_ANTITHETIC = 'antithetic'  # пары симметричных точек четверти квадрата
+ESTIMATOR_STRATIFIED = 'stratified'  # равное число точек в каждой клетке сетки k x k
+ESTIMATOR_QUARTER = 'quarter'  # условное среднее по y: f = sqrt(1 - x^2), случайных чисел столько же
+ESTIMATORS = (ESTIMATOR_PLAIN, ESTIMATOR_ANTITHETIC, ESTIMATOR_STRATIFIED, ESTIMATOR_QUARTER)
+# Размер стороны сетки стратифицированной оценки по умолчанию
+DEFAULT_STRATA = 16
+
+# Уровень доверия по умолчанию для доверительного интервала π
+DEFAULT_CONFIDENCE = 0.95
+# Минимум точек до проверки точности (на малых выборках оценка ошибки ненадежна)
+MIN_POINTS_FOR_PRECISION = 1000
+
+# Режимы темпа расчета
+PACING_AUTO = 'auto'  # небольшие расчеты замедляются для наглядности, остальные - без ограничений
+PACING_MAX = 'max'  # максимальная скорость
+PACING_RATE = 'rate'  # заданное количество точек в секунду
+PACING_DURATION = 'duration'  # расчет растягивается на заданное время (с)
+PACING_MODES = (PACING_AUTO, PACING_MAX, PACING_RATE, PACING_DURATION)
+# До какого количества точек режим auto замедляет расчет
+VISUAL_POINTS_LIMIT = 10000
+# Скорость наглядного расчета (точек в секунду)
+VISUAL_POINTS_PER_SECOND = 1000
+# Сколько секунд расчета приходится на один блок при ограниченной скорости
+PACING_INTERVAL = 0.1
+# Размер независимого блока потока случайных чисел
+STREAM_BLOCK_SIZE = 65536
+# Количество точек в одной задаче для пула процессов
+PARALLEL_TASK_SIZE = 1 << 20
+# Сколько точек каждой задачи возвращается для визуализации
+PARALLEL_SAMPLE_SIZE = 100
+# Как часто сохраняется контрольная точка расчета (с)
+DEFAULT_CHECKPOINT_INTERVAL = 5.0
+# Версия формата контрольной точки
+CHECKPOINT_VERSION = 1
+# Сколько первых точек показывается для расчета, восстановленного без пересчета
+PREVIEW_POINTS = 1000
+# Размер равномерной выборки точек расчета для визуализации
+VISUAL_SAMPLE_SIZE = 1000
+# Сколько точек, предложенных выборке по одной, переносится в нее за раз
+RESERVOIR_BATCH = 100
+# Сторона растра плотности точек (пикселей, совпадает с областью квадрата на холсте)
+DENSITY_SIZE = 400
+# С какого количества точек растр плотности копится по умолчанию
+DENSITY_MIN_POINTS = 10000000
+# Сколько последних отданных кадров растра хранится для передачи разности с ними
+DENSITY_KEYFRAMES = 2
+# Сколько точек копится до переноса в растр (перенос стоит как проход по всем пикселям)
+DENSITY_BATCH = 1 << 19
+# Границы гистограммы времени обработки блока (с)
+CHUNK_TIME_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+# Границы гистограммы ожидания блокировки (с)
+LOCK_WAIT_BUCKETS = (0.000001, 0.00001, 0.0001, 0.001, 0.01, 0.1, 1.0)
+# Окно, за которое считается мгновенная скорость расчета (с)
+THROUGHPUT_WINDOW = 0.5
+# Как часто расчет по одной точке публикует снимок результатов (с)
+SCALAR_RESULTS_INTERVAL = 0.02
+
+
+class PointStream:
+    """Воспроизводимый поток случайных точек квадрата [-1, 1] x [-1, 1]
+
+    Поток разбит на блоки по STREAM_BLOCK_SIZE точек. Каждый блок генерируется
+    своим дочерним SeedSequence (тем же, что вернул бы SeedSequence.spawn),
+    поэтому любой диапазон точек восстанавливается независимо, а результат не
+    зависит ни от размера блоков расчета, ни от количества процессов.
+    """
+
+    def __init__(self, seed=None):
+        if seed is None:
+            # Ограничиваем 53 битами, чтобы seed без потерь проходил через JSON в браузер
+            seed = secrets.randbits(53)
+        if seed < 0:
+            raise ValueError("seed должен быть неотрицательным")
+
+        self.seed = seed
+
+        # Текущий блок для быстрого последовательного чтения
+        self._block_index = None
+        self._block_rng = None
+        self._block_position = 0
+
+    def block_seed(self, index):
+        """SeedSequence блока с заданным номером"""
+        return np.random.SeedSequence(self.seed, spawn_key=(index,))
+
+    def generate(self, start, count):
+        """Сгенерировать точки с номерами [start, start + count)
+
+        Возвращает координаты x, y и маску попадания в круг.
+        """
+        parts = []
+        while count > 0:
+            index, offset = divmod(start, STREAM_BLOCK_SIZE)
+            size = min(count, STREAM_BLOCK_SIZE - offset)
+            parts.append(self._read_block(index, offset, size))
+            start += size
+            count -= size
+
+        points = parts[0] if len(parts) == 1 else np.concatenate(parts)
+        x = points[:, 0]
+        y = points[:, 1]
+        return x, y, x * x + y * y <= 1.0
+
+    def _read_block(self, index, offset, size):
+        """Прочитать size точек блока index начиная со смещения offset"""
+        if index != self._block_index or offset < self._block_position:
+            self._block_index = index
+            self._block_rng = np.random.default_rng(self.block_seed(index))
+            self._block_position = 0
+
+        if offset > self._block_position:
+            # Пропускаем начало блока
+            self._block_rng.uniform(-1.0, 1.0, (offset - self._block_position, 2))
+
+        points = self._block_rng.uniform(-1.0, 1.0, (size, 2))
+        self._block_position = offset + size
+        return points
+
+
+def pi_half_width(points_in_circle, points_processed, z):
+    """Полуширина доверительного интервала оценки π = 4p
+
+    Доля p точек в круге распределена биномиально, ее стандартная ошибка
+    sqrt(p(1 - p) / n); z - квантиль нормального распределения.
+    """
+    if points_processed == 0:
+        return math.inf
+    p = points_in_circle / points_processed
+    return 4 * z * math.sqrt(p * (1 - p) / points_processed)
+
+
+class Pacer:
+    """Ограничение скорости расчета по алгоритму token bucket
+
+    Токены (разрешенные точки) накапливаются со скоростью rate, каждый
+    обработанный блок их расходует; при нехватке поток спит, пока долг не
+    погасится. Блоки при этом уменьшаются до PACING_INTERVAL секунд расчета,
+    чтобы прогресс и точки обновлялись плавно, а остановка была быстрой.
+    """
+
+    def __init__(self, mode=PACING_AUTO, value=None):
+        if mode not in PACING_MODES:
+            raise ValueError(f"Неизвестный режим темпа: {mode}")
+        if mode in (PACING_RATE, PACING_DURATION) and (value is None or value <= 0):
+            raise ValueError("Скорость или длительность расчета должна быть положительной")
+
+        self.mode = mode
+        self.value = value
+        self.rate = None
+        self._tokens = 0.0
+        self._last = 0.0
+
+    def start(self, total_points):
+        """Подготовить ограничение к расчету total_points точек"""
+        if self.mode == PACING_RATE:
+            self.rate = float(self.value)
+        elif self.mode == PACING_DURATION:
+            self.rate = total_points / self.value
+        elif self.mode == PACING_AUTO and total_points <= VISUAL_POINTS_LIMIT:
+            self.rate = float(VISUAL_POINTS_PER_SECOND)
+        else:
+            self.rate = None
+
+        self._tokens = 0.0
+        self._last = time.monotonic()
+
+    @property
+    def limited(self):
+        """Ограничена ли скорость"""
+        return self.rate is not None
+
+    def chunk_size(self, chunk_size):
+        """Размер блока с учетом ограничения скорости"""
+        if self.rate is None:
+            return chunk_size
+        return max(1, min(chunk_size, int(self.rate * PACING_INTERVAL)))
+
+    def acquire(self, count):
+        """Учесть обработку count точек и подождать, если расчет опережает темп"""
+        if self.rate is None:
+            return
+
+        now = time.monotonic()
+        # Запас токенов не больше одного блока, чтобы после паузы не было рывка
+        self._tokens = min(self.rate * PACING_INTERVAL, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+        self._tokens -= count
+
+        if self._tokens < 0:
+            time.sleep(-self._tokens / self.rate)
+
+    def describe(self):
+        """Параметры темпа для JSON"""
+        return {'mode': self.mode, 'value': self.value, 'rate': self.rate}
+
+
+class QuasiRandomStream(PointStream):
+    """Базовый класс квазислучайных (низкодисперсных) последовательностей
+
+    Точка с номером i вычисляется напрямую по i, поэтому, как и у PointStream,
+    любой диапазон восстанавливается независимо. seed задает случайный сдвиг
+    последовательности: разные seed дают независимые рандомизации.
+    """
+
+    def __init__(self, seed=None):
+        super().__init__(seed)
+        self._shift_rng = np.random.default_rng(np.random.SeedSequence(self.seed))
+
+    def generate(self, start, count):
+        """Сгенерировать точки с номерами [start, start + count)"""
+        indices = np.arange(start, start + count, dtype=np.uint64)
+        points = 2.0 * self.unit_points(indices) - 1.0
+        x = points[:, 0]
+        y = points[:, 1]
+        return x, y, x * x + y * y <= 1.0
+
+    def unit_points(self, indices):
+        """Точки единичного квадрата [0, 1) x [0, 1) с номерами indices"""
+        raise NotImplementedError
+
+
+class SobolStream(QuasiRandomStream):
+    """Двумерная последовательность Соболя со случайным цифровым сдвигом
+
+    Первая координата - последовательность ван дер Корпута по основанию 2,
+    вторая строится по примитивному многочлену x + 1. Цифровой сдвиг (XOR
+    со случайным числом) сохраняет равномерность каждого блока из 2^k точек.
+    Код точки - XOR направляющих чисел по битам номера; он берется из двух
+    таблиц для младших и старших 16 бит номера.
+    """
+
+    _tables = None
+
+    def __init__(self, seed=None):
+        super().__init__(seed)
+        self._digital_shift = self._shift_rng.integers(0, 1 << SOBOL_BITS, 2, dtype=np.uint64)
+
+    @classmethod
+    def tables(cls):
+        """Таблицы кодов для младших и старших 16 бит номера (общие для всех seed)"""
+        if cls._tables is None:
+            directions = np.empty((SOBOL_BITS, 2), dtype=np.uint64)
+            first = second = 1 << (SOBOL_BITS - 1)
+            for bit in range(SOBOL_BITS):
+                directions[bit] = (first >> bit, second)
+                second ^= second >> 1
+
+            half = SOBOL_BITS // 2
+            tables = []
+            for bits in (directions[:half], directions[half:]):
+                table = np.zeros((1 << half, 2), dtype=np.uint64)
+                for bit, direction in enumerate(bits):
+                    size = 1 << bit
+                    table[size:2 * size] = table[:size] ^ direction
+                tables.append(table)
+            cls._tables = tuple(tables)
+        return cls._tables
+
+    def unit_points(self, indices):
+        """Точки единичного квадрата с номерами indices"""
+        low, high = self.tables()
+        half = np.uint64(SOBOL_BITS // 2)
+        mask = np.uint64((1 << (SOBOL_BITS // 2)) - 1)
+        codes = low[indices & mask] ^ high[(indices >> half) & mask] ^ self._digital_shift
+        return codes / float(1 << SOBOL_BITS)
+
+
+class HaltonStream(QuasiRandomStream):
+    """Двумерная последовательность Холтона (основания 2 и 3) со случайным сдвигом
+
+    Сдвиг Кранли - Паттерсона: к точкам прибавляется случайный вектор по модулю 1.
+    """
+
+    BASES = (2, 3)
+
+    def __init__(self, seed=None):
+        super().__init__(seed)
+        self._shift = self._shift_rng.random(2)
+
+    def unit_points(self, indices):
+        """Точки единичного квадрата с номерами indices"""
+        points = np.empty((len(indices), 2))
+        for axis, base in enumerate(self.BASES):
+            points[:, axis] = radical_inverse(indices, base)
+        return (points + self._shift) % 1.0
+
+
+def radical_inverse(indices, base):
+    """Обратная запись номеров indices по основанию base (последовательность ван дер Корпута)"""
+    remaining = indices.astype(np.uint64)
+    result = np.zeros(len(indices))
+    scale = 1.0 / base
+    while remaining.any():
+        remaining, digits = np.divmod(remaining, np.uint64(base))
+        result += digits * scale
+        scale /= base
+    return result
+
+
+def make_stream(sampler=SAMPLER_RANDOM, seed=None):
+    """Создать поток точек выбранной последовательности"""
+    if sampler == SAMPLER_SOBOL:
+        return SobolStream(seed)
+    if sampler == SAMPLER_HALTON:
+        return HaltonStream(seed)
+    if sampler == SAMPLER_RANDOM:
+        return PointStream(seed)
+    raise ValueError(f"Неизвестная последовательность точек: {sampler}")
+
+
+class Estimator:
+    """Оценка π = 4 * E[f] по точкам потока с учетом выборочной дисперсии
+
+    Каждая точка потока дает одно значение f из [0, 1]:
+    - plain: f = 1, если точка в круге;
+    - antithetic: точка (u, v) четверти квадрата в паре с (1 - u, 1 - v),
+      f - среднее по паре (пара (x, y) / (-x, -y) дисперсию не снижает:
+      круг симметричен относительно центра и f у них одинаковое);
+    - stratified: i-я точка переносится в клетку i mod k^2 сетки k x k,
+      так что клетки заполняются поровну;
+    - quarter: оценка условным математическим ожиданием - индикатор
+      попадания заменяется его средним по y при данном x,
+      f = E[1{x^2 + y^2 <= 1} | x] = sqrt(1 - x^2), доля вертикального
+      отрезка квадрата, лежащая в круге. Дисперсия на точку ниже, чем у
+      plain, но случайных чисел не меньше: y по-прежнему генерируется, потому
+      что поток точек общий для всех оценок (при одном seed точки совпадают),
+      а y нужна для визуализации, растра плотности и счетчика точек в круге.
+
+    Суммы хранятся по клеткам (для нестратифицированных оценок клетка одна),
+    поэтому частичные оценки из разных процессов складываются через merge.
+    """
+
+    def __init__(self, kind=ESTIMATOR_PLAIN, strata=DEFAULT_STRATA):
+        if kind not in ESTIMATORS:
+            raise ValueError(f"Неизвестная оценка: {kind}")
+        if strata <= 0:
+            raise ValueError("Размер сетки должен быть положительным")
+
+        self.kind = kind
+        self.strata = strata if kind == ESTIMATOR_STRATIFIED else 1
+        cells = self.strata * self.strata
+        self.counts = np.zeros(cells, dtype=np.int64)
+        self.sums = np.zeros(cells)
+        self.squares = np.zeros(cells)
+
+    @property
+    def samples(self):
+        """Количество учтенных точек"""
+        return int(self.counts.sum())
+
+    def transform(self, start, x, y):
+        """Значения f для точек с номерами [start, start + len(x))
+
+        Возвращает точки для визуализации (x, y, in_circle), значения f и
+        номера клеток (None, если клетка одна).
+        """
+        cells = None
+
+        if self.kind == ESTIMATOR_STRATIFIED:
+            k = self.strata
+            cells = (start + np.arange(len(x))) % (k * k)
+            x = -1.0 + ((cells % k) + (x + 1.0) / 2.0) * (2.0 / k)
+            y = -1.0 + ((cells // k) + (y + 1.0) / 2.0) * (2.0 / k)
+
+        in_circle = x * x + y * y <= 1.0
+
+        if self.kind == ESTIMATOR_ANTITHETIC:
+            u = 1.0 - np.abs(x)
+            v = 1.0 - np.abs(y)
+            values = (in_circle.astype(np.float64) + (u * u + v * v <= 1.0)) / 2.0
+        elif self.kind == ESTIMATOR_QUARTER:
+            # Значение зависит только от x; y остается для in_circle и точек визуализации
+            values = np.sqrt(1.0 - x * x)
+        else:
+            values = in_circle.astype(np.float64)
+
+        return (x, y, in_circle), values, cells
+
+    def add(self, values, cells=None):
+        """Учесть значения f (cells - номера клеток для стратифицированной оценки)"""
+        if cells is None:
+            self.counts[0] += len(values)
+            self.sums[0] += values.sum()
+            self.squares[0] += np.dot(values, values)
+        else:
+            size = len(self.counts)
+            self.counts += np.bincount(cells, minlength=size)
+            self.sums += np.bincount(cells, values, minlength=size)
+            self.squares += np.bincount(cells, values * values, minlength=size)
+
+    def add_counts(self, count, inside):
+        """Учесть count точек оценки plain, из них inside в круге (f равно 0 или 1, поэтому f^2 = f)"""
+        self.counts[0] += count
+        self.sums[0] += inside
+        self.squares[0] += inside
+
+    def state(self):
+        """Накопленные суммы для передачи между процессами"""
+        return self.counts, self.sums, self.squares
+
+    def merge(self, state):
+        """Добавить суммы другой оценки того же вида"""
+        counts, sums, squares = state
+        self.counts += counts
+        self.sums += sums
+        self.squares += squares
+
+    def estimate(self):
+        """Текущая оценка π"""
+        filled = self.counts > 0
+        if not filled.any():
+            return 0
+        # Клетки одинаковой площади входят с равными весами
+        return 4 * float(np.mean(self.sums[filled] / self.counts[filled]))
+
+    def variance(self):
+        """Выборочная дисперсия оценки π в пересчете на одну точку
+
+        Равна samples * Var(оценки), то есть дисперсии одной точки для
+        обычной оценки; чем она меньше, тем меньше точек нужно для той же
+        погрешности. None, пока точек недостаточно.
+        """
+        filled = self.counts > 1
+        if not filled.any():
+            return None
+
+        counts = self.counts[filled]
+        means = self.sums[filled] / counts
+        cell_variances = np.maximum(self.squares[filled] / counts - means * means, 0.0) * counts / (counts - 1)
+        estimator_variance = 16 * np.sum(cell_variances / counts) / len(counts) ** 2
+        return float(estimator_variance * counts.sum())
+
+
+class Histogram:
+    """Гистограмма значений с фиксированными границами корзин (как у Prometheus)
+
+    Потокобезопасна: значения добавляет поток расчета, а снимок читает
+    обработчик запросов.
+    """
+
+    def __init__(self, buckets=CHUNK_TIME_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        """Добавить значение"""
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+            self._count += 1
+
+    def snapshot(self):
+        """Накопленные счетчики корзин [[граница, количество <= границы], ...], сумма и количество для JSON"""
+        with self._lock:
+            counts = list(self._counts)
+            total, count = self._sum, self._count
+
+        cumulative = 0
+        buckets = []
+        for bound, bucket_count in zip(self.buckets, counts):
+            cumulative += bucket_count
+            buckets.append([bound, cumulative])
+        return {'buckets': buckets, 'sum': total, 'count': count}
+
+
+class PointReservoir:
+    """Равномерная выборка точек всего расчета фиксированного размера
+
+    Резервуарная выборка: после capacity точек n-я точка попадает в выборку
+    с вероятностью capacity / n и заменяет случайную ячейку, поэтому в любой
+    момент выборка - равномерная выборка из всех n точек расчета, а память не
+    зависит от n. Попадания разыгрываются векторно: блок делится на отрезки
+    [a, 2a), в каждом кандидаты выбираются с наибольшей вероятностью отрезка
+    и прореживаются до точной, так что работа пропорциональна числу
+    попаданий (около capacity * ln(n / capacity) за расчет), а не числу точек.
+
+    Каждая запись в ячейку получает номер; читатель передает номер последней
+    полученной записи (курсор) и получает только более новые точки, так что
+    клиенты читают независимо и ничего не теряют, а клиент с курсором 0
+    получает всю выборку - представительную картину расчета целиком. Пишет
+    поток расчета, читают обработчики запросов, поэтому ячейки защищены
+    блокировкой.
+    """
+
+    def __init__(self, capacity, seed=None):
+        if capacity <= 0:
+            raise ValueError("Размер выборки должен быть положительным")
+        self.capacity = capacity
+        self._x = np.empty(capacity, dtype=np.float64)
+        self._y = np.empty(capacity, dtype=np.float64)
+        self._in_circle = np.empty(capacity, dtype=bool)
+        # Номер последней записи в ячейку
+        self._written = np.zeros(capacity, dtype=np.int64)
+        self._rng = np.random.default_rng(seed)
+        # Точки, предложенные по одной и еще не перенесенные в выборку
+        self._pending = []
+        self._lock = threading.Lock()
+        # Время ожидания блокировки потоком расчета и читателями
+        self.lock_waits = Histogram(LOCK_WAIT_BUCKETS)
+        self.clear()
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def seen(self):
+        """Сколько точек расчета прошло через выборку"""
+        return self._seen
+
+    @property
+    def cursor(self):
+        """Номер последней записи в выборку"""
+        return self._writes
+
+    def append(self, x, y, in_circle):
+        """Предложить одну точку (переносится в выборку пачкой по RESERVOIR_BATCH точек, см. flush)"""
+        self._pending.append((x, y, in_circle))
+        if len(self._pending) >= RESERVOIR_BATCH:
+            self.flush()
+
+    def flush(self):
+        """Перенести в выборку точки, предложенные по одной"""
+        if self._pending:
+            x, y, in_circle = zip(*self._pending)
+            self._pending = []
+            self.extend(np.array(x), np.array(y), np.array(in_circle))
+
+    def extend(self, x, y, in_circle):
+        """Предложить массивы точек"""
+        count = len(x)
+        if count == 0:
+            return
+
+        first = self._seen
+        end = first + count
+        # Пока выборка не заполнена, в нее попадает каждая точка
+        filled = min(count, self.capacity - self._size)
+        positions = [np.arange(filled, dtype=np.int64)]
+
+        # Точка с номером t (с нуля) попадает с вероятностью capacity / (t + 1)
+        start = first + filled
+        while start < end:
+            stop = min(end, 2 * start)
+            chance = self.capacity / (start + 1)
+            candidates = start + self._rng.choice(stop - start, self._rng.binomial(stop - start, chance),
+                                                  replace=False)
+            candidates.sort()
+            accepted = candidates[self._rng.random(len(candidates)) * (candidates + 1) < start + 1]
+            positions.append(accepted - first)
+            start = stop
+        self._seen = end
+
+        positions = np.concatenate(positions)
+        if len(positions) == 0:
+            return
+
+        slots = np.concatenate((
+            np.arange(self._size, self._size + filled, dtype=np.int64),
+            self._rng.integers(0, self.capacity, len(positions) - filled)
+        ))
+        # При повторной замене той же ячейки остается последняя точка
+        _, last = np.unique(slots[::-1], return_index=True)
+        keep = np.sort(len(slots) - 1 - last)
+        slots, positions = slots[keep], positions[keep]
+
+        with self._locked():
+            self._x[slots] = x[positions]
+            self._y[slots] = y[positions]
+            self._in_circle[slots] = in_circle[positions]
+            self._written[slots] = self._writes + np.arange(1, len(slots) + 1)
+            self._writes += len(slots)
+            self._size += filled
+
+    def since(self, cursor=0):
+        """Точки, записанные после курсора cursor, в порядке записи, и новый курсор
+
+        Курсор новее выборки (например, после ее очистки) считается нулевым.
+        """
+        with self._locked():
+            if cursor > self._writes:
+                cursor = 0
+            written = self._written[:self._size]
+            slots = np.flatnonzero(written > cursor)
+            slots = slots[np.argsort(written[slots], kind='stable')]
+            return self._x[slots], self._y[slots], self._in_circle[slots], self._writes
+
+    def clear(self):
+        """Очистить выборку"""
+        with self._locked():
+            self._pending = []
+            self._size = 0
+            self._seen = 0
+            self._writes = 0
+            self._written[:] = 0
+
+    @contextmanager
+    def _locked(self):
+        """Захватить блокировку, учитывая время ожидания"""
+        started = time.perf_counter()
+        with self._lock:
+            self.lock_waits.observe(time.perf_counter() - started)
+            yield
+
+
+def density_cells(x, y, in_circle, size=DENSITY_SIZE):
+    """Номера пикселей точек в плоском растре из двух плоскостей size x size
+
+    Первая плоскость - точки в круге, вторая - вне круга; строка 0 - верх
+    квадрата (y = 1), столбец 0 - его левый край (x = -1). Точки лежат в
+    квадрате [-1, 1] x [-1, 1], поэтому ограничивать номера нужно только сверху.
+    """
+    half = size / 2
+    columns = np.minimum(((x + 1) * half).astype(np.int32), size - 1)
+    rows = np.minimum(((1 - y) * half).astype(np.int32), size - 1)
+    # Операции на месте в int32: номера пикселей считаются для каждой точки расчета
+    rows *= size
+    rows += columns
+    rows += np.multiply(~in_circle, size * size, dtype=np.int32)
+    return rows
+
+
+def density_bins(cells, size=DENSITY_SIZE):
+    """Количество точек в каждом пикселе (плоский массив длины 2 * size * size)"""
+    if isinstance(cells, list):
+        cells = np.concatenate(cells) if cells else np.empty(0, dtype=np.int32)
+    return np.bincount(cells, minlength=2 * size * size)
+
+
+class DensityGrid:
+    """Растр плотности точек всего расчета
+
+    Вместо отдельных точек копится количество точек в каждом пикселе (uint32,
+    плоскости в круге и вне круга), поэтому объем данных и стоимость
+    отрисовки зависят от числа пикселей, а не от числа точек. Номера пикселей
+    копятся до DENSITY_BATCH точек и переносятся в растр одним проходом -
+    при запросе кадра или когда их набралось достаточно. Каждое добавление
+    увеличивает version. Последние DENSITY_KEYFRAMES отданных кадров
+    хранятся, чтобы клиенту, у которого уже есть один из них, передавать
+    только разность.
+    """
+
+    def __init__(self, size=DENSITY_SIZE):
+        self.size = size
+        self.counts = np.zeros((2, size, size), dtype=np.uint32)
+        self.version = 0
+        self._pending = []
+        self._pending_points = 0
+        self._frames = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def nbytes(self):
+        """Память растра, хранимых кадров и еще не перенесенных номеров пикселей"""
+        with self._lock:
+            pending = sum(cells.nbytes for cells in self._pending)
+            return self.counts.nbytes * (1 + len(self._frames)) + pending
+
+    def add(self, x, y, in_circle):
+        """Добавить точки"""
+        cells = density_cells(x, y, in_circle, self.size)
+        with self._lock:
+            self._pending.append(cells)
+            self._pending_points += len(cells)
+            if self._pending_points >= DENSITY_BATCH:
+                self._flush()
+            self.version += 1
+
+    def add_bins(self, bins):
+        """Добавить готовые количества density_bins (например, посчитанные в другом процессе)"""
+        with self._lock:
+            self._add_counts(bins)
+            self.version += 1
+
+    def frame(self, base=None):
+        """Кадр для клиента: (данные, версия, базовая версия)
+
+        Если кадр версии base еще хранится, данные - прирост с него (счетчики
+        только растут), иначе - полный растр и базовая версия 0.
+        """
+        with self._lock:
+            self._flush()
+            counts = self.counts.copy()
+            version = self.version
+            reference = self._frames.get(base) if base else None
+            if version not in self._frames:
+                self._frames[version] = counts
+                while len(self._frames) > DENSITY_KEYFRAMES:
+                    self._frames.popitem(last=False)
+
+        if reference is None or base == version:
+            return counts, version, 0
+        return counts - reference, version, base
+
+    def release_frames(self):
+        """Перенести накопленные точки и забыть хранимые кадры (после окончания расчета разности уже не нужны)"""
+        with self._lock:
+            self._flush()
+            self._frames.clear()
+
+    def _flush(self):
+        """Перенести накопленные номера пикселей в растр (вызывается под блокировкой)"""
+        if self._pending:
+            self._add_counts(density_bins(self._pending, self.size))
+            self._pending = []
+            self._pending_points = 0
+
+    def _add_counts(self, bins):
+        flat = self.counts.reshape(-1)
+        np.add(flat, bins, out=flat, casting='unsafe')
+
+
+def pack_density(counts):
+    """Упаковать растр в наименьший беззнаковый тип, вмещающий его значения
+
+    Возвращает имя типа (uint8, uint16 или uint32) и байты little-endian.
+    """
+    maximum = int(counts.max()) if counts.size else 0
+    for name in ('uint8', 'uint16'):
+        if maximum <= np.iinfo(name).max:
+            return name, counts.astype(np.dtype(name).newbyteorder('<')).tobytes()
+    return 'uint32', counts.astype('<u4').tobytes()
+
+
+def pack_points(x, y, in_circle):
+    """Упаковать точки в компактный двоичный формат
+
+    Формат: координаты x (float32, little-endian), затем координаты y
+    (float32, little-endian), затем маска in_circle по биту на точку
+    (младший бит первого байта соответствует первой точке).
+    """
+    return (np.asarray(x, dtype='<f4').tobytes()
+            + np.asarray(y, dtype='<f4').tobytes()
+            + np.packbits(in_circle, bitorder='little').tobytes())
+
+
+def points_as_dicts(x, y, in_circle):
+    """Представить точки списком словарей {'x', 'y', 'in_circle'} для JSON"""
+    return [
+        {'x': px, 'y': py, 'in_circle': flag}
+        for px, py, flag in zip(x.tolist(), y.tolist(), in_circle.tolist())
+    ]
+
+
+def merge_ranges(ranges):
+    """Объединить пересекающиеся и смежные диапазоны [start, end) в упорядоченный список"""
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def missing_ranges(completed, total, size):
+    """Диапазоны (start, count) не длиннее size, которые не покрыты completed в [0, total)"""
+    position = 0
+    for start, end in merge_ranges(completed) + [[total, total]]:
+        while position < min(start, total):
+            count = min(size, min(start, total) - position)
+            yield position, count
+            position += count
+        position = max(position, end)
+
+
+def count_points_in_circle(seed, start, count, chunk_size=DEFAULT_CHUNK_SIZE, sampler=SAMPLER_RANDOM,
+                           estimator=ESTIMATOR_PLAIN, strata=DEFAULT_STRATA, density=False):
+    """Подсчитать точки в круге на диапазоне [start, start + count) потока seed
+
+    Выполняется в процессе пула, поэтому возвращает только частичные счетчики
+    (в круге, всего), небольшую выборку каждой 10-й точки для визуализации,
+    суммы оценки (Estimator.state) для объединения в основном процессе и,
+    если density, количества точек по пикселям растра (density_bins в uint32).
+    """
+    stream = make_stream(sampler, seed)
+    partial = Estimator(estimator, strata)
+    inside = 0
+    sample = None
+    pixels = [] if density else None
+
+    processed = 0
+    while processed < count:
+        size = min(chunk_size, count - processed)
+        x, y, _ = stream.generate(start + processed, size)
+        (x, y, in_circle), values, cells = partial.transform(start + processed, x, y)
+        partial.add(values, cells)
+        inside += int(np.count_nonzero(in_circle))
+        if pixels is not None:
+            pixels.append(density_cells(x, y, in_circle))
+
+        if sample is None:
+            step = slice((-(start + processed)) % 10, 10 * PARALLEL_SAMPLE_SIZE, 10)
+            sample = (x[step].copy(), y[step].copy(), in_circle[step].copy())
+
+        processed += size
+
+    bins = density_bins(pixels).astype(np.uint32) if pixels is not None else None
+    return inside, count, sample, partial.state(), bins
 
 
 class MonteCarloCalculator:
     """Класс для вычисления π методом Монте-Карло"""
 
-    def __init__(self, total_points=10000):
+    def __init__(self, total_points=10000, mode=MODE_SCALAR, chunk_size=DEFAULT_CHUNK_SIZE,
+                 workers=None, seed=None, pacer=None, target_error=None, confidence=DEFAULT_CONFIDENCE,
+                 sampler=SAMPLER_RANDOM, estimator=ESTIMATOR_PLAIN, strata=DEFAULT_STRATA,
+                 on_checkpoint=None, checkpoint_interval=DEFAULT_CHECKPOINT_INTERVAL, density=None):
+        if mode not in MODES:
+            raise ValueError(f"Неизвестный режим расчета: {mode}")
+        if chunk_size <= 0:
+            raise ValueError("Размер блока должен быть положительным")
+        if workers is not None and workers <= 0:
+            raise ValueError("Количество процессов должно быть положительным")
+        if target_error is not None and target_error <= 0:
+            raise ValueError("Целевая погрешность должна быть положительной")
+        if not 0 < confidence < 1:
+            raise ValueError("Уровень доверия должен быть между 0 и 1")
+        if mode == MODE_SCALAR and estimator != ESTIMATOR_PLAIN:
+            raise ValueError("Расчет по одной точке поддерживает только оценку plain")
+        if mode == MODE_SCALAR and density:
+            raise ValueError("Растр плотности копится только при расчете блоками")
+        if sampler == SAMPLER_SOBOL and total_points > SOBOL_MAX_POINTS:
+            raise ValueError(f"Последовательность Соболя дает не больше {SOBOL_MAX_POINTS} точек")
+
         self.total_points = total_points
+        self.mode = mode
+        self.chunk_size = chunk_size
+        # Процессов больше, чем ядер, не бывает: лишние только расходуют память и время на запуск
+        cpu_count = os.cpu_count() or 1
+        self.workers = min(workers or cpu_count, cpu_count)
+        # По умолчанию небольшие расчеты замедляются для наглядности
+        self.pacer = pacer or Pacer()
+
+        # Расчет останавливается, когда полуширина доверительного интервала
+        # уровня confidence становится меньше target_error (для квазислучайных
+        # последовательностей биномиальная оценка ошибки завышена, остановка
+        # получается с запасом)
+        self.target_error = target_error
+        self.confidence = confidence
+        self.z = NormalDist().inv_cdf(0.5 + confidence / 2)
+        self.converged = False
+
+        # Без seed расчет по одной точке псевдослучайными числами использует модуль random, как и раньше;
+        # такой расчет по seed не повторить, поэтому seed у него не сообщается (None)
+        self.seeded = seed is not None
+        self.sampler = sampler
+        self.stream = make_stream(sampler, seed)
+        replayable = self.seeded or mode != MODE_SCALAR or sampler != SAMPLER_RANDOM
+        self.seed = self.stream.seed if replayable else None
+        self.estimator_kind = estimator
+        self.strata = strata
+        self.estimator = Estimator(estimator, strata)
         self.points_processed = 0
         self.points_in_circle = 0
         self.pi_estimate = 0
         self.is_running = False
+        # Остановка, запрошенная до начала calculate (например, пока расчет ждал в очереди)
+        self._stop_requested = False
+
+        # Готовые диапазоны потока [start, end) в режиме пула процессов
+        # (задачи завершаются не по порядку, поэтому одной позиции недостаточно)
+        self.completed = []
+        # Время расчета с учетом сеансов до продолжения с контрольной точки (с)
+        self.elapsed_time = 0.0
+        self._session_start = None
+        self._resumed = False
+        # Точки, взятые из кэша результатов: времени их расчета нет, поэтому в скорость они не входят
+        self.cached_points = 0
+
+        # on_checkpoint(state) получает состояние расчета не чаще раза в checkpoint_interval секунд
+        self.on_checkpoint = on_checkpoint
+        self.checkpoint_interval = checkpoint_interval
+        self._last_checkpoint = 0.0
+
+        # Последние результаты - неизменяемый снимок, который поток расчета
+        # заменяет целиком, поэтому читателям не нужна блокировка
+        self.latest_results = MappingProxyType({})
+        # Равномерная выборка точек всего расчета для визуализации (память не зависит от total_points)
+        self.points_sample = PointReservoir(VISUAL_SAMPLE_SIZE)
+        # Растр плотности всех точек; по умолчанию - у больших расчетов блоками,
+        # где выборка точек показывает лишь малую их долю
+        if density is None:
+            density = mode != MODE_SCALAR and total_points >= DENSITY_MIN_POINTS
+        self.density = DensityGrid() if density else None
 
-        # Храним последние результаты
-        self.latest_results = {}
-        self.latest_points = deque(maxlen=1000)  # Ограничиваем для производительности
+        # Время обработки блоков (без ожидания темпа) и окно для мгновенной скорости
+        self.chunk_times = Histogram(CHUNK_TIME_BUCKETS)
+        self.throughput = None
+        self._rate_time = None
+        self._rate_points = 0
+
+        # Номер версии результатов для ожидающих обновления читателей
+        self.results_version = 0
+        self.update_condition = threading.Condition()
+        # Функции без аргументов, вызываемые после каждого обновления (для асинхронных читателей)
+        self._listeners = []
 
     def calculate(self):
         """Выполнить расчет"""
+        # Флаг остановки проверяется после is_running = True: stop() сначала
+        # ставит флаг, так что остановка не теряется ни при каком порядке потоков
         self.is_running = True
-        self.points_processed = 0
-        self.points_in_circle = 0
-        self.pi_estimate = 0
+        if self._stop_requested:
+            self.is_running = False
+        if self._resumed:
+            # Счетчики восстановлены из контрольной точки, расчет продолжается с того же места
+            self._resumed = False
+        else:
+            self.points_processed = 0
+            self.points_in_circle = 0
+            self.pi_estimate = 0
+            self.converged = False
+            self.estimator = Estimator(self.estimator_kind, self.strata)
+            self.completed = []
+            self.elapsed_time = 0.0
+            self.cached_points = 0
+        self._session_start = time.monotonic()
+        self._last_checkpoint = self._session_start
+        self._rate_time = self._session_start
+        self._rate_points = self.points_processed
+        self.pacer.start(self.total_points)
+
+        try:
+            if self.mode == MODE_VECTORIZED:
+                self._calculate_vectorized()
+            elif self.mode == MODE_PARALLEL:
+                self._calculate_parallel()
+            else:
+                self._calculate_scalar()
+        except BaseException:
+            # Расчет прерван ошибкой: счетчики остаются для контрольной точки, время сеанса учитывается
+            self.is_running = False
+            self._stop_requested = False
+            self.elapsed_time = self.get_elapsed_time()
+            self._session_start = None
+            raise
+
+        # Финальное обновление; у остановленного расчета прогресс остается фактическим
+        progress = 100 if self.is_running else self.get_progress()
+        self.is_running = False
+        self._stop_requested = False
+        self.elapsed_time = self.get_elapsed_time()
+        self._session_start = None
+        if self.density is not None:
+            self.density.release_frames()
+        self._update_results(progress)
+
+    def _calculate_scalar(self):
+        """Расчет по одной точке
+
+        На каждой точке меняются только целочисленные счетчики, а оценка,
+        значение π и выборка для визуализации обновляются вместе со снимком
+        результатов (см. _flush_scalar). Снимок со скоростью, дисперсией и
+        гистограммами стоит как тысячи точек, поэтому он публикуется не чаще
+        раза в SCALAR_RESULTS_INTERVAL; при ограниченном темпе это по-прежнему
+        каждые 100 точек.
+        """
+        start = self.points_processed
+        # Точки, еще не перенесенные в оценку и выборку
+        block = ([], [], [])
+        block_start = time.perf_counter()
+        publish_at = 0.0
+        try:
+            for i, (x, y) in zip(range(start, self.total_points), self._scalar_points(start)):
+                if not self.is_running:
+                    break
+
+                # Проверка, попадает ли точка в круг
+                distance = x ** 2 + y ** 2
+                in_circle = distance <= 1.0
+
+                if in_circle:
+                    self.points_in_circle += 1
+
+                self.points_processed += 1
+                block[0].append(x)
+                block[1].append(y)
+                block[2].append(in_circle)
+
+                # Каждые 100 точек обновляем результаты, если подошло время, и проверяем точность
+                if i % 100 == 0:
+                    now = time.monotonic()
+                    if now >= publish_at:
+                        publish_at = now + SCALAR_RESULTS_INTERVAL
+                        self._flush_scalar(block)
+                        self._update_results((i + 1) / self.total_points * 100)
+                        self._checkpoint_if_due()
+                    if self.target_error is not None:
+                        self._flush_scalar(block)
+                        if self._precision_reached():
+                            break
 
-        for i in range(self.total_points):
+                # Темп выдерживается блоками по 100 точек, а не на каждой точке
+                if (i + 1) % 100 == 0:
+                    self.chunk_times.observe(time.perf_counter() - block_start)
+                    self.pacer.acquire(100)
+                    block_start = time.perf_counter()
+        finally:
+            # Последние точки; и при ошибке оценка должна совпадать со счетчиками контрольной точки
+            self._flush_scalar(block)
+
+    def _flush_scalar(self, block):
+        """Перенести точки блока расчета по одной в оценку, значение π и выборку"""
+        x, y, in_circle = block
+        if not in_circle:
+            return
+
+        self.estimator.add_counts(len(in_circle), sum(in_circle))
+        self.pi_estimate = 4 * self.points_in_circle / self.points_processed
+        # Предлагаем точки выборке для визуализации
+        self.points_sample.extend(np.array(x), np.array(y), np.array(in_circle))
+        for values in block:
+            values.clear()
+
+    def _scalar_points(self, start=0):
+        """Случайные точки для расчета по одной, начиная с номера start"""
+        if not self.seeded and self.sampler == SAMPLER_RANDOM:
+            while True:
+                yield random.uniform(-1, 1), random.uniform(-1, 1)
+
+        for block_start in range(start, self.total_points, STREAM_BLOCK_SIZE):
+            x, y, _ = self.stream.generate(block_start, min(STREAM_BLOCK_SIZE, self.total_points - block_start))
+            yield from zip(x.tolist(), y.tolist())
+
+    def _calculate_vectorized(self):
+        """Расчет блоками точек фиксированного размера"""
+        # При ограниченной скорости блок уменьшается, чтобы прогресс обновлялся плавно
+        chunk_size = self.pacer.chunk_size(self.chunk_size)
+
+        start = self.points_processed
+        while start < self.total_points:
             if not self.is_running:
                 break
 
-            # Генерация случайной точки
-            x = random.uniform(-1, 1)
-            y = random.uniform(-1, 1)
-
-            # Проверка, попадает ли точка в круг
-            distance = x ** 2 + y ** 2
-            in_circle = distance <= 1.0
-
-            if in_circle:
-                self.points_in_circle += 1
-
-            self.points_processed += 1
-
-            # Расчет π
-            if self.points_processed > 0:
-                self.pi_estimate = 4 * self.points_in_circle / self.points_processed
-
-            # Сохраняем точку для визуализации (каждую 10-ю для производительности)
-            if i % 10 == 0:
-                self.latest_points.append({
-                    'x': x,
-                    'y': y,
-                    'in_circle': in_circle
-                })
-
-            # Обновляем результаты каждые 100 точек
-            if i % 100 == 0:
-                self.latest_results = {
-                    'points_processed': self.points_processed,
-                    'points_in_circle': self.points_in_circle,
-                    'pi_estimate': self.pi_estimate,
-                    'progress': (i + 1) / self.total_points * 100
-                }
-
-            # Небольшая задержка для визуализации
-            if self.total_points <= 10000:
-                time.sleep(0.001)
-
-        # Финальное обновление
-        self.latest_results = {
+            count = min(chunk_size, self.total_points - start)
+            chunk_start = time.perf_counter()
+
+            # Генерация блока случайных точек и значений оценки
+            x, y, _ = self.stream.generate(start, count)
+            (x, y, in_circle), values, cells = self.estimator.transform(start, x, y)
+            self.estimator.add(values, cells)
+
+            self.points_in_circle += int(np.count_nonzero(in_circle))
+            self.points_processed += count
+            self.pi_estimate = self.estimator.estimate()
+
+            self.points_sample.extend(x, y, in_circle)
+            if self.density is not None:
+                self.density.add(x, y, in_circle)
+            self.chunk_times.observe(time.perf_counter() - chunk_start)
+
+            start += count
+            self._update_results(start / self.total_points * 100)
+            if self._precision_reached():
+                break
+            self._checkpoint_if_due()
+            self.pacer.acquire(count)
+
+    def _calculate_parallel(self):
+        """Расчет в пуле процессов, каждая задача считает свой диапазон потока точек"""
+        task_size = self.pacer.chunk_size(PARALLEL_TASK_SIZE)
+        # После продолжения с контрольной точки считаются только недостающие диапазоны
+        tasks = missing_ranges(self.completed, self.total_points, task_size)
+        starts = {}
+
+        # spawn безопаснее fork в многопоточном веб-сервере
+        executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context('spawn')
+        )
+
+        def submit_tasks(pending):
+            # Держим в очереди ограниченное число задач, чтобы остановка была быстрой
+            for start, count in tasks:
+                future = executor.submit(
+                    count_points_in_circle, self.seed, start, count, self.chunk_size, self.sampler,
+                    self.estimator_kind, self.strata, self.density is not None
+                )
+                starts[future] = (start, time.perf_counter())
+                pending.add(future)
+                if len(pending) >= 2 * self.workers:
+                    break
+            return pending
+
+        try:
+            pending = submit_tasks(set())
+            while pending and self.is_running:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    inside, count, sample, state, bins = future.result()
+                    self.points_in_circle += inside
+                    self.points_processed += count
+                    self.estimator.merge(state)
+                    # Время задачи - от постановки в пул до результата
+                    start, submitted = starts.pop(future)
+                    self.chunk_times.observe(time.perf_counter() - submitted)
+                    self.completed = merge_ranges(self.completed + [[start, start + count]])
+                    self.pacer.acquire(count)
+                    # Выборки задач одинаковой доли точек, так что выборка из них равномерна по расчету
+                    if sample is not None:
+                        self.points_sample.extend(*sample)
+                    if bins is not None:
+                        self.density.add_bins(bins)
+
+                self.pi_estimate = self.estimator.estimate()
+                self._update_results(self.points_processed / self.total_points * 100)
+                if self._precision_reached():
+                    break
+                self._checkpoint_if_due()
+                submit_tasks(pending)
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def half_width(self):
+        """Полуширина доверительного интервала текущей оценки π по выборочной дисперсии"""
+        variance = self.estimator.variance()
+        if variance is None:
+            return math.inf
+        return self.z * math.sqrt(variance / self.estimator.samples)
+
+    def mc_error(self):
+        """Стандартная ошибка обычного Монте-Карло на том же числе точек - для сравнения"""
+        if self.points_processed == 0:
+            return None
+        return pi_half_width(self.pi_estimate / 4 * self.points_processed, self.points_processed, 1)
+
+    def _precision_reached(self):
+        """Достигнута ли целевая погрешность (отмечает сходимость расчета)"""
+        if self.target_error is None or self.points_processed < MIN_POINTS_FOR_PRECISION:
+            return False
+        self.converged = self.half_width() < self.target_error
+        return self.converged
+
+    def _update_results(self, progress):
+        """Опубликовать новый снимок результатов и разбудить ожидающих читателей
+
+        Снимок собирается целиком и публикуется одним присваиванием ссылки,
+        так что читатель видит либо прошлый, либо новый снимок, но не их смесь.
+        """
+        half_width = self.half_width()
+        if not math.isfinite(half_width):
+            half_width = None
+        self._measure_throughput()
+
+        snapshot = {
             'points_processed': self.points_processed,
             'points_in_circle': self.points_in_circle,
             'pi_estimate': self.pi_estimate,
-            'progress': 100
+            'progress': progress,
+            'sampler': self.sampler,
+            'estimator': self.estimator_kind,
+            'variance': self.estimator.variance(),
+            'std_error': half_width / self.z if half_width is not None else None,
+            'mc_error': self.mc_error(),
+            'confidence': self.confidence,
+            'ci_half_width': half_width,
+            'ci_low': self.pi_estimate - half_width if half_width is not None else None,
+            'ci_high': self.pi_estimate + half_width if half_width is not None else None,
+            'converged': self.converged,
+            'throughput': self.throughput,
+            'average_throughput': self.average_throughput(),
+            'chunk_time': self.chunk_times.snapshot(),
+            'lock_wait': self.points_sample.lock_waits.snapshot(),
+            'version': self.results_version + 1
         }
+        self.latest_results = MappingProxyType(snapshot)
 
-        self.is_running = False
+        with self.update_condition:
+            self.results_version += 1
+            self.update_condition.notify_all()
+            listeners = list(self._listeners)
+
+        for listener in listeners:
+            listener()
+
+    def _measure_throughput(self):
+        """Обновить мгновенную скорость (точек в секунду) за последнее окно THROUGHPUT_WINDOW"""
+        if self._session_start is None:
+            # Расчет не идет
+            self.throughput = None
+            return
+
+        now = time.monotonic()
+        if now - self._rate_time >= THROUGHPUT_WINDOW:
+            self.throughput = (self.points_processed - self._rate_points) / (now - self._rate_time)
+            self._rate_time = now
+            self._rate_points = self.points_processed
+
+    def get_elapsed_time(self):
+        """Время расчета с учетом сеансов до продолжения с контрольной точки (с)"""
+        if self._session_start is None:
+            return self.elapsed_time
+        return self.elapsed_time + time.monotonic() - self._session_start
+
+    def completed_ranges(self):
+        """Обработанные диапазоны потока точек [start, end)"""
+        if self.mode == MODE_PARALLEL:
+            return [list(completed) for completed in self.completed]
+        # Остальные режимы обрабатывают поток по порядку
+        return [[0, self.points_processed]] if self.points_processed > 0 else []
+
+    def checkpoint(self):
+        """Состояние расчета для продолжения с того же места (словарь для JSON)
+
+        Потоки точек восстанавливают любой диапазон по seed и номеру точки,
+        поэтому вместо состояния генератора хранятся обработанные диапазоны.
+        """
+        counts, sums, squares = self.estimator.state()
+        return {
+            'version': CHECKPOINT_VERSION,
+            'total_points': self.total_points,
+            'mode': self.mode,
+            'chunk_size': self.chunk_size,
+            'workers': self.workers,
+            'seed': self.seed,
+            'seeded': self.seeded,
+            'sampler': self.sampler,
+            'estimator': self.estimator_kind,
+            'strata': self.strata,
+            'pacing': {'mode': self.pacer.mode, 'value': self.pacer.value},
+            'target_error': self.target_error,
+            'confidence': self.confidence,
+            'points_processed': self.points_processed,
+            'points_in_circle': self.points_in_circle,
+            'completed': self.completed_ranges(),
+            'estimator_state': {'counts': counts.tolist(), 'sums': sums.tolist(), 'squares': squares.tolist()},
+            'elapsed_time': self.get_elapsed_time(),
+            'saved_at': time.time()
+        }
+
+    @classmethod
+    def from_checkpoint(cls, state, on_checkpoint=None, checkpoint_interval=DEFAULT_CHECKPOINT_INTERVAL):
+        """Калькулятор, который продолжит расчет с контрольной точки state"""
+        if state.get('version') != CHECKPOINT_VERSION:
+            raise ValueError("Неподдерживаемая версия контрольной точки")
+
+        pacing = state['pacing']
+        calculator = cls(
+            state['total_points'],
+            mode=state['mode'],
+            chunk_size=state['chunk_size'],
+            workers=state['workers'],
+            seed=state['seed'],
+            pacer=Pacer(pacing['mode'], pacing['value']),
+            target_error=state['target_error'],
+            confidence=state['confidence'],
+            sampler=state['sampler'],
+            estimator=state['estimator'],
+            strata=state['strata'],
+            on_checkpoint=on_checkpoint,
+            checkpoint_interval=checkpoint_interval
+        )
+        calculator.restore(state)
+        return calculator
+
+    def restore(self, state):
+        """Восстановить счетчики из контрольной точки; следующий calculate продолжит расчет"""
+        estimator_state = state['estimator_state']
+        self.estimator = Estimator(self.estimator_kind, self.strata)
+        self.estimator.merge((
+            np.array(estimator_state['counts'], dtype=np.int64),
+            np.array(estimator_state['sums']),
+            np.array(estimator_state['squares'])
+        ))
+
+        self.seeded = state['seeded']
+        self.points_processed = state['points_processed']
+        self.points_in_circle = state['points_in_circle']
+        self.completed = merge_ranges(state['completed'])
+        self.pi_estimate = self.estimator.estimate()
+        self.converged = False
+        self.elapsed_time = state['elapsed_time']
+        # Точек до контрольной точки в растре плотности нет, а неполный растр
+        # выглядел бы картиной всего расчета, поэтому продолженный расчет его не копит
+        self.density = None
+        self._resumed = True
+        self._update_results(self.get_progress())
+
+    def restore_cached(self, state):
+        """Продолжить с результата из кэша: время и скорость учитывают только досчитанные точки"""
+        self.restore(state)
+        self.elapsed_time = 0.0
+        self.cached_points = self.points_processed
+        self._update_results(self.get_progress())
+
+    def average_throughput(self):
+        """Средняя скорость расчета (точек в секунду) без точек из кэша; None, пока время не шло"""
+        elapsed_time = self.get_elapsed_time()
+        if elapsed_time <= 0:
+            return None
+        return (self.points_processed - self.cached_points) / elapsed_time
+
+    def show_preview(self, count=PREVIEW_POINTS):
+        """Добавить для визуализации первые count уже посчитанных точек (у восстановленного расчета их нет)"""
+        count = min(count, self.points_processed)
+        if count == 0:
+            return
+
+        x, y, _ = self.stream.generate(0, count)
+        (x, y, in_circle), _, _ = self.estimator.transform(0, x, y)
+        self.points_sample.extend(x, y, in_circle)
+
+    def _checkpoint_if_due(self):
+        """Передать состояние в on_checkpoint, если с прошлой контрольной точки прошло checkpoint_interval"""
+        if self.on_checkpoint is None:
+            return
+
+        now = time.monotonic()
+        if now - self._last_checkpoint >= self.checkpoint_interval:
+            self._last_checkpoint = now
+            self.on_checkpoint(self.checkpoint())
+
+    def wait_for_update(self, version, timeout=None):
+        """Дождаться результатов новее версии version
+
+        Возвращает текущую версию; если за timeout обновлений не было,
+        она совпадет с переданной.
+        """
+        with self.update_condition:
+            self.update_condition.wait_for(lambda: self.results_version != version, timeout)
+            return self.results_version
+
+    def add_listener(self, listener):
+        """Вызывать listener() в потоке расчета после каждого обновления результатов
+
+        Позволяет ждать обновлений без отдельного потока на читателя: listener
+        должен быть быстрым, например передавать сигнал в цикл событий asyncio.
+        """
+        with self.update_condition:
+            self._listeners.append(listener)
+
+    def remove_listener(self, listener):
+        """Перестать вызывать listener"""
+        with self.update_condition:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
 
     def stop(self):
-        """Остановить расчет"""
+        """Остановить расчет
+
+        Поток расчета замечает остановку после текущего блока (в режиме пула
+        процессов - после текущих задач, а задачи из очереди отменяются).
+        Остановка до начала calculate тоже учитывается: расчет не начнется.
+        """
+        self._stop_requested = True
         self.is_running = False
 
     def get_progress(self):
@@ -87,12 +1392,26 @@ class MonteCarloCalculator:
             return (self.points_processed / self.total_points) * 100
         return 0
 
+    def snapshot(self):
+        """Последний опубликованный снимок результатов (неизменяемый, без копирования)"""
+        return self.latest_results
+
     def get_latest_results(self):
         """Получить последние результаты"""
-        return self.latest_results.copy()
+        return dict(self.latest_results)
+
+    def get_points(self, cursor=0):
+        """Точки выборки, записанные после курсора cursor, и новый курсор
+
+        С курсором 0 - вся выборка, то есть картина расчета целиком.
+        """
+        x, y, in_circle, cursor = self.points_sample.since(cursor)
+        return points_as_dicts(x, y, in_circle), cursor
+
+    def get_points_packed(self, cursor=0):
+        """Точки выборки после курсора cursor в двоичном формате pack_points
 
-    def get_latest_points(self):
-        """Получить последние точки"""
-        points = list(self.latest_points)
-        self.latest_points.clear()  # Очищаем после получения
-        return points
\ No newline at end of file
+        Возвращает количество точек, упакованные данные и новый курсор.
+        """
+        x, y, in_circle, cursor = self.points_sample.since(cursor)
+        return len(x), pack_points(x, y, in_circle), cursor
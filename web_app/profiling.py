@@ -0,0 +1,99 @@
+import cProfile
+import io
+import logging
+import os
+import pstats
+import threading
+
+# Расширение файлов профилей
+PROFILE_SUFFIX = '.pstats'
+# Порядок сортировки текстового отчета
+PROFILE_SORTS = ('cumulative', 'tottime', 'calls')
+# Сколько функций выводится в текстовом отчете
+DEFAULT_REPORT_LINES = 40
+# Сколько последних профилей хранится в каталоге
+DEFAULT_MAX_PROFILES = 100
+
+logger = logging.getLogger(__name__)
+
+
+class ProfileStore:
+    """Профили расчетов (cProfile) в каталоге, по файлу pstats на расчет
+
+    Профилируется поток расчета: генерация точек, проверка попадания в круг,
+    сохранение точек для визуализации и публикация результатов. Задачи
+    режима пула процессов выполняются в других процессах и в профиль
+    попадают только как ожидание результатов. Хранятся max_profiles
+    последних профилей: при сохранении нового самые старые удаляются.
+    """
+
+    def __init__(self, directory, max_profiles=DEFAULT_MAX_PROFILES):
+        self.directory = directory
+        self.max_profiles = max_profiles
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, calc_id):
+        """Путь к файлу профиля расчета"""
+        if not calc_id or os.path.basename(calc_id) != calc_id or calc_id.startswith('.'):
+            raise ValueError(f"Некорректный идентификатор расчета: {calc_id}")
+        return os.path.join(self.directory, calc_id + PROFILE_SUFFIX)
+
+    def run(self, calc_id, function):
+        """Выполнить function под cProfile, сохранить профиль и вернуть результат function"""
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # В этом потоке уже работает другой профилировщик
+            logger.warning("Профилирование расчета %s недоступно", calc_id)
+            return function()
+
+        try:
+            return function()
+        finally:
+            profiler.disable()
+            self._save(calc_id, profiler)
+
+    def exists(self, calc_id):
+        """Сохранен ли профиль расчета"""
+        return os.path.exists(self.path(calc_id))
+
+    def report(self, calc_id, sort=PROFILE_SORTS[0], lines=DEFAULT_REPORT_LINES):
+        """Текстовый отчет pstats о lines самых затратных функциях"""
+        if sort not in PROFILE_SORTS:
+            raise ValueError(f"Неизвестный порядок сортировки: {sort}")
+
+        stream = io.StringIO()
+        stats = pstats.Stats(self.path(calc_id), stream=stream)
+        stats.strip_dirs().sort_stats(sort).print_stats(lines)
+        return stream.getvalue()
+
+    def delete(self, calc_id):
+        """Удалить профиль расчета"""
+        try:
+            os.remove(self.path(calc_id))
+        except FileNotFoundError:
+            pass
+
+    def list(self):
+        """Идентификаторы расчетов с сохраненным профилем, от старых к новым"""
+        profiles = []
+        for name in os.listdir(self.directory):
+            if name.endswith(PROFILE_SUFFIX):
+                try:
+                    modified = os.path.getmtime(os.path.join(self.directory, name))
+                except FileNotFoundError:
+                    continue
+                profiles.append((modified, name[:-len(PROFILE_SUFFIX)]))
+        return [calc_id for _, calc_id in sorted(profiles)]
+
+    def _save(self, calc_id, profiler):
+        """Записать профиль во временный файл, атомарно заменить прежний и удалить старые сверх лимита"""
+        path = self.path(calc_id)
+        temporary = f'{path}.{threading.get_ident()}.tmp'
+        profiler.dump_stats(temporary)
+        os.replace(temporary, path)
+
+        stored = self.list()
+        for old_calc_id in stored[:max(len(stored) - self.max_profiles, 0)]:
+            self.delete(old_calc_id)
@@ -0,0 +1,177 @@
+import sys
+import time
+from collections import OrderedDict, deque
+
+import numpy as np
+
+# Максимальное количество расчетов в реестре
+DEFAULT_MAX_JOBS = 100
+# Через сколько секунд без обращений завершенный расчет удаляется
+DEFAULT_IDLE_TTL = 3600
+# Сколько последних результатов хранится на расчет
+DEFAULT_MAX_RESULTS = 1000
+# Сколько последних пачек точек хранится на расчет
+DEFAULT_MAX_POINT_BATCHES = 100
+# Статусы незавершенных расчетов (их нельзя вытеснять)
+ACTIVE_STATUSES = ('queued', 'running')
+
+
+class JobRegistry:
+    """Реестр расчетов с ограничением размера
+
+    Завершенные расчеты удаляются, если к ним не обращались дольше idle_ttl,
+    а при заполнении реестра вытесняется давнее всех использованный
+    завершенный расчет. История результатов и точек каждого расчета
+    ограничена. Реестр не потокобезопасен: вызывается под calculation_lock.
+    """
+
+    def __init__(self, max_jobs=DEFAULT_MAX_JOBS, idle_ttl=DEFAULT_IDLE_TTL,
+                 max_results=DEFAULT_MAX_RESULTS, max_point_batches=DEFAULT_MAX_POINT_BATCHES):
+        self.max_jobs = max_jobs
+        self.idle_ttl = idle_ttl
+        self.max_results = max_results
+        self.max_point_batches = max_point_batches
+
+        # Порядок ключей - от давно использованных к недавно использованным
+        self._jobs = OrderedDict()
+        self.evicted = 0
+
+    def __contains__(self, calc_id):
+        return calc_id in self._jobs
+
+    def __getitem__(self, calc_id):
+        return self._jobs[calc_id]
+
+    def __len__(self):
+        return len(self._jobs)
+
+    def values(self):
+        """Данные всех расчетов"""
+        return self._jobs.values()
+
+    def get(self, calc_id):
+        """Получить данные расчета и отметить обращение к нему"""
+        calc_data = self._jobs.get(calc_id)
+        if calc_data is not None:
+            calc_data['last_access'] = time.time()
+            self._jobs.move_to_end(calc_id)
+        return calc_data
+
+    def add(self, calc_id, calculator, status='running'):
+        """Зарегистрировать расчет
+
+        Возвращает данные расчета или None, если реестр заполнен
+        незавершенными расчетами.
+        """
+        self.sweep()
+        if len(self._jobs) >= self.max_jobs and not self._evict_least_recent():
+            return None
+
+        now = time.time()
+        calc_data = {
+            'id': calc_id,
+            'calculator': calculator,
+            'status': status,
+            'start_time': now,
+            'results': deque(maxlen=self.max_results),
+            # Объем каждого хранимого результата и их сумма (считаются один раз при записи)
+            'result_sizes': deque(maxlen=self.max_results),
+            'results_bytes': 0,
+            'points': deque(maxlen=self.max_point_batches),
+            'last_update': now,
+            'last_access': now
+        }
+        self._jobs[calc_id] = calc_data
+        return calc_data
+
+    def discard(self, calc_id):
+        """Удалить расчет (например, не принятый в очередь)"""
+        self._jobs.pop(calc_id, None)
+
+    def record(self, calc_data, results, points):
+        """Сохранить результаты и пачку точек (x, y, in_circle) в истории расчета"""
+        sizes = calc_data['result_sizes']
+        if len(sizes) == sizes.maxlen:
+            calc_data['results_bytes'] -= sizes[0]
+        size = deep_sizeof(results)
+        sizes.append(size)
+        calc_data['results_bytes'] += size
+        calc_data['results'].append(results)
+        if len(points[0]) > 0:
+            calc_data['points'].append(points)
+        calc_data['last_update'] = time.time()
+
+    def sweep(self):
+        """Удалить завершенные расчеты, к которым давно не обращались"""
+        deadline = time.time() - self.idle_ttl
+        expired = [calc_id for calc_id, calc_data in self._jobs.items()
+                   if calc_data['status'] not in ACTIVE_STATUSES and calc_data['last_access'] < deadline]
+        for calc_id in expired:
+            del self._jobs[calc_id]
+        self.evicted += len(expired)
+
+    def clear(self):
+        """Удалить все расчеты"""
+        self._jobs.clear()
+
+    def stats(self):
+        """Количество расчетов и примерный объем хранимой истории и растров плотности"""
+        running = sum(1 for calc_data in self._jobs.values() if calc_data['status'] == 'running')
+        queued = sum(1 for calc_data in self._jobs.values() if calc_data['status'] == 'queued')
+        results = sum(len(calc_data['results']) for calc_data in self._jobs.values())
+        point_bytes = sum(
+            x.nbytes + y.nbytes + in_circle.nbytes
+            for calc_data in self._jobs.values()
+            for x, y, in_circle in calc_data['points']
+        )
+        result_bytes = sum(calc_data['results_bytes'] for calc_data in self._jobs.values())
+        # Растры плотности с хранимыми кадрами
+        density_bytes = sum(
+            calc_data['calculator'].density.nbytes for calc_data in self._jobs.values()
+            if calc_data['calculator'].density is not None
+        )
+
+        return {
+            'jobs': len(self._jobs),
+            'running': running,
+            'queued': queued,
+            'finished': len(self._jobs) - running - queued,
+            'max_jobs': self.max_jobs,
+            'evicted': self.evicted,
+            'results': results,
+            'results_bytes': result_bytes,
+            'points_bytes': point_bytes,
+            'density_bytes': density_bytes,
+            'bytes': result_bytes + point_bytes + density_bytes
+        }
+
+    def _evict_least_recent(self):
+        """Вытеснить давнее всех использованный завершенный расчет"""
+        for calc_id, calc_data in self._jobs.items():
+            if calc_data['status'] not in ACTIVE_STATUSES:
+                del self._jobs[calc_id]
+                self.evicted += 1
+                return True
+        return False
+
+
+def deep_sizeof(value, seen=None):
+    """Примерный объем значения вместе с вложенными контейнерами и массивами numpy
+
+    Объекты из seen не учитываются повторно (например, общий вложенный список).
+    """
+    if seen is None:
+        seen = set()
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+
+    if isinstance(value, np.ndarray):
+        # У представления данные принадлежат другому массиву, но хранятся ради него
+        return sys.getsizeof(value) + (value.nbytes if value.base is not None else 0)
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(deep_sizeof(key, seen) + deep_sizeof(item, seen) for key, item in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset, deque)):
+        size += sum(deep_sizeof(item, seen) for item in value)
+    return size
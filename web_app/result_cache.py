@@ -0,0 +1,181 @@
+import json
+import os
+import threading
+from collections import OrderedDict
+
+# Сколько результатов держится в памяти
+DEFAULT_MAX_ENTRIES = 256
+# Предельный размер результатов на диске (байт)
+DEFAULT_MAX_DISK_BYTES = 64 * 1024 * 1024
+# Расширение файлов результатов на диске
+RESULT_SUFFIX = '.json'
+
+
+def cache_key(seed, sampler, estimator, strata):
+    """Ключ потока точек: расчеты с одним ключом видят одни и те же точки в том же порядке"""
+    return f'{sampler}-{estimator}-{strata}-{seed}'
+
+
+class ResultCache:
+    """Кэш итоговых состояний детерминированных расчетов
+
+    Состояние (в формате MonteCarloCalculator.checkpoint) хранится по ключу
+    потока точек и количеству точек. Точки потока с заданным seed не зависят
+    от размера расчета, поэтому результат на N точках служит началом любого
+    расчета на большем количестве точек того же потока. В памяти хранятся
+    max_entries недавно использованных результатов; если задан directory,
+    результаты сохраняются и на диск, где давно использованные удаляются
+    при превышении max_disk_bytes.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, directory=None, max_disk_bytes=DEFAULT_MAX_DISK_BYTES):
+        self.max_entries = max_entries
+        self.directory = directory
+        self.max_disk_bytes = max_disk_bytes
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.prefix_hits = 0
+        self.misses = 0
+
+        # Порядок ключей (key, total_points) - от давно использованных к недавно использованным
+        self._entries = OrderedDict()
+
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    def get(self, key, total_points):
+        """Лучший результат для расчета total_points точек потока key
+
+        Возвращает состояние на total_points точках, иначе на наибольшем
+        меньшем количестве точек, иначе None.
+        """
+        with self._lock:
+            candidates = [points for entry_key, points in self._entries
+                          if entry_key == key and points <= total_points]
+            disk_candidates = [points for points in self._disk_points(key) if points <= total_points]
+
+            best = max(candidates + disk_candidates, default=None)
+            if best is None:
+                self.misses += 1
+                return None
+
+            state = self._entries.get((key, best))
+            if state is None:
+                state = self._read(key, best)
+                if state is None:
+                    self.misses += 1
+                    return None
+                self._remember(key, best, state)
+            else:
+                self._entries.move_to_end((key, best))
+                self._touch(key, best)
+
+            if best == total_points:
+                self.hits += 1
+            else:
+                self.prefix_hits += 1
+            return state
+
+    def put(self, key, state):
+        """Сохранить итоговое состояние расчета state['points_processed'] точек потока key"""
+        total_points = state['points_processed']
+        with self._lock:
+            self._remember(key, total_points, state)
+            self._write(key, total_points, state)
+
+    def clear(self):
+        """Удалить все результаты из памяти (файлы на диске сохраняются)"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Количество результатов и обращений к кэшу"""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'disk_bytes': sum(size for _, size, _ in self._disk_files()),
+                'max_disk_bytes': self.max_disk_bytes if self.directory is not None else 0,
+                'hits': self.hits,
+                'prefix_hits': self.prefix_hits,
+                'misses': self.misses
+            }
+
+    def _remember(self, key, total_points, state):
+        """Добавить результат в память, вытеснив давно использованные"""
+        self._entries[(key, total_points)] = state
+        self._entries.move_to_end((key, total_points))
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _path(self, key, total_points):
+        """Путь к файлу результата"""
+        return os.path.join(self.directory, f'{key}-{total_points}{RESULT_SUFFIX}')
+
+    def _disk_files(self):
+        """Файлы результатов на диске: (путь, размер, время последнего использования)"""
+        if self.directory is None:
+            return []
+
+        files = []
+        for name in os.listdir(self.directory):
+            if name.endswith(RESULT_SUFFIX):
+                path = os.path.join(self.directory, name)
+                try:
+                    info = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                files.append((path, info.st_size, info.st_mtime))
+        return files
+
+    def _disk_points(self, key):
+        """Количества точек, для которых результат потока key есть на диске"""
+        if self.directory is None:
+            return []
+
+        prefix = key + '-'
+        points = []
+        for name in os.listdir(self.directory):
+            if name.startswith(prefix) and name.endswith(RESULT_SUFFIX):
+                count = name[len(prefix):-len(RESULT_SUFFIX)]
+                if count.isdigit():
+                    points.append(int(count))
+        return points
+
+    def _read(self, key, total_points):
+        """Прочитать результат с диска"""
+        try:
+            with open(self._path(key, total_points), encoding='utf-8') as file:
+                state = json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        self._touch(key, total_points)
+        return state
+
+    def _touch(self, key, total_points):
+        """Отметить использование файла результата (для вытеснения с диска)"""
+        if self.directory is None:
+            return
+        try:
+            os.utime(self._path(key, total_points))
+        except FileNotFoundError:
+            pass
+
+    def _write(self, key, total_points, state):
+        """Записать результат на диск и вытеснить давно использованные файлы сверх лимита"""
+        if self.directory is None:
+            return
+
+        path = self._path(key, total_points)
+        temporary = f'{path}.{threading.get_ident()}.tmp'
+        with open(temporary, 'w', encoding='utf-8') as file:
+            json.dump(state, file)
+        os.replace(temporary, path)
+
+        files = sorted(self._disk_files(), key=lambda file: file[2])
+        total_size = sum(size for _, size, _ in files)
+        for file_path, size, _ in files:
+            if total_size <= self.max_disk_bytes:
+                break
+            os.remove(file_path)
+            total_size -= size
@@ -0,0 +1,205 @@
+import heapq
+import itertools
+import logging
+import math
+import threading
+import time
+from collections import Counter
+
+# Количество потоков, выполняющих расчеты одновременно
+DEFAULT_WORKERS = 4
+# Сколько расчетов может ждать в очереди
+DEFAULT_MAX_QUEUE = 100
+# Сколько расчетов одного клиента может одновременно ждать или выполняться
+DEFAULT_MAX_PER_CLIENT = 8
+# Вес последнего расчета в скользящей средней длительности
+DURATION_SMOOTHING = 0.2
+
+logger = logging.getLogger(__name__)
+
+
+class AdmissionError(Exception):
+    """Расчет не принят в очередь; retry_after - через сколько секунд стоит повторить запрос"""
+
+    # HTTP-статус ответа при отказе
+    status_code = 503
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class QueueFullError(AdmissionError):
+    """Очередь расчетов заполнена"""
+
+    status_code = 503
+
+
+class ClientLimitError(AdmissionError):
+    """У клиента слишком много ожидающих и выполняющихся расчетов"""
+
+    status_code = 429
+
+
+class JobScheduler:
+    """Планировщик расчетов с фиксированным пулом потоков
+
+    Расчеты ждут в очереди с приоритетом (больший приоритет выполняется
+    раньше, при равном - в порядке поступления) и выполняются не более чем
+    в workers потоках, поэтому поток запросов не создает сотни
+    конкурирующих потоков. Длина очереди и количество расчетов одного
+    клиента ограничены; при отказе submit бросает AdmissionError.
+    """
+
+    def __init__(self, workers=DEFAULT_WORKERS, max_queue=DEFAULT_MAX_QUEUE, max_per_client=DEFAULT_MAX_PER_CLIENT):
+        if workers <= 0:
+            raise ValueError("Количество потоков должно быть положительным")
+
+        self.workers = workers
+        self.max_queue = max_queue
+        self.max_per_client = max_per_client
+
+        self._condition = threading.Condition()
+        # Куча ((-priority, seq), job_id); отмененные задачи удаляются из _queued и пропускаются
+        self._heap = []
+        self._queued = {}
+        self._running = set()
+        self._clients = Counter()
+        self._sequence = itertools.count()
+        self._closed = False
+        self.average_duration = None
+        self.completed = 0
+        self.rejected = 0
+
+        self._threads = [
+            threading.Thread(target=self._work, name=f'scheduler-{index}', daemon=True)
+            for index in range(workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, job_id, function, client=None, priority=0):
+        """Поставить расчет в очередь и вернуть его позицию (1 - следующий)"""
+        with self._condition:
+            if self._closed:
+                raise QueueFullError("Планировщик остановлен", self._retry_after())
+            if self._clients[client] >= self.max_per_client:
+                self.rejected += 1
+                raise ClientLimitError("Слишком много расчетов от одного клиента", self._retry_after())
+            if len(self._queued) >= self.max_queue:
+                self.rejected += 1
+                raise QueueFullError("Очередь расчетов заполнена", self._retry_after())
+
+            order = (-priority, next(self._sequence))
+            heapq.heappush(self._heap, (order, job_id))
+            self._queued[job_id] = (order, client, function)
+            self._clients[client] += 1
+            self._condition.notify()
+            return self._position(job_id)
+
+    def cancel(self, job_id):
+        """Убрать расчет из очереди; False, если он уже выполняется или не найден"""
+        with self._condition:
+            entry = self._queued.pop(job_id, None)
+            if entry is None:
+                return False
+            self._release(entry[1])
+            return True
+
+    def position(self, job_id):
+        """Позиция расчета в очереди (1 - следующий) или None, если он не ждет"""
+        with self._condition:
+            return self._position(job_id)
+
+    def stats(self):
+        """Загрузка пула и очереди"""
+        with self._condition:
+            return {
+                'workers': self.workers,
+                'running': len(self._running),
+                'queued': len(self._queued),
+                'max_queue': self.max_queue,
+                'max_per_client': self.max_per_client,
+                'completed': self.completed,
+                'rejected': self.rejected,
+                'average_duration': self.average_duration,
+                'retry_after': self._retry_after()
+            }
+
+    def shutdown(self, wait=True):
+        """Остановить потоки после текущих расчетов; ожидающие расчеты отменяются"""
+        with self._condition:
+            self._closed = True
+            for _, client, _ in self._queued.values():
+                self._release(client)
+            self._queued.clear()
+            self._heap.clear()
+            self._condition.notify_all()
+
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+    def _position(self, job_id):
+        """Позиция в очереди (вызывается под _condition)"""
+        entry = self._queued.get(job_id)
+        if entry is None:
+            return None
+        return 1 + sum(1 for order, _, _ in self._queued.values() if order < entry[0])
+
+    def _is_live(self, order, job_id):
+        """Не отменена ли задача кучи"""
+        entry = self._queued.get(job_id)
+        return entry is not None and entry[0] == order
+
+    def _release(self, client):
+        """Освободить место клиента (вызывается под _condition)"""
+        self._clients[client] -= 1
+        if self._clients[client] <= 0:
+            del self._clients[client]
+
+    def _retry_after(self):
+        """Оценка времени до освобождения места в очереди (с)"""
+        if self.average_duration is None:
+            return 1
+        return max(1, math.ceil(self.average_duration * (len(self._queued) + 1) / self.workers))
+
+    def _next_job(self):
+        """Дождаться следующей задачи; None, если планировщик остановлен"""
+        with self._condition:
+            while True:
+                while self._heap and not self._is_live(*self._heap[0]):
+                    heapq.heappop(self._heap)
+                if self._closed:
+                    return None
+                if self._heap:
+                    _, job_id = heapq.heappop(self._heap)
+                    _, client, function = self._queued.pop(job_id)
+                    self._running.add(job_id)
+                    return job_id, client, function
+                self._condition.wait()
+
+    def _work(self):
+        """Цикл потока пула"""
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+
+            job_id, client, function = job
+            started = time.monotonic()
+            try:
+                function()
+            except Exception:
+                logger.exception("Ошибка расчета %s", job_id)
+            duration = time.monotonic() - started
+
+            with self._condition:
+                self._running.discard(job_id)
+                self._release(client)
+                self.completed += 1
+                if self.average_duration is None:
+                    self.average_duration = duration
+                else:
+                    self.average_duration += DURATION_SMOOTHING * (duration - self.average_duration)
+                self._condition.notify_all()
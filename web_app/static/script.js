@@ -1,12 +1,29 @@
+// Наибольшее количество точек расчета (сервер хранит выборку и растр, а не все точки)
+const MAX_POINTS = 1000000000;
+// Как часто запрашивается растр плотности во время расчета (мс)
+const DENSITY_INTERVAL = 500;
+// Типы массивов растра по заголовку X-Density-Dtype
+const DENSITY_TYPES = {uint8: Uint8Array, uint16: Uint16Array, uint32: Uint32Array};
+
 class MonteCarloWebApp {
     constructor() {
         this.calcId = null;
+        // Курсор выборки точек: сервер присылает только точки новее него
+        this.pointsCursor = 0;
+        // Растр плотности больших расчетов: счетчики пикселей, версия кадра и слой для отрисовки
+        this.densityCounts = null;
+        this.densityVersion = 0;
+        this.densityLayer = null;
+        this.densityLoading = false;
+        this.densityFetched = 0;
+        this.densityFinal = false;
         this.isRunning = false;
         this.isPaused = false;
         this.points = [];
         this.canvas = document.getElementById('monteCarloCanvas');
         this.ctx = this.canvas.getContext('2d');
         this.animationId = null;
+        this.eventSource = null;
 
         this.initCanvas();
         this.bindEvents();
@@ -18,6 +35,11 @@ class MonteCarloWebApp {
         this.ctx.fillStyle = 'white';
         this.ctx.fillRect(0, 0, this.canvas.width, this.canvas.height);
 
+        // Растр плотности - под разметкой, чтобы квадрат и круг оставались видны
+        if (this.densityLayer) {
+            this.ctx.drawImage(this.densityLayer, 50, 50);
+        }
+
         // Рисуем квадрат
         this.ctx.strokeStyle = '#333';
         this.ctx.lineWidth = 2;
@@ -73,8 +95,14 @@ class MonteCarloWebApp {
             pointsCount.value = e.target.value;
         });
 
+        // Значение темпа нужно только для режимов rate и duration
+        const pacingMode = document.getElementById('pacingMode');
+        pacingMode.addEventListener('change', (e) => {
+            document.getElementById('pacingValue').disabled = !['rate', 'duration'].includes(e.target.value);
+        });
+
         pointsCount.addEventListener('input', (e) => {
-            let value = Math.min(Math.max(100, parseInt(e.target.value) || 100), 1000000);
+            let value = Math.min(Math.max(100, parseInt(e.target.value) || 100), MAX_POINTS);
             pointsCount.value = value;
             pointsRange.value = value;
         });
@@ -84,6 +112,20 @@ class MonteCarloWebApp {
         if (this.isRunning) return;
 
         const pointsCount = parseInt(document.getElementById('pointsCount').value);
+        const request = {
+            total_points: pointsCount,
+            sampler: document.getElementById('samplerMode').value,
+            estimator: document.getElementById('estimatorMode').value,
+            pacing: document.getElementById('pacingMode').value
+        };
+        // Отображение: auto - сервер копит растр плотности в больших расчетах
+        const display = document.getElementById('displayMode').value;
+        if (display !== 'auto') {
+            request.density = display === 'density';
+        }
+        if (request.pacing === 'rate' || request.pacing === 'duration') {
+            request.pacing_value = parseFloat(document.getElementById('pacingValue').value);
+        }
 
         try {
             const response = await fetch('/api/start', {
@@ -91,13 +133,15 @@ class MonteCarloWebApp {
                 headers: {
                     'Content-Type': 'application/json',
                 },
-                body: JSON.stringify({ total_points: pointsCount })
+                body: JSON.stringify(request)
             });
 
             const data = await response.json();
 
             if (data.success) {
                 this.calcId = data.calc_id;
+                this.pointsCursor = 0;
+                this.resetDensity();
                 this.isRunning = true;
                 this.isPaused = false;
 
@@ -107,10 +151,17 @@ class MonteCarloWebApp {
                 document.getElementById('stopBtn').disabled = false;
                 document.getElementById('pointsCount').disabled = true;
                 document.getElementById('pointsRange').disabled = true;
+                document.getElementById('pacingMode').disabled = true;
+                document.getElementById('samplerMode').disabled = true;
+                document.getElementById('estimatorMode').disabled = true;
+                document.getElementById('displayMode').disabled = true;
 
                 // Запускаем обновление статуса
-                this.updateStatus();
+                this.startStatusUpdates();
                 this.animate();
+            } else {
+                // Сервер перегружен (429/503) или параметры некорректны
+                alert(data.message);
             }
         } catch (error) {
             console.error('Ошибка при запуске расчета:', error);
@@ -124,10 +175,11 @@ class MonteCarloWebApp {
         this.isPaused = !this.isPaused;
 
         if (this.isPaused) {
+            this.closeStream();
             document.getElementById('pauseBtn').innerHTML = '<i class="fas fa-play"></i> Продолжить';
         } else {
             document.getElementById('pauseBtn').innerHTML = '<i class="fas fa-pause"></i> Пауза';
-            this.updateStatus();
+            this.startStatusUpdates();
         }
     }
 
@@ -139,66 +191,76 @@ class MonteCarloWebApp {
                 method: 'POST'
             });
 
-            this.isRunning = false;
-            this.isPaused = false;
-
-            // Обновляем UI
-            document.getElementById('startBtn').disabled = false;
-            document.getElementById('pauseBtn').disabled = true;
-            document.getElementById('stopBtn').disabled = true;
-            document.getElementById('pointsCount').disabled = false;
-            document.getElementById('pointsRange').disabled = false;
-            document.getElementById('pauseBtn').innerHTML = '<i class="fas fa-pause"></i> Пауза';
-
-            // Загружаем историю
-            this.loadHistory();
+            this.finishCalculation();
         } catch (error) {
             console.error('Ошибка при остановке расчета:', error);
         }
     }
 
+    finishCalculation() {
+        this.closeStream();
+        this.isRunning = false;
+        this.isPaused = false;
+
+        // Обновляем UI
+        document.getElementById('startBtn').disabled = false;
+        document.getElementById('pauseBtn').disabled = true;
+        document.getElementById('stopBtn').disabled = true;
+        document.getElementById('pointsCount').disabled = false;
+        document.getElementById('pointsRange').disabled = false;
+        document.getElementById('pacingMode').disabled = false;
+        document.getElementById('samplerMode').disabled = false;
+        document.getElementById('estimatorMode').disabled = false;
+        document.getElementById('displayMode').disabled = false;
+        document.getElementById('pauseBtn').innerHTML = '<i class="fas fa-pause"></i> Пауза';
+
+        // Загружаем историю
+        this.loadHistory();
+    }
+
+    startStatusUpdates() {
+        // Без поддержки Server-Sent Events опрашиваем /api/status
+        if (window.EventSource) {
+            this.openStream();
+        } else {
+            this.updateStatus();
+        }
+    }
+
+    openStream() {
+        this.closeStream();
+
+        // После паузы поток продолжается с полученных точек
+        this.eventSource = new EventSource(`/api/stream/${this.calcId}?points=packed&cursor=${this.pointsCursor}`);
+        this.eventSource.onmessage = (event) => {
+            this.applyStatus(JSON.parse(event.data));
+        };
+        this.eventSource.onerror = () => {
+            // Сервер закрыл поток после финального события или соединение оборвалось:
+            // EventSource переподключится сам, пока расчет идет
+            if (!this.isRunning || this.isPaused) {
+                this.closeStream();
+            }
+        };
+    }
+
+    closeStream() {
+        if (this.eventSource) {
+            this.eventSource.close();
+            this.eventSource = null;
+        }
+    }
+
     async updateStatus() {
         if (!this.calcId || this.isPaused) return;
 
         try {
-            const response = await fetch(`/api/status/${this.calcId}`);
+            const response = await fetch(`/api/status/${this.calcId}?points=packed&cursor=${this.pointsCursor}`);
             const data = await response.json();
 
-            if (data.status === 'running' || data.status === 'stopped') {
-                // Обновляем статистику
-                document.getElementById('currentPi').textContent = data.current_pi.toFixed(6);
-                document.getElementById('error').textContent = data.error.toFixed(6);
-                document.getElementById('pointsProcessed').textContent = data.points_processed.toLocaleString();
-                document.getElementById('pointsInCircle').textContent = data.points_in_circle.toLocaleString();
-                document.getElementById('elapsedTime').textContent = data.elapsed_time.toFixed(3) + ' с';
-                document.getElementById('progressPercent').textContent = data.progress.toFixed(1) + '%';
-
-                // Обновляем формулу
-                const ratio = data.points_in_circle / data.points_processed || 0;
-                document.getElementById('ratioFormula').textContent = data.points_in_circle;
-                document.getElementById('totalFormula').textContent = data.points_processed;
-                document.getElementById('piFormula').textContent = data.current_pi.toFixed(6);
-
-                // Обновляем отношение
-                document.getElementById('ratio').textContent = ratio.toFixed(4);
-
-                // Обновляем прогресс бар
-                document.getElementById('progressFill').style.width = data.progress + '%';
-
-                // Добавляем точки на canvas
-                if (data.points && data.points.length > 0) {
-                    data.points.forEach(point => {
-                        this.addPoint(point.x, point.y, point.in_circle);
-                    });
-                }
-
-                // Если расчет завершен, останавливаем обновление
-                if (data.status === 'stopped') {
-                    this.stopCalculation();
-                } else {
-                    // Продолжаем обновление
-                    setTimeout(() => this.updateStatus(), 100);
-                }
+            if (this.applyStatus(data)) {
+                // Продолжаем обновление
+                setTimeout(() => this.updateStatus(), 100);
             }
         } catch (error) {
             console.error('Ошибка при обновлении статуса:', error);
@@ -209,6 +271,72 @@ class MonteCarloWebApp {
         }
     }
 
+    applyStatus(data) {
+        // Возвращает true, пока расчет продолжается
+        if (data.status === 'queued') {
+            // Расчет ждет свободного потока на сервере
+            document.getElementById('progressPercent').textContent = 'В очереди: ' + data.queue_position;
+            return true;
+        }
+        if (data.status === 'failed') {
+            // Расчет прерван ошибкой на сервере; его можно продолжить с контрольной точки
+            document.getElementById('progressPercent').textContent = 'Ошибка расчета';
+            this.finishCalculation();
+            return false;
+        }
+        if (data.status !== 'running' && data.status !== 'stopped' && data.status !== 'completed') {
+            this.closeStream();
+            return false;
+        }
+
+        // Обновляем статистику
+        document.getElementById('currentPi').textContent = data.current_pi.toFixed(6);
+        document.getElementById('error').textContent = data.error.toFixed(6);
+        // Ожидаемая ошибка псевдослучайного расчета на том же числе точек - для сравнения с Соболем и Холтоном
+        document.getElementById('mcError').textContent = data.mc_error !== null ? data.mc_error.toFixed(6) : '-';
+        // Дисперсия на точку позволяет сравнить оценки: чем она меньше, тем меньше нужно точек
+        document.getElementById('variance').textContent = data.variance !== null ? data.variance.toFixed(4) : '-';
+        document.getElementById('pointsProcessed').textContent = data.points_processed.toLocaleString();
+        document.getElementById('pointsInCircle').textContent = data.points_in_circle.toLocaleString();
+        document.getElementById('elapsedTime').textContent = data.elapsed_time.toFixed(3) + ' с';
+        document.getElementById('progressPercent').textContent = data.progress.toFixed(1) + '%';
+
+        // Обновляем формулу
+        const ratio = data.points_in_circle / data.points_processed || 0;
+        document.getElementById('ratioFormula').textContent = data.points_in_circle;
+        document.getElementById('totalFormula').textContent = data.points_processed;
+        document.getElementById('piFormula').textContent = data.current_pi.toFixed(6);
+
+        // Обновляем отношение
+        document.getElementById('ratio').textContent = ratio.toFixed(4);
+
+        // Обновляем прогресс бар
+        document.getElementById('progressFill').style.width = data.progress + '%';
+
+        // Добавляем точки на canvas; у расчета с растром плотности рисуется растр
+        this.pointsCursor = data.points_cursor;
+        if (data.density) {
+            this.updateDensity(data.density_version, data.status !== 'running');
+        } else if (data.points_packed !== undefined) {
+            this.addPackedPoints(data.points_packed, data.points_count);
+        } else if (data.points && data.points.length > 0) {
+            data.points.forEach(point => {
+                this.addPoint(point.x, point.y, point.in_circle);
+            });
+        }
+
+        // Если расчет завершен, останавливаем обновление
+        if (data.status === 'stopped') {
+            this.stopCalculation();
+            return false;
+        }
+        if (data.status === 'completed') {
+            this.finishCalculation();
+            return false;
+        }
+        return true;
+    }
+
     addPoint(x, y, inCircle) {
         // Преобразуем координаты из [-1, 1] в [0, 400]
         const plotX = 250 + x * 200;
@@ -221,6 +349,120 @@ class MonteCarloWebApp {
         this.ctx.fill();
     }
 
+    addPackedPoints(packed, count) {
+        if (!count) return;
+
+        // Формат: x (float32) * count, y (float32) * count, маска in_circle по биту на точку
+        const binary = atob(packed);
+        const bytes = new Uint8Array(binary.length);
+        for (let i = 0; i < binary.length; i++) {
+            bytes[i] = binary.charCodeAt(i);
+        }
+
+        const xs = new Float32Array(bytes.buffer, 0, count);
+        const ys = new Float32Array(bytes.buffer, count * 4, count);
+        const mask = bytes.subarray(count * 8);
+
+        for (let i = 0; i < count; i++) {
+            this.addPoint(xs[i], ys[i], (mask[i >> 3] >> (i & 7)) & 1);
+        }
+    }
+
+    resetDensity() {
+        this.densityCounts = null;
+        this.densityVersion = 0;
+        this.densityLayer = null;
+        this.densityFetched = 0;
+        this.densityFinal = false;
+    }
+
+    updateDensity(version, final) {
+        // Растр запрашивается не чаще раза в DENSITY_INTERVAL мс; последний кадр - всегда
+        this.densityFinal = this.densityFinal || final;
+        if (this.densityLoading || version <= this.densityVersion) return;
+        if (!this.densityFinal && performance.now() - this.densityFetched < DENSITY_INTERVAL) return;
+
+        this.loadDensity(version);
+    }
+
+    async loadDensity(version) {
+        const calcId = this.calcId;
+        this.densityLoading = true;
+        this.densityFetched = performance.now();
+
+        try {
+            // Сервер присылает прирост с base, если еще хранит этот кадр, иначе полный растр
+            const response = await fetch(`/api/density/${calcId}?base=${this.densityVersion}`);
+            if (!response.ok || calcId !== this.calcId) return;
+
+            const base = parseInt(response.headers.get('X-Density-Base'), 10);
+            const size = parseInt(response.headers.get('X-Density-Size'), 10);
+            const ArrayType = DENSITY_TYPES[response.headers.get('X-Density-Dtype')];
+            let frame = new ArrayType(await response.arrayBuffer());
+
+            if (base === 0) {
+                this.densityCounts = Uint32Array.from(frame);
+            } else if (base === this.densityVersion && this.densityCounts) {
+                for (let i = 0; i < frame.length; i++) {
+                    this.densityCounts[i] += frame[i];
+                }
+            } else {
+                // Разность не к нашему кадру: следующий запрос получит полный растр
+                this.densityVersion = 0;
+                frame = null;
+            }
+            if (frame) {
+                this.densityVersion = parseInt(response.headers.get('X-Density-Version'), 10);
+                this.drawDensity(size);
+            }
+        } catch (error) {
+            console.error('Ошибка при загрузке растра плотности:', error);
+        } finally {
+            this.densityLoading = false;
+        }
+
+        // Статус успел сообщить о более новом кадре, который нельзя пропустить
+        if (this.densityFinal && calcId === this.calcId && version > this.densityVersion) {
+            this.loadDensity(version);
+        }
+    }
+
+    drawDensity(size) {
+        // Отрисовка зависит только от числа пикселей: цвет - доля точек в круге,
+        // непрозрачность - количество точек в пикселе (логарифмически)
+        const pixels = size * size;
+        const counts = this.densityCounts;
+        let max = 0;
+        for (let i = 0; i < pixels; i++) {
+            max = Math.max(max, counts[i] + counts[pixels + i]);
+        }
+        const scale = max > 0 ? 255 / Math.log1p(max) : 0;
+
+        if (!this.densityLayer || this.densityLayer.width !== size) {
+            this.densityLayer = document.createElement('canvas');
+            this.densityLayer.width = size;
+            this.densityLayer.height = size;
+        }
+        const layerCtx = this.densityLayer.getContext('2d');
+        const image = layerCtx.createImageData(size, size);
+        const rgba = image.data;
+        for (let i = 0; i < pixels; i++) {
+            const inside = counts[i];
+            const total = inside + counts[pixels + i];
+            if (total === 0) continue;
+
+            // Смешиваем цвета точек в круге (#0066ff) и вне круга (#ff6600)
+            const share = inside / total;
+            rgba[4 * i] = 255 * (1 - share);
+            rgba[4 * i + 1] = 102;
+            rgba[4 * i + 2] = 255 * share;
+            rgba[4 * i + 3] = Math.max(Math.log1p(total) * scale, 32);
+        }
+        layerCtx.putImageData(image, 0, 0);
+
+        this.initCanvas();
+    }
+
     clearCanvas() {
         // Останавливаем текущий расчет
         if (this.isRunning) {
@@ -228,12 +470,15 @@ class MonteCarloWebApp {
         }
 
         // Очищаем canvas
+        this.resetDensity();
         this.initCanvas();
         this.points = [];
 
         // Сбрасываем статистику
         document.getElementById('currentPi').textContent = '0.000000';
         document.getElementById('error').textContent = '0.000000';
+        document.getElementById('mcError').textContent = '-';
+        document.getElementById('variance').textContent = '-';
         document.getElementById('pointsProcessed').textContent = '0';
         document.getElementById('pointsInCircle').textContent = '0';
         document.getElementById('ratio').textContent = '0.0000';
@@ -266,11 +511,13 @@ class MonteCarloWebApp {
                         <div class="history-item-header">
                             <span class="history-id">Расчет #${item.id.slice(-6)}</span>
                             <span class="history-status ${item.status === 'running' ? 'status-running' : 'status-completed'}">
-                                ${item.status === 'running' ? 'В процессе' : 'Завершен'}
+                                ${item.status === 'stopped' ? 'Остановлен' : item.status === 'failed' ? 'Ошибка' : item.status === 'running' ? 'В процессе' : 'Завершен'}
                             </span>
                         </div>
                         <div class="history-stats">
                             Точек: ${item.total_points.toLocaleString()} |
+                            ${item.sampler && item.sampler !== 'random' ? `Последовательность: ${item.sampler} |` : ''}
+                            ${item.estimator && item.estimator !== 'plain' ? `Оценка: ${item.estimator} |` : ''}
                             π: ${item.final_pi.toFixed(6)} |
                             Погрешность: ${item.error.toFixed(6)} |
                             Время: ${item.time_spent.toFixed(2)} с